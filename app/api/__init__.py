@@ -6,6 +6,8 @@ from app.api.routes.permission import router as permission_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.marketing import router as marketing_router
 from app.api.routes.admin import router as admin_router
+from app.api.routes.notifications import router as notifications_router
+from app.api.routes.attendance import router as attendance_router
 from fastapi import APIRouter
 
 api_router = APIRouter()
@@ -18,3 +20,7 @@ api_router.include_router(leave_router, prefix="/leave", tags=["leave"])
 api_router.include_router(permission_router, prefix="/permission", tags=["permission"])
 api_router.include_router(loan_router, prefix="/loan", tags=["loan"])
 api_router.include_router(marketing_router, prefix="/marketing", tags=["marketing"])
+api_router.include_router(
+    notifications_router, prefix="/notifications", tags=["notifications"]
+)
+api_router.include_router(attendance_router, prefix="/attendance", tags=["attendance"])
@@ -1,12 +1,8 @@
 from app.database import get_mongo, AsyncIOMotorClient
+import asyncio
 import pandas as pd
-from copy import copy
-import io
-import openpyxl
-from openpyxl.styles import PatternFill
-import openpyxl.utils
-from openpyxl.styles import Font
 from app.api.crud.admin import AdminCrud
+from app.api.lib.ReportWriter import ReportWriter
 
 from fastapi import HTTPException, Depends, APIRouter
 
@@ -407,19 +403,12 @@ class AdminController:
         res = await crud_obj.get_bank_salary_batch_list_all(md["branch"])
         return res
 
-    async def copy_cell(self, source_cell, target_cell):
-        target_cell.value = source_cell.value
-        if source_cell.has_style:
-            target_cell.font = copy(source_cell.font)
-            target_cell.border = copy(source_cell.border)
-            target_cell.fill = copy(source_cell.fill)
-            target_cell.number_format = source_cell.number_format
-            target_cell.protection = copy(source_cell.protection)
-            target_cell.alignment = copy(source_cell.alignment)
-
     async def download_report(self, report_type, query_params):
+        writer = ReportWriter(query_params.get("format", "xlsx"))
+
         if report_type == "bank_salary":
-            return await self.download_bank_salary_report(query_params)
+            await self.download_bank_salary_report(query_params, writer)
+            return await asyncio.to_thread(writer.close)
 
         meta = await self.get_report_meta(report_type)
 
@@ -431,50 +420,28 @@ class AdminController:
             raise HTTPException(status_code=400, detail="Invalid query parameters")
 
         if report_type == "salary":
-            data = await self.build_salary_report(query_params)
+            await self.build_salary_report(query_params, writer)
         elif report_type == "increment":
-            data = await self.build_increment_report(query_params)
+            await self.build_increment_report(query_params, writer)
         elif report_type == "bonus":
-            data = await self.build_bonus_report(query_params)
+            await self.build_bonus_report(query_params, writer)
         elif report_type == "allowance":
-            data = await self.build_allowance_report(query_params)
+            await self.build_allowance_report(query_params, writer)
         elif report_type == "attendance_special_allowance":
-            data = await self.build_attendance_special_allowance_report(query_params)
+            await self.build_attendance_special_allowance_report(query_params, writer)
         elif report_type == "other_special_allowance":
-            data = await self.build_other_special_allowance_report(query_params)
+            await self.build_other_special_allowance_report(query_params, writer)
         elif report_type == "leave":
-            data = await self.build_leave_report(query_params)
+            await self.build_leave_report(query_params, writer)
         elif report_type == "all":
-            workbooks = await self.build_all_report(query_params)
-
-            wb = openpyxl.Workbook()
-
-            wb.remove(wb.active)
-
-            for workbook in workbooks:
-                for sheet in workbook.worksheets:
-                    print(sheet.title)
-                    new_sheet = wb.create_sheet(sheet.title)
-
-                    for row in sheet.iter_rows():
-                        for cell in row:
-                            new_cell = new_sheet.cell(row=cell.row, column=cell.column)
-                            await self.copy_cell(cell, new_cell)
-
-            data = wb
-
+            await self.build_all_report(query_params, writer)
         else:
             raise HTTPException(status_code=501, detail="Not Implemented Yet!")
 
-        output = io.BytesIO()
+        # Zipping the workbook is blocking file I/O
+        return await asyncio.to_thread(writer.close)
 
-        data.save(output)
-
-        output.seek(0)
-
-        return output
-
-    async def download_bank_salary_report(self, query_params):
+    async def download_bank_salary_report(self, query_params, writer):
         check_query_params = all(key in query_params for key in ["batch_id"])
 
         if not check_query_params:
@@ -492,21 +459,15 @@ class AdminController:
         employee_ids = batch["employee_ids"]
         month = first_day_of_current_month()
 
-        data = await self.build_bank_salary_report(employee_ids, month)
-        return data
-        raise HTTPException(status_code=501, detail="Not Implemented Yet!")
+        await self.build_bank_salary_report(employee_ids, month, writer)
 
-    async def build_bank_salary_report(self, employee_ids, month):
+    async def build_bank_salary_report(self, employee_ids, month, writer):
         obj = AdminCrud(self.payload, self.mongo_client)
 
         data = await obj.get_bank_salary_data(employee_ids, month)
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        ws = writer.create_sheet("Bank Salary Report")
 
-        bold_font = Font(bold=True)
-
-        rows = []
         ws.append(["IFSC", "ACCOUNT NO", "NAME", "NET SALARY", "MONTH OF SALARY"])
 
         total = 0
@@ -522,21 +483,10 @@ class AdminController:
                 ]
             )
 
-        total_row_index = ws.max_row + 2
         ws.append(["", "", "", ""])
-        ws.append(["", "", "Total", total, ""])
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
-
-        output = io.BytesIO()
-
-        wb.save(output)
-
-        output.seek(0)
+        ws.append(["", "", "Total", total, ""], bold=True)
 
-        return output
-
-    async def build_salary_report(self, query_params):
+    async def build_salary_report(self, query_params, writer):
         try:
             datetime.datetime.strptime(query_params["month"], "%Y-%m")
         except ValueError:
@@ -588,59 +538,27 @@ class AdminController:
             "Net Salary": res["basic_salary"]["net_salary"],
         }
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Salary Report"
+        ws = writer.create_sheet("Salary Report")
 
-        ws.append(
-            [
-                "Salary Report",
-                " ",
-                query_params["employee_id"],
-                " ",
-                datetime.datetime.strptime(query_params["month"], "%Y-%m").strftime(
-                    "%B - %Y"
-                ),
-            ]
-        )
+        title = [
+            "Salary Report",
+            " ",
+            query_params["employee_id"],
+            " ",
+            datetime.datetime.strptime(query_params["month"], "%Y-%m").strftime(
+                "%B - %Y"
+            ),
+        ]
 
-        cell = ws.cell(row=1, column=1)
-        cell.font = Font(bold=True)
+        ws.append(title, bold=True)
 
         ws.append(["", ""])
 
-        # Define the color fills
-        green_font = Font(color="00FF00")
-        red_font = Font(color="FF0000")
-
-        # Fields that add to and subtract from the net salary
-        add_fields = [
-            "Gross Salary",
-            "Allowance",
-            "Increment",
-            "Bonus",
-            "Leave Cashback",
-            "Last Year Leave Cashback",
-            "Attendance Special Allowance",
-            "Other Special Allowance",
-            "OT",
-        ]
-        subtract_fields = ["PF", "ESI", "Loan", "Loss of Pay", "Salary Advance"]
-
         for key, value in data.items():
             ws.append([key, "", "", value])
-            # Apply green font for add fields and red font for subtract fields
-            # if key in add_fields:
-            #     ws[ws.max_row][3].font = green_font  # Apply font color to the value cell
-            # elif key in subtract_fields:
-            #     ws[ws.max_row][3].font = red_font  # Apply font color to the value cell
-
             ws.append(["", ""])
 
-        return wb
-
-    async def build_increment_report(self, query_params):
+    def get_financial_years(self, query_params):
         start_year = int(query_params["start_year"])
         end_year = int(query_params["end_year"])
 
@@ -652,307 +570,110 @@ class AdminController:
         start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
         end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
 
-        obj = AdminCrud(self.payload, self.mongo_client)
-
-        data = await obj.get_increment_report_data(start_date, end_date)
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Increment Report"
-
-        bold_font = Font(bold=True)
+        return start_date, end_date
 
+    async def write_amount_report(self, ws, label, cursor):
         ws.append(
             [
                 "Employee ID",
                 "Name",
-                "Increment Amount",
-                "Increment Month",
-                "Increment Date",
+                "{} Amount".format(label),
+                "{} Month".format(label),
+                "{} Date".format(label),
                 "Posted By",
             ]
         )
 
-        total = 0
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["amount"],
-                    i["month"],
-                    i["posted_at"],
-                    i["posted_by"],
-                ]
-            )
-            total += i["amount"]
-
-        total_row_index = ws.max_row + 2
+        total = await ws.append_cursor(
+            cursor,
+            lambda i: [
+                i["employee_id"],
+                i["name"],
+                i["amount"],
+                i["month"],
+                i["posted_at"],
+                i["posted_by"],
+            ],
+            total_field="amount",
+        )
 
         ws.append(["", "", "", ""])
-        ws.append(["", "Total", total, ""])
-
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
-
-        return wb
+        ws.append(["", "Total", total, ""], bold=True)
 
-    async def build_bonus_report(self, query_params):
-        start_year = int(query_params["start_year"])
-        end_year = int(query_params["end_year"])
-
-        if start_year > end_year:
-            raise HTTPException(
-                status_code=400, detail="Start year cannot be greater than end year"
-            )
-
-        start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
-        end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
+    async def build_increment_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
         obj = AdminCrud(self.payload, self.mongo_client)
 
-        data = await obj.get_bonus_report_data(start_date, end_date)
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        ws = writer.create_sheet("Increment Report")
 
-        ws.title = "Bonus Report"
-
-        bold_font = Font(bold=True)
-
-        ws.append(
-            [
-                "Employee ID",
-                "Name",
-                "Bonus Amount",
-                "Bonus Month",
-                "Bonus Date",
-                "Posted By",
-            ]
+        await self.write_amount_report(
+            ws,
+            "Increment",
+            await obj.get_increment_report_cursor(start_date, end_date),
         )
 
-        total = 0
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["amount"],
-                    i["month"],
-                    i["posted_at"],
-                    i["posted_by"],
-                ]
-            )
-            total += i["amount"]
-
-        total_row_index = ws.max_row + 2
-
-        ws.append(["", "", "", ""])
-        ws.append(["", "Total", total, ""])
-
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
-
-        return wb
-
-    async def build_allowance_report(self, query_params):
-        start_year = int(query_params["start_year"])
-        end_year = int(query_params["end_year"])
-
-        if start_year > end_year:
-            raise HTTPException(
-                status_code=400, detail="Start year cannot be greater than end year"
-            )
-
-        start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
-        end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
+    async def build_bonus_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
         obj = AdminCrud(self.payload, self.mongo_client)
 
-        data = await obj.get_allowance_report_data(start_date, end_date)
+        ws = writer.create_sheet("Bonus Report")
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Allowance Report"
-
-        bold_font = Font(bold=True)
-
-        ws.append(
-            [
-                "Employee ID",
-                "Name",
-                "Allowance Amount",
-                "Allowance Month",
-                "Allowance Date",
-                "Posted By",
-            ]
+        await self.write_amount_report(
+            ws,
+            "Bonus",
+            await obj.get_bonus_report_cursor(start_date, end_date),
         )
 
-        total = 0
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["amount"],
-                    i["month"],
-                    i["posted_at"],
-                    i["posted_by"],
-                ]
-            )
-            total += i["amount"]
-
-        total_row_index = ws.max_row + 2
-
-        ws.append(["", "", "", ""])
-        ws.append(["", "Total", total, ""])
-
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
-
-        return wb
-
-    async def build_attendance_special_allowance_report(self, query_params):
-        start_year = int(query_params["start_year"])
-        end_year = int(query_params["end_year"])
-
-        if start_year > end_year:
-            raise HTTPException(
-                status_code=400, detail="Start year cannot be greater than end year"
-            )
-
-        start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
-        end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
+    async def build_allowance_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
         obj = AdminCrud(self.payload, self.mongo_client)
 
-        data = await obj.get_attendance_special_allowance_report_data(
-            start_date, end_date
-        )
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Attendance Special Allowance Report"
+        ws = writer.create_sheet("Allowance Report")
 
-        bold_font = Font(bold=True)
-
-        ws.append(
-            [
-                "Employee ID",
-                "Name",
-                "Allowance Amount",
-                "Allowance Month",
-                "Allowance Date",
-                "Posted By",
-            ]
+        await self.write_amount_report(
+            ws,
+            "Allowance",
+            await obj.get_allowance_report_cursor(start_date, end_date),
         )
 
-        total = 0
-
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["amount"],
-                    i["month"],
-                    i["posted_at"],
-                    i["posted_by"],
-                ]
-            )
-            total += i["amount"]
-
-        total_row_index = ws.max_row + 2
-
-        ws.append(["", "", "", ""])
-        ws.append(["", "Total", total, ""])
-
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
-
-        return wb
-
-    async def build_other_special_allowance_report(self, query_params):
-        start_year = int(query_params["start_year"])
-        end_year = int(query_params["end_year"])
-
-        if start_year > end_year:
-            raise HTTPException(
-                status_code=400, detail="Start year cannot be greater than end year"
-            )
-
-        start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
-        end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
+    async def build_attendance_special_allowance_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
         obj = AdminCrud(self.payload, self.mongo_client)
 
-        data = await obj.get_other_special_allowance_report_data(start_date, end_date)
+        ws = writer.create_sheet("Attendance Special Allowance Report")
 
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Other Special Allowance Report"
-
-        bold_font = Font(bold=True)
-
-        ws.append(
-            [
-                "Employee ID",
-                "Name",
-                "Allowance Amount",
-                "Allowance Month",
-                "Allowance Date",
-                "Posted By",
-            ]
+        await self.write_amount_report(
+            ws,
+            "Allowance",
+            await obj.get_attendance_special_allowance_report_cursor(
+                start_date, end_date
+            ),
         )
 
-        total = 0
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["amount"],
-                    i["month"],
-                    i["posted_at"],
-                    i["posted_by"],
-                ]
-            )
-            total += i["amount"]
-
-        total_row_index = ws.max_row + 2
-
-        ws.append(["", "", "", ""])
-        ws.append(["", "Total", total, ""])
-
-        for cell in ws[total_row_index]:
-            cell.font = bold_font
+    async def build_other_special_allowance_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
-        return wb
+        obj = AdminCrud(self.payload, self.mongo_client)
 
-    async def build_leave_report(self, query_params):
-        start_year = int(query_params["start_year"])
-        end_year = int(query_params["end_year"])
+        ws = writer.create_sheet("Other Special Allowance Report")
 
-        if start_year > end_year:
-            raise HTTPException(
-                status_code=400, detail="Start year cannot be greater than end year"
-            )
+        await self.write_amount_report(
+            ws,
+            "Allowance",
+            await obj.get_other_special_allowance_report_cursor(start_date, end_date),
+        )
 
-        start_date = datetime.datetime(start_year, 4, 1, 0, 0, 0)
-        end_date = datetime.datetime(end_year, 3, 31, 0, 0, 0)
+    async def build_leave_report(self, query_params, writer):
+        start_date, end_date = self.get_financial_years(query_params)
 
         obj = AdminCrud(self.payload, self.mongo_client)
 
-        data = await obj.get_leave_report_data(start_date, end_date)
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-
-        ws.title = "Leave Report"
+        ws = writer.create_sheet("Leave Report")
+        permission_ws = writer.create_sheet("Permission Report")
 
         ws.append(
             [
@@ -969,31 +690,7 @@ class AdminController:
             ]
         )
 
-        for i in data:
-            ws.append(
-                [
-                    i["employee_id"],
-                    i["name"],
-                    i["leave_type"].capitalize(),
-                    i["start_date"],
-                    i["end_date"],
-                    i["no_of_days"],
-                    i["month"],
-                    i["approved_by"],
-                    i["reason"],
-                    i["remarks"],
-                ]
-            )
-
-        wb.create_sheet("Permission Report")
-        # Switch to the second sheet
-        ws = wb["Permission Report"]
-
-        data = await obj.get_permission_report_data(start_date, end_date)
-
-        ws.title = "Permission Report"
-
-        ws.append(
+        permission_ws.append(
             [
                 "Employee ID",
                 "Name",
@@ -1008,9 +705,25 @@ class AdminController:
             ]
         )
 
-        for i in data:
-            ws.append(
-                [
+        await asyncio.gather(
+            ws.append_cursor(
+                await obj.get_leave_report_cursor(start_date, end_date),
+                lambda i: [
+                    i["employee_id"],
+                    i["name"],
+                    i["leave_type"].capitalize(),
+                    i["start_date"],
+                    i["end_date"],
+                    i["no_of_days"],
+                    i["month"],
+                    i["approved_by"],
+                    i["reason"],
+                    i["remarks"],
+                ],
+            ),
+            permission_ws.append_cursor(
+                await obj.get_permission_report_cursor(start_date, end_date),
+                lambda i: [
                     i["employee_id"],
                     i["name"],
                     i["date"],
@@ -1021,20 +734,18 @@ class AdminController:
                     i["approved_by"],
                     i["reason"],
                     i["remarks"],
-                ]
-            )
+                ],
+            ),
+        )
 
-        return wb
-
-    async def build_all_report(self, query_params):
-        wb = []
-        print(query_params)
-        # wb.append(await self.build_salary_report(query_params))
-        wb.append(await self.build_increment_report(query_params))
-        wb.append(await self.build_bonus_report(query_params))
-        wb.append(await self.build_allowance_report(query_params))
-        wb.append(await self.build_attendance_special_allowance_report(query_params))
-        wb.append(await self.build_other_special_allowance_report(query_params))
-        wb.append(await self.build_leave_report(query_params))
-        print(wb)
-        return wb
+    async def build_all_report(self, query_params, writer):
+        # The sheets come out in this order, see ReportWriter.create_sheet
+        await asyncio.gather(
+            # self.build_salary_report(query_params, writer),
+            self.build_increment_report(query_params, writer),
+            self.build_bonus_report(query_params, writer),
+            self.build_allowance_report(query_params, writer),
+            self.build_attendance_special_allowance_report(query_params, writer),
+            self.build_other_special_allowance_report(query_params, writer),
+            self.build_leave_report(query_params, writer),
+        )
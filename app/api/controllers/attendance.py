@@ -1,4 +1,61 @@
+from fastapi import HTTPException
+
 from app.database import AsyncIOMotorClient
+from app.core.config import Config
+from app.api.crud import attendance as attendance_crud
+from app.api.lib.Attendance import STATUSES, attendance_stats
+from app.api.lib.ReportWriter import ReportWriter
+
+import asyncio
+import datetime
+
+# Day by day views are bounded so one request reads at most a year of months
+MAX_RANGE_DAYS = 366
+
+
+def parse_range(month=None, start_date=None, end_date=None):
+    """The inclusive (start, end) datetimes of a query, either a YYYY-MM month
+    or a start_date/end_date pair. Defaults to the current month."""
+
+    if month:
+        try:
+            start = datetime.datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Date format is incorrect. Expected format: YYYY-MM",
+            )
+
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+        return start, end - datetime.timedelta(days=1)
+
+    if start_date or end_date:
+        if not (start_date and end_date):
+            raise HTTPException(
+                status_code=400, detail="start_date and end_date go together"
+            )
+
+        start = datetime.datetime.combine(start_date, datetime.time.min)
+        end = datetime.datetime.combine(end_date, datetime.time.min)
+
+        if start > end:
+            raise HTTPException(
+                status_code=400, detail="start_date must not be after end_date"
+            )
+        if (end - start).days >= MAX_RANGE_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail="Range must not exceed {} days".format(MAX_RANGE_DAYS),
+            )
+
+        return start, end
+
+    today = datetime.datetime.now()
+    return parse_range(month=today.strftime("%Y-%m"))
+
+
+def with_stats(counts):
+    return {**counts, **attendance_stats(counts)}
 
 
 class AttendanceController:
@@ -9,7 +66,146 @@ class AttendanceController:
         self.primary_role = payload["primary_role"]
         self.branch = payload["branch"]
 
+    def check_employee(self, employee_id):
+        if not self.primary_role in ["HR", "MD"] and employee_id != self.employee_id:
+            raise HTTPException(status_code=403, detail="Forbidden")
+
+    def check_branch(self, branch):
+        if branch not in Config.BRANCHES:
+            raise HTTPException(status_code=404, detail="Branch not found")
+
+        # HR sees their own branch, MD every branch
+        if self.primary_role == "MD":
+            return
+        if self.primary_role == "HR" and branch == self.branch:
+            return
+
+        raise HTTPException(status_code=403, detail="Forbidden")
+
     async def get_attendance(self, employee_id, **kwargs):
-        start_date = kwargs.get("start_date")
-        end_date = kwargs.get("end_date")
-        month = kwargs.get("month")
+        """Day by day statuses with the range's counts"""
+
+        self.check_employee(employee_id)
+
+        start, end = parse_range(**kwargs)
+
+        months = await attendance_crud.get_attendance_range(
+            employee_id, start, end, self.mongo_client
+        )
+
+        days = [day for month in months for day in month["days"]]
+
+        return {
+            "employee_id": employee_id,
+            "start_date": start,
+            "end_date": end,
+            "days": days,
+            **with_stats(
+                {status: sum(m[status] for m in months) for status in STATUSES}
+            ),
+        }
+
+    async def get_attendance_summary(self, employee_id, **kwargs):
+        self.check_employee(employee_id)
+
+        start, end = parse_range(**kwargs)
+
+        res = await attendance_crud.get_attendance_counts(
+            [employee_id], start, end, self.mongo_client
+        )
+
+        counts = res[0] if res else {status: 0 for status in STATUSES}
+
+        return {
+            "employee_id": employee_id,
+            "start_date": start,
+            "end_date": end,
+            **with_stats({status: counts[status] for status in STATUSES}),
+        }
+
+    async def get_branch_attendance(self, branch, **kwargs):
+        """Counts for every employee of the branch over the range, zero for
+        employees with no attendance marked in it"""
+
+        self.check_branch(branch)
+
+        start, end = parse_range(**kwargs)
+
+        employees = await attendance_crud.get_branch_employees(
+            branch, self.mongo_client
+        )
+
+        return {
+            "branch": branch,
+            "start_date": start,
+            "end_date": end,
+            "employees": [
+                {**row, **attendance_stats(row)}
+                async for row in attendance_crud.stream_branch_attendance_counts(
+                    employees, start, end, self.mongo_client
+                )
+            ],
+        }
+
+    async def export_branch_attendance(self, branch, format="xlsx", **kwargs):
+        """The branch counts as a spreadsheet, written row by row from the
+        aggregation cursor so memory does not grow with the branch size"""
+
+        self.check_branch(branch)
+
+        start, end = parse_range(**kwargs)
+
+        writer = ReportWriter(
+            format,
+            filename="attendance_{}_{}_{}".format(
+                branch, start.strftime("%Y%m%d"), end.strftime("%Y%m%d")
+            ),
+        )
+
+        employees = await attendance_crud.get_branch_employees(
+            branch, self.mongo_client
+        )
+
+        ws = writer.create_sheet("Attendance Report")
+
+        ws.append(
+            [
+                "Attendance Report",
+                branch,
+                "{} - {}".format(start.strftime("%d %b %Y"), end.strftime("%d %b %Y")),
+            ],
+            bold=True,
+        )
+        ws.append(
+            [
+                "Employee ID",
+                "Name",
+                "Present",
+                "Absent",
+                "Holiday",
+                "Working Days",
+                "Present %",
+            ],
+            bold=True,
+        )
+
+        def to_row(doc):
+            stats = attendance_stats(doc)
+            return [
+                doc["employee_id"],
+                doc.get("name"),
+                doc["present"],
+                doc["absent"],
+                doc["holiday"],
+                stats["total_working_days"],
+                round(stats["present_percentage"], 2),
+            ]
+
+        await ws.append_cursor(
+            attendance_crud.stream_branch_attendance_counts(
+                employees, start, end, self.mongo_client
+            ),
+            to_row,
+        )
+
+        return await asyncio.to_thread(writer.close)
@@ -3,6 +3,8 @@ from app.database import AsyncIOMotorClient
 
 from app.api.crud import auth as auth_crud
 from app.api.crud import employees as employee_crud
+from app.api.crud import attendance as attendance_crud
+from app.api.lib.Attendance import attendance_stats
 
 from app.api.utils.employees import *
 
@@ -10,9 +12,9 @@ from app.api.utils.employees import verify_password
 from app.schemas.salary import SalaryBase, MonthlyCompensationBase, SalaryIncentivesBase
 from app.api.utils import *
 
-from app.api.lib.MinIO import MinIO
+from app.api.lib.MinIO import storage
 
-from app.api.lib.RabbitMQ import RabbitMQ
+from app.api.lib.Publisher import publisher
 
 from app.api.lib.SendGrid import SendGrid
 
@@ -77,12 +79,11 @@ async def login(login_request, mongo_client: AsyncIOMotorClient):
 
     bind_key.append(user["employee_id"])
 
-    mq = RabbitMQ()
-    mq.ensure_queue("notifications_employee_{}".format(user["uuid"]))
+    await publisher.ensure_queue("notifications_employee_{}".format(user["uuid"]))
     for key in bind_key:
         if key == "HR":
             key = "HR_{}".format(user["info"]["branch"].replace(" ", "_"))
-        mq.bind_queue(
+        await publisher.bind_queue(
             "notifications_employee_{}".format(user["uuid"]),
             "employee_notification",
             key,
@@ -90,20 +91,14 @@ async def login(login_request, mongo_client: AsyncIOMotorClient):
 
     # Update profile pre-signed url
 
-    minio = MinIO()
-
     try:
-        object = minio.client.stat_object(
-            Config.MINIO_BUCKET, user["info"]["profile_image_path"]
-        )
+        object = await storage.stat(user["info"]["profile_image_path"])
     except:
         object = None
 
     if object:
-        profile_image_pre_signed_url = minio.client.presigned_get_object(
-            Config.MINIO_BUCKET,
-            user["info"]["profile_image_path"],
-            expires=timedelta(days=1),
+        profile_image_pre_signed_url = storage.presigned_url(
+            user["info"]["profile_image_path"]
         )
 
         await auth_crud.update_profile_pre_signed_url(
@@ -303,9 +298,10 @@ async def assign_role(role_req, mongo_client: AsyncIOMotorClient, payload):
         elif role_req.role == "employee":
             bind_key = employee["employee_id"]
 
-        mq = RabbitMQ()
-        mq.ensure_queue("notifications_employee_{}".format(employee["uuid"]))
-        mq.bind_queue(
+        await publisher.ensure_queue(
+            "notifications_employee_{}".format(employee["uuid"])
+        )
+        await publisher.bind_queue(
             "notifications_employee_{}".format(employee["uuid"]),
             "employee_notification",
             bind_key,
@@ -407,9 +403,10 @@ async def remove_role(role_req, mongo_client: AsyncIOMotorClient, payload):
         elif role_req.role == "employee":
             bind_key = employee["employee_id"]
 
-        mq = RabbitMQ()
-        mq.ensure_queue("notifications_employee_{}".format(employee["uuid"]))
-        mq.unbind_queue(
+        await publisher.ensure_queue(
+            "notifications_employee_{}".format(employee["uuid"])
+        )
+        await publisher.unbind_queue(
             "notifications_employee_{}".format(employee["uuid"]),
             "employee_notification",
             bind_key,
@@ -464,32 +461,11 @@ async def remove_role(role_req, mongo_client: AsyncIOMotorClient, payload):
 
 
 async def compute_attendance(
-    self,
     employee_id,
     month,
     mongo_client: AsyncIOMotorClient,
 ):
     attendance = await attendance_crud.get_attendance(employee_id, month, mongo_client)
 
-    total_working_days = total_present_days = total_absent_days = 0
-
-    for day in attendance:
-        if day["is_holiday"]:
-            total_working_days += 1
-            continue
-
-        if day["is_present"]:
-            total_working_days += 1
-            total_present_days += 1
-        else:
-            total_working_days += 1
-            total_absent_days += 1
-
-    present_percentage = (total_present_days / total_working_days) * 100
-
-    return {
-        "total_working_days": total_working_days,
-        "total_present_days": total_present_days,
-        "total_absent_days": total_absent_days,
-        "present_percentage": present_percentage,
-    }
+    # Holidays are not working days
+    return attendance_stats(attendance)
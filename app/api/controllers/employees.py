@@ -14,14 +14,19 @@ from app.core.config import Config
 from app.api.utils import *
 
 
-from app.api.lib.RabbitMQ import RabbitMQ
-from app.api.lib.MinIO import MinIO
+from app.api.lib.Publisher import publisher
+from app.api.lib.MinIO import storage
+from app.api.lib.ProfileImage import (
+    profile_images,
+    read_capped,
+    sniff,
+    profile_image_prefix,
+    variant_path,
+)
 from app.api.lib.SendGrid import SendGrid
 
 import asyncio
-
-
-from datetime import timedelta
+import io
 
 
 MONGO_DATABASE = Config.MONGO_DATABASE
@@ -29,17 +34,6 @@ LEAVE_COLLECTION = Config.LEAVE_COLLECTION
 ATTENDANCE_COLLECTION = Config.ATTENDANCE_COLLECTION
 
 
-async def get_file_size(file: UploadFile):
-    # Seek to the end of the file to find its size
-    await file.seek(0, 2)  # Seek to the end of the file
-    file_size = file.tell()  # Get the file size
-
-    # Seek back to the start of the file for future operations
-    await file.seek(0)
-
-    return file_size
-
-
 class EmployeeController:
     def __init__(self, payload, mongo_client: AsyncIOMotorClient):
         self.payload = payload
@@ -51,31 +45,61 @@ class EmployeeController:
         return Config.BRANCH_DROPDOWN
 
     async def upload_profile_image(self, employee_id, file: UploadFile = File(...)):
-        if file.content_type not in ["image/jpeg", "image/png"]:
+        data = await read_capped(file)
+
+        # Trust the bytes, not the client supplied content type
+        if not sniff(data[:16]):
             raise HTTPException(
-                status_code=400, detail="Only JPEG and PNG images are allowed"
+                status_code=400, detail="Only JPEG, PNG and WebP images are allowed"
             )
 
-        minio_client = MinIO()
+        variants = await profile_images.render(data)
 
-        file_extension = file.content_type.split("/")[1]
-        file_name = f"{employee_id}"
-        object_name = f"profile/{file_name}"
+        prefix = profile_image_prefix(employee_id)
 
-        result = minio_client.client.put_object(
-            minio_client.bucket_name,
-            object_name,
-            file.file,
-            length=-1,
-            content_type=file.content_type,
-            part_size=15 * 1024 * 1024,
+        await asyncio.gather(
+            *[
+                storage.put(
+                    "{}/{}.webp".format(prefix, name),
+                    io.BytesIO(body),
+                    length=len(body),
+                    content_type="image/webp",
+                )
+                for name, body in variants.items()
+            ]
         )
 
-        file_path = f"{minio_client.bucket_name}/{object_name}"
+        object_name = "{}/original.webp".format(prefix)
 
-        file_path = "salary-management/profile/{}".format(file_name)
+        await employee_crud.update_employee(
+            employee_id,
+            {
+                "profile_image_path": object_name,
+                "profile_image": storage.presigned_url(object_name),
+            },
+            self.mongo_client,
+        )
 
-        return file_path
+        return "{}/{}".format(storage.bucket_name, object_name)
+
+    async def get_avatars(self, employee_ids, size="64"):
+        """Presigned avatar URL per employee id, None when there is no image.
+        One query for the paths; the URLs are signed locally."""
+
+        paths = {
+            employee_id: variant_path(path, size)
+            for employee_id, path in (
+                await employee_crud.get_profile_image_paths(
+                    employee_ids, self.mongo_client
+                )
+            ).items()
+        }
+        urls = storage.presigned_urls(paths.values())
+
+        return {
+            employee_id: urls.get(paths.get(employee_id))
+            for employee_id in employee_ids
+        }
 
     async def set_branch(self, employee_id, branch):
         if not self.employee_role in ["MD"]:
@@ -208,8 +232,8 @@ class EmployeeController:
 
             # Add the MD id as marketing manager
 
-        emp_in_create.profile_image_path = "profile/{}".format(
-            emp_in_create.employee_id
+        emp_in_create.profile_image_path = "{}/original.webp".format(
+            profile_image_prefix(emp_in_create.employee_id)
         )
 
         emp, user = await employee_crud.create_employee(
@@ -229,12 +253,12 @@ class EmployeeController:
 
         # await sal_obj.create_all_salaries(emp_in_create)
 
-        mq = RabbitMQ()
-
         queue_name = "notifications_employee_{}".format(user.uuid)
 
-        mq.ensure_queue(queue_name)
-        mq.bind_queue(queue_name, "employee_notification", emp["employee_id"])
+        await publisher.ensure_queue(queue_name)
+        await publisher.bind_queue(
+            queue_name, "employee_notification", emp["employee_id"]
+        )
 
         # TODO: Push notification to MD regarding new employee creation
 
@@ -312,16 +336,10 @@ class EmployeeController:
         if not is_valid:
             raise HTTPException(status_code=400, detail=message)
         # FIXME: Update salary if needed
-        minio = MinIO()
-
-        profile_image_pre_signed_url = minio.client.presigned_get_object(
-            Config.MINIO_BUCKET,
-            emp["profile_image_path"],
-            expires=timedelta(days=1),
+        emp_in_update["profile_image"] = storage.presigned_url(
+            emp["profile_image_path"]
         )
 
-        emp_in_update["profile_image"] = profile_image_pre_signed_url
-
         emp = await employee_crud.update_employee(
             employee_id, emp_in_update, self.mongo_client
         )
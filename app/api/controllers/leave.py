@@ -29,18 +29,18 @@ class LeaveController:
         self.employee_name = payload["employee_name"]
         self.mongo_client = mongo_client
 
-    async def get_leave_history(self, employee_id, status):
+    async def get_leave_history(self, employee_id, status, page):
         if not self.employee_role in ["HR", "MD"] and employee_id != self.employee_id:
             raise HTTPException(status_code=403, detail="Not enough permissions")
         return await leave_crud.get_leave_history(
-            employee_id, status, self.mongo_client
+            employee_id, status, page, self.mongo_client
         )
 
-    async def get_permission_history(self, employee_id, status):
+    async def get_permission_history(self, employee_id, status, page):
         if not self.employee_role in ["HR", "MD"] and employee_id != self.employee_id:
             raise HTTPException(status_code=403, detail="Not enough permissions")
         return await leave_crud.get_permission_history(
-            employee_id, status, self.mongo_client
+            employee_id, status, page, self.mongo_client
         )
 
     async def get_leave(self, leave_id):
@@ -10,6 +10,7 @@ from fastapi import HTTPException
 from app.api.crud import loan as loan_crud
 from app.api.crud import employees as employee_crud
 from app.api.crud import auth as auth_crud
+from app.api.lib.LoanSchedule import check_terms
 
 
 from app.api.lib.Notification import Notification
@@ -28,10 +29,12 @@ class LoanController:
         self.employee_name = payload["employee_name"]
         self.mongo_client = mongo_client
 
-    async def get_loan_history(self, employee_id, status):
+    async def get_loan_history(self, employee_id, status, page):
         if not self.employee_role in ["HR", "MD"] and employee_id != self.employee_id:
             raise HTTPException(status_code=403, detail="Not enough permissions")
-        return await loan_crud.get_loan_history(employee_id, status, self.mongo_client)
+        return await loan_crud.get_loan_history(
+            employee_id, status, page, self.mongo_client
+        )
 
     # @role_required(["MD"])
     async def post_loan(
@@ -39,6 +42,7 @@ class LoanController:
         LoanCreateRequest: LoanCreateRequest,
     ):
         loan_in_create = LoanBase(**LoanCreateRequest.model_dump())
+        check_terms(loan_in_create.amount, loan_in_create.emi, loan_in_create.tenure)
 
         emp = await employee_crud.get_employee(
             loan_in_create.employee_id, self.mongo_client
@@ -89,6 +93,7 @@ class LoanController:
         LoanCreateRequest: LoanCreateRequest,
     ):
         loan_in_create = LoanBase(**LoanCreateRequest.model_dump())
+        check_terms(loan_in_create.amount, loan_in_create.emi, loan_in_create.tenure)
         emp = await employee_crud.get_employee(
             loan_in_create.employee_id, self.mongo_client
         )
@@ -186,10 +191,6 @@ class LoanController:
         res = await loan_crud.respond_loan(
             loan_respond_request, self.mongo_client, self.employee_id
         )
-        if res["status"] == "approved":
-            repayment_schedule = await loan_crud.build_repayment_schedule(
-                res, self.mongo_client
-            )
         res["loan_id"] = res["id"]
 
         user = await auth_crud.get_user_with_employee_id(
@@ -0,0 +1,42 @@
+from app.database import AsyncIOMotorClient
+from fastapi import HTTPException
+
+from app.api.crud import notifications as notification_crud
+from app.api.utils.notifications import notification_targets
+
+
+class NotificationController:
+    """Inbox of the logged in employee: notifications addressed to their
+    employee id plus the ones for their role (MD, HR_<branch>). Role
+    notifications are shared, so reading one marks it read for the role.
+    """
+
+    def __init__(self, payload, mongo_client: AsyncIOMotorClient):
+        self.payload = payload
+        self.employee_id = payload["employee_id"]
+        self.targets = notification_targets(payload)
+        self.mongo_client = mongo_client
+
+    async def get_notifications(self, status, limit, cursor):
+        if status and status not in notification_crud.STATUSES:
+            raise HTTPException(status_code=400, detail="Invalid status")
+
+        notifications, next_cursor = await notification_crud.get_notifications(
+            self.targets, status, limit, cursor, self.mongo_client
+        )
+
+        return {
+            "notifications": notifications,
+            "next_cursor": next_cursor,
+            "unread": await self.get_unread_count(),
+        }
+
+    async def get_unread_count(self):
+        return await notification_crud.count_unread(self.targets, self.mongo_client)
+
+    async def mark_as_read(self, ids):
+        updated = await notification_crud.mark_as_read(
+            ids, self.targets, self.employee_id, self.mongo_client
+        )
+
+        return {"updated": updated, "unread": await self.get_unread_count()}
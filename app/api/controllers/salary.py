@@ -23,6 +23,7 @@ from app.api.crud import employees as employee_crud
 from app.api.crud import auth as auth_crud
 
 from app.api.lib.Notification import Notification
+from app.api.lib.EmployeeSummary import EmployeeSummary
 from app.schemas.notification import (
     NotificationBase,
     SendNotification,
@@ -188,37 +189,9 @@ class SalaryController:
             exclude={"employee_id"}
         )
 
-        monthly_leave_days = (
-            total_leave_days
-        ) = total_permission_hours = monthly_permission_hours = 0
-
-        current_month = first_day_of_current_month()
-
-        docs = self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find(
-            {
-                "employee_id": employee_id,
-                "status": "approved",
-            }
-        )
-
-        async for i in docs:
-            if i["leave_type"] == "permission":
-                if i["month"] == current_month:
-                    monthly_permission_hours += i["no_of_hours"]
-                total_permission_hours += i["no_of_hours"]
-            else:
-                if i["month"] == current_month:
-                    monthly_leave_days += i["no_of_days"]
-                total_leave_days += i["no_of_days"]
-
-        monthly_permission_hours = "{} Hours {} Minutes".format(
-            str(datetime.timedelta(hours=monthly_permission_hours)).split(":")[0],
-            str(datetime.timedelta(hours=monthly_permission_hours)).split(":")[1],
-        )
-        total_permission_hours = "{} Hours {} Minutes".format(
-            str(datetime.timedelta(hours=total_permission_hours)).split(":")[0],
-            str(datetime.timedelta(hours=total_permission_hours)).split(":")[1],
-        )
+        leaves_and_permissions, _ = await EmployeeSummary(
+            self.mongo_client
+        ).leaves_and_attendance(employee_id, first_day_of_current_month())
 
         res = {
             "basic_salary": {k: v for k, v in salary_base.items()},
@@ -226,12 +199,7 @@ class SalaryController:
                 k: v for k, v in monthly_compensation_base.items()
             },
             "salary_incentives": {k: v for k, v in salary_incentives_base.items()},
-            "leaves_and_permissions": {
-                "total_leave_days": total_leave_days,
-                "monthly_leave_days": monthly_leave_days,
-                "total_permission_hours": total_permission_hours,
-                "monthly_permission_hours": monthly_permission_hours,
-            },
+            "leaves_and_permissions": leaves_and_permissions,
         }
 
         if self.employee_role == "employee" and self.employee_id != employee_id:
@@ -245,18 +213,18 @@ class SalaryController:
 
         return res
 
-    async def get_salary_advance_history(self, employee_id: str, status):
+    async def get_salary_advance_history(self, employee_id: str, status, page):
         if not self.employee_role in ["MD"] and employee_id != self.employee_id:
             raise HTTPException(status_code=403, detail="Not enough permissions")
-        res = await salary_crud.get_salary_advance_history(
-            employee_id, status, self.mongo_client
+        res, next_cursor = await salary_crud.get_salary_advance_history(
+            employee_id, status, page, self.mongo_client
         )
         for i in res:
             i["requested_date"] = datetime.datetime.strftime(
                 i["requested_at"], "%d-%m-%Y"
             )
 
-        return res
+        return res, next_cursor
 
     async def get_salary_history(self, employee_id: str):
         if not self.employee_role in ["MD", "HR"] and employee_id != self.employee_id:
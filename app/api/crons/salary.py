@@ -3,87 +3,213 @@ from app.database import AsyncIOMotorClient
 import pprint
 from app.api.utils import *
 import uuid
+import time
 
-from app.schemas.salary import SalaryBase
-from app.schemas.db import SalaryInDB
+import numpy as np
+import pandas as pd
+from pymongo import ReplaceOne
+
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
+from app.api.lib.JobLedger import JobLedger
 
 MONGO_DATABASE = Config.MONGO_DATABASE
 EMPLOYEE_COLLECTION = Config.EMPLOYEE_COLLECTION
 SALARY_COLLECTION = Config.SALARY_COLLECTION
 MONTHLY_COMPENSATION_COLLECTION = Config.MONTHLY_COMPENSATION_COLLECTION
 SALARY_INCENTIVES_COLLECTION = Config.SALARY_INCENTIVES_COLLECTION
+JOB_BATCH_SIZE = Config.JOB_BATCH_SIZE
+
+SALARY_COLUMNS = ["employee_id", "month", "gross_salary", "pf", "esi", "created_by"]
 
 
 class SalaryCron:
     def __init__(self, mongo_client: AsyncIOMotorClient):
         self.mongo_client = mongo_client
-
-    async def build_new_salary(self, current_salary, incentives):
-        new_gross = current_salary["gross_salary"] + incentives["increment"]
-
-        new_salary = SalaryBase(
-            employee_id=current_salary["employee_id"],
-            gross_salary=new_gross,
-            esi=current_salary["esi"],
-            pf=current_salary["pf"],
+        self.db = mongo_client[MONGO_DATABASE]
+
+    async def prefetch(self, month, next_month):
+        employee_ids = await self.db[EMPLOYEE_COLLECTION].distinct("employee_id")
+
+        # Current and next month in one range query, the next month rows are
+        # only needed to report what the run is going to change
+        salary_rows = (
+            await self.db[SALARY_COLLECTION]
+            .find(
+                {"month": {"$gte": month, "$lte": next_month}},
+                {"_id": 0, **{k: 1 for k in SALARY_COLUMNS}},
+            )
+            .to_list(None)
         )
 
-        new_month, new_year = get_next_month(
-            current_salary["month"].month, current_salary["month"].year
+        incentive_rows = (
+            await self.db[SALARY_INCENTIVES_COLLECTION]
+            .find(
+                {"month": {"$gte": month, "$lt": next_month}},
+                {"_id": 0, "employee_id": 1, "increment": 1},
+            )
+            .to_list(None)
         )
-        new_month_date = datetime.datetime(new_year, new_month, 1)
 
-        new_salary_in_db = SalaryInDB(
-            **new_salary.model_dump(),
-            month=new_month_date,
-            created_by=current_salary["created_by"]
+        return employee_ids, salary_rows, incentive_rows
+
+    def compute(self, employee_ids, salary_rows, incentive_rows, month, next_month):
+        salary = pd.DataFrame(salary_rows, columns=SALARY_COLUMNS)
+
+        current = (
+            salary[salary["month"] == month]
+            .drop_duplicates("employee_id")
+            .set_index("employee_id")
+            .reindex(employee_ids)
+        )
+        existing = (
+            salary[salary["month"] == next_month]
+            .drop_duplicates("employee_id")
+            .set_index("employee_id")
+            .reindex(employee_ids)
         )
+        increment = (
+            pd.DataFrame(incentive_rows, columns=["employee_id", "increment"])
+            .drop_duplicates("employee_id")
+            .set_index("employee_id")["increment"]
+            .reindex(employee_ids)
+        )
+
+        frame = pd.DataFrame(index=pd.Index(employee_ids, name="employee_id"))
 
-        return new_salary_in_db.model_dump()
+        for column in ["gross_salary", "pf", "esi"]:
+            frame[column] = pd.to_numeric(current[column]).fillna(0.0)
 
-    async def update_basic_salary(self):
-        employee_list = (
-            await self.mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION]
-            .find({})
-            .to_list(length=None)
+        frame["created_by"] = current["created_by"].fillna("Cron")
+        frame["increment"] = pd.to_numeric(increment).fillna(0.0)
+        frame["new_gross_salary"] = frame["gross_salary"] + frame["increment"]
+        frame["existing_gross_salary"] = pd.to_numeric(existing["gross_salary"])
+        frame["changed"] = ~np.isclose(
+            frame["new_gross_salary"], frame["existing_gross_salary"]
         )
 
-        for emp in employee_list:
-            employee_id = emp["employee_id"]
+        return frame
+
+    def diff(self, frame):
+        changed = frame[frame["changed"]].reset_index()
+        changed = changed[
+            [
+                "employee_id",
+                "gross_salary",
+                "increment",
+                "existing_gross_salary",
+                "new_gross_salary",
+            ]
+        ]
+
+        return changed.astype(object).where(changed.notna(), None).to_dict("records")
+
+    async def apply(self, frame, next_month):
+        created_at = datetime.datetime.now()
+
+        operations = [
+            ReplaceOne(
+                {"employee_id": employee_id, "month": next_month},
+                {
+                    "id": uuid.uuid4().hex,
+                    "employee_id": employee_id,
+                    "gross_salary": row["new_gross_salary"],
+                    "pf": row["pf"],
+                    "esi": row["esi"],
+                    "month": next_month,
+                    "created_at": created_at,
+                    "created_by": row["created_by"],
+                    "updated_at": None,
+                    "updated_by": None,
+                },
+                upsert=True,
+            )
+            for employee_id, row in frame.to_dict("index").items()
+        ]
 
-            month = first_day_of_current_month()
+        if not operations:
+            return 0
 
-            basic_salary = await self.mongo_client[MONGO_DATABASE][
-                SALARY_COLLECTION
-            ].find_one({"employee_id": employee_id, "month": month}, {"_id": 0})
+        result = await self.db[SALARY_COLLECTION].bulk_write(operations, ordered=False)
 
-            if basic_salary is None:
-                basic_salary = SalaryBase(
-                    employee_id=employee_id, gross_salary=0, esi=0, pf=0
-                )
+        return result.upserted_count + result.modified_count
 
-                basic_salary_in_db = SalaryInDB(
-                    **basic_salary.model_dump(), month=month, created_by="Cron"
-                )
+    async def apply_in_batches(self, frame, next_month, ledger, cursor, timings):
+        # Sorted so the ledger cursor is a stable resume point
+        frame = frame.sort_index()
+
+        if cursor:
+            frame = frame[frame.index > cursor]
+
+        timings["apply"] = timings["snapshot"] = 0.0
+
+        for i in range(0, len(frame), JOB_BATCH_SIZE):
+            batch = frame.iloc[i : i + JOB_BATCH_SIZE]
 
-                basic_salary = basic_salary_in_db.model_dump()
+            start = time.perf_counter()
+            written = await self.apply(batch, next_month)
+            timings["apply"] += time.perf_counter() - start
 
-            incentives = await self.mongo_client[MONGO_DATABASE][
-                SALARY_INCENTIVES_COLLECTION
-            ].find_one(
-                {"employee_id": employee_id, "month": basic_salary["month"]},
-                {"_id": 0},
+            start = time.perf_counter()
+            await PayslipSnapshot(self.mongo_client).refresh_many(
+                next_month, list(batch.index)
             )
+            timings["snapshot"] += time.perf_counter() - start
 
-            if incentives is None:
-                incentives = {"increment": 0}
+            await ledger.checkpoint(
+                batch.index[-1], written=written, processed=len(batch)
+            )
 
-            new_salary = await self.build_new_salary(basic_salary, incentives)
+    async def update_basic_salary(self, dry_run=False):
+        timings = {}
 
-            await self.mongo_client[MONGO_DATABASE][
-                SALARY_COLLECTION
-            ].find_one_and_replace(
-                {"employee_id": employee_id, "month": new_salary["month"]},
-                new_salary,
-                upsert=True,
+        month = first_day_of_current_month()
+        next_month, next_year = get_next_month(month.month, month.year)
+        next_month = datetime.datetime(next_year, next_month, 1)
+
+        report = {"dry_run": dry_run, "month": next_month}
+
+        ledger = JobLedger(
+            self.mongo_client, "salary_increment", next_month.strftime("%Y-%m")
+        )
+
+        run = None
+
+        if not dry_run:
+            run = await ledger.acquire()
+
+            if run is None:
+                return {**report, "skipped": True, "run": await ledger.get()}
+
+        try:
+            start = time.perf_counter()
+            employee_ids, salary_rows, incentive_rows = await self.prefetch(
+                month, next_month
             )
+            timings["prefetch"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            frame = self.compute(
+                employee_ids, salary_rows, incentive_rows, month, next_month
+            )
+            diff = self.diff(frame)
+            timings["compute"] = time.perf_counter() - start
+
+            report.update({"employees": len(employee_ids), "diff": diff})
+
+            if not dry_run:
+                await self.apply_in_batches(
+                    frame, next_month, ledger, run["cursor"], timings
+                )
+        except Exception as e:
+            if run is not None:
+                await ledger.fail(e)
+            raise
+
+        report["timings"] = {
+            phase: round(seconds, 4) for phase, seconds in timings.items()
+        }
+
+        if not dry_run:
+            report["run"] = await ledger.complete(timings=report["timings"])
+
+        return report
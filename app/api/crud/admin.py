@@ -3,6 +3,8 @@ from app.database import get_mongo, AsyncIOMotorClient
 from app.core.config import Config
 
 from app.core import pipelines
+from app.api.lib.Payroll import Payroll
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
 
 import pprint
 
@@ -171,15 +173,7 @@ class AdminCrud:
         return {}
 
     async def get_salary_report(self, employee_id, month):
-        pipeline = await pipelines.get_employee_with_salary_details(employee_id, month)
-
-        # pprint.pprint(pipeline)
-
-        res = (
-            await self.mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
+        res = await self.get_bank_salary_data([employee_id], month)
 
         if res:
             return res[0]
@@ -187,117 +181,68 @@ class AdminCrud:
         return {}
 
     async def get_bank_salary_data(self, employee_ids, month):
-        pipeline = await pipelines.get_employee_with_salary_details(employee_ids, month)
+        employees = await Payroll(self.mongo_client).get_employees(
+            employee_ids=employee_ids
+        )
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
+        snapshots = await PayslipSnapshot(self.mongo_client).get_many(
+            [emp["employee_id"] for emp in employees], month
         )
 
+        res = [{**emp, **snapshots[emp["employee_id"]]} for emp in employees]
+
         if res:
             return res
 
         return []
 
-    async def get_increment_report_data(self, start_date, end_date):
+    async def get_increment_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_increment_report(start_date, end_date)
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][SALARY_INCENTIVES_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][
+            SALARY_INCENTIVES_COLLECTION
+        ].aggregate(pipeline)
 
-    async def get_bonus_report_data(self, start_date, end_date):
+    async def get_bonus_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_bonus_report(start_date, end_date)
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][SALARY_INCENTIVES_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][
+            SALARY_INCENTIVES_COLLECTION
+        ].aggregate(pipeline)
 
-    async def get_allowance_report_data(self, start_date, end_date):
+    async def get_allowance_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_allowance_report(start_date, end_date)
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][SALARY_INCENTIVES_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][
+            SALARY_INCENTIVES_COLLECTION
+        ].aggregate(pipeline)
 
-    async def get_attendance_special_allowance_report_data(self, start_date, end_date):
+    async def get_attendance_special_allowance_report_cursor(
+        self, start_date, end_date
+    ):
         pipeline = await pipelines.get_attendance_special_allowance_report(
             start_date, end_date
         )
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][MONTHLY_COMPENSATION_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][
+            MONTHLY_COMPENSATION_COLLECTION
+        ].aggregate(pipeline)
 
-    async def get_other_special_allowance_report_data(self, start_date, end_date):
+    async def get_other_special_allowance_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_other_special_allowance_report(
             start_date, end_date
         )
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][MONTHLY_COMPENSATION_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][
+            MONTHLY_COMPENSATION_COLLECTION
+        ].aggregate(pipeline)
 
-    async def get_leave_report_data(self, start_date, end_date):
+    async def get_leave_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_leave_report(start_date, end_date)
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].aggregate(pipeline)
 
-    async def get_permission_report_data(self, start_date, end_date):
+    async def get_permission_report_cursor(self, start_date, end_date):
         pipeline = await pipelines.get_permission_report(start_date, end_date)
 
-        res = (
-            await self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
-            .aggregate(pipeline)
-            .to_list(length=None)
-        )
-
-        if res:
-            return res
-
-        return []
+        return self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].aggregate(pipeline)
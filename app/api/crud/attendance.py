@@ -1,10 +1,93 @@
 from app.database import AsyncIOMotorClient
 
 from app.core.config import Config
+from app.core import pipelines
+from app.api.lib.Attendance import Attendance, STATUSES
 
 MONGO_DATABASE = Config.MONGO_DATABASE
-ATTENDANCE_COLLECTION = Config.ATTENDANCE_COLLECTION
+ATTENDANCE_MONTHLY_COLLECTION = Config.ATTENDANCE_MONTHLY_COLLECTION
+EMPLOYEE_COLLECTION = Config.EMPLOYEE_COLLECTION
 
 
 async def get_attendance(employee_id, month, mongo_client: AsyncIOMotorClient):
-    pass
+    """Day by day statuses and counts of one month"""
+
+    return await Attendance(mongo_client).get_attendance_by_month(employee_id, month)
+
+
+async def get_attendance_range(
+    employee_id, start_date, end_date, mongo_client: AsyncIOMotorClient
+):
+    """One month view per month touched by the range, clipped to the range"""
+
+    return await Attendance(mongo_client).get_attendance_by_month_range(
+        employee_id, start_date, end_date, start_date=start_date, end_date=end_date
+    )
+
+
+async def get_attendance_counts(
+    employee_ids, start_date, end_date, mongo_client: AsyncIOMotorClient
+):
+    """Present, absent and holiday days per employee over the range"""
+
+    return (
+        await mongo_client[MONGO_DATABASE][ATTENDANCE_MONTHLY_COLLECTION]
+        .aggregate(
+            await pipelines.get_attendance_counts(employee_ids, start_date, end_date)
+        )
+        .to_list(None)
+    )
+
+
+async def stream_attendance_counts(
+    employee_ids, start_date, end_date, mongo_client: AsyncIOMotorClient
+):
+    """get_attendance_counts as a cursor, for exports that write row by row"""
+
+    return mongo_client[MONGO_DATABASE][ATTENDANCE_MONTHLY_COLLECTION].aggregate(
+        await pipelines.get_attendance_counts(employee_ids, start_date, end_date),
+        batchSize=500,
+    )
+
+
+async def get_branch_employees(branch, mongo_client: AsyncIOMotorClient):
+    """employee_id and name of every employee of the branch, by employee_id"""
+
+    employees = {}
+
+    async for doc in mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].find(
+        {"branch": branch}, {"_id": 0, "employee_id": 1, "name": 1}
+    ).sort("employee_id", 1):
+        employees.setdefault(doc["employee_id"], doc)
+
+    return list(employees.values())
+
+
+async def stream_branch_attendance_counts(
+    employees, start_date, end_date, mongo_client: AsyncIOMotorClient
+):
+    """Counts of every employee in employees, in employee_id order. The
+    aggregation only has rows for employees with attendance in the range;
+    the rest are filled in with zero counts."""
+
+    cursor = await stream_attendance_counts(
+        [employee["employee_id"] for employee in employees],
+        start_date,
+        end_date,
+        mongo_client,
+    )
+
+    i = 0
+
+    async for row in cursor:
+        while i < len(employees) and employees[i]["employee_id"] < row["employee_id"]:
+            yield {**employees[i], **{status: 0 for status in STATUSES}}
+            i += 1
+
+        if i < len(employees) and employees[i]["employee_id"] == row["employee_id"]:
+            i += 1
+
+        yield row
+
+    for employee in employees[i:]:
+        yield {**employee, **{status: 0 for status in STATUSES}}
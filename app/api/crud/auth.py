@@ -1,6 +1,7 @@
 from app.database import AsyncIOMotorClient
 
 from app.core.config import Config
+from app.api.lib.UserCache import user_cache
 
 MONGO_DATABASE = Config.MONGO_DATABASE
 USERS_COLLECTION = Config.USERS_COLLECTION
@@ -94,6 +95,7 @@ async def update_password(email, password, mongo: AsyncIOMotorClient):
     user = await mongo[MONGO_DATABASE][USERS_COLLECTION].update_one(
         {"email": email}, {"$set": {"password": password}}
     )
+    await user_cache.invalidate_where({"email": email}, mongo)
     if user:
         return user
     return False
@@ -124,7 +126,7 @@ async def delete_jwt_id(id, mongo_client):
 
 
 async def change_password(email, mongo_client):
-    return await mongo_client[MONGO_DATABASE][USERS_COLLECTION].update_one(
+    update = await mongo_client[MONGO_DATABASE][USERS_COLLECTION].update_one(
         {"email": email},
         {
             "$set": {
@@ -134,6 +136,10 @@ async def change_password(email, mongo_client):
         },
     )
 
+    await user_cache.invalidate_where({"email": email}, mongo_client)
+
+    return update
+
 
 async def get_logged_in_user(employee_id: str, mongo_client: AsyncIOMotorClient):
     emp = await mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].find_one(
@@ -169,6 +175,8 @@ async def assign_primary_role(employee_id, role_id, mongo_client):
         {"$set": {"primary_role": role_id}},
     )
 
+    await user_cache.invalidate_where({"employee_id": employee_id}, mongo_client)
+
     return update
 
 
@@ -178,6 +186,8 @@ async def assign_secondary_role(employee_id, role_id, mongo_client):
         {"$addToSet": {"secondary_roles": role_id}},
     )
 
+    await user_cache.invalidate_where({"employee_id": employee_id}, mongo_client)
+
     return update
 
 
@@ -187,6 +197,8 @@ async def remove_primary_role(employee_id, role_id, mongo_client):
         {"$set": {"primary_role": None}},
     )
 
+    await user_cache.invalidate_where({"employee_id": employee_id}, mongo_client)
+
     return remove
 
 
@@ -196,6 +208,8 @@ async def remove_secondary_role(employee_id, role_id, mongo_client):
         {"$pull": {"secondary_roles": role_id}},
     )
 
+    await user_cache.invalidate_where({"employee_id": employee_id}, mongo_client)
+
     return remove
 
 
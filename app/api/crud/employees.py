@@ -11,6 +11,8 @@ from fastapi import HTTPException
 from app.api.utils import *
 from datetime import datetime, timezone, timedelta
 from app.core import pipelines
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
+from app.api.lib.EmployeeSummary import EmployeeSummary
 
 
 MONGO_DATABASE = Config.MONGO_DATABASE
@@ -36,58 +38,13 @@ async def get_employee_with_computed_fields(employee_id, mongo_client, month=Non
     salary_incentives_base = SalaryIncentivesBase(**emp)
     salary_incentives_base = salary_incentives_base.model_dump(exclude={"employee_id"})
 
-    monthly_leave_days = (
-        total_leave_days
-    ) = total_permission_hours = monthly_permission_hours = 0
+    (
+        leaves_and_permissions,
+        attendance,
+    ) = await EmployeeSummary(
+        mongo_client
+    ).leaves_and_attendance(employee_id, first_day_of_current_month())
 
-    current_month = first_day_of_current_month()
-
-    docs = mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find(
-        {
-            "employee_id": employee_id,
-            "status": "approved",
-        }
-    )
-
-    async for i in docs:
-        if i["leave_type"] == "permission":
-            if i["month"] == current_month:
-                monthly_permission_hours += i["no_of_hours"]
-            total_permission_hours += i["no_of_hours"]
-        else:
-            if i["month"] == current_month:
-                monthly_leave_days += i["no_of_days"]
-            total_leave_days += i["no_of_days"]
-
-    monthly_permission_hours = "{} Hours {} Minutes".format(
-        str(timedelta(hours=monthly_permission_hours)).split(":")[0],
-        str(timedelta(hours=monthly_permission_hours)).split(":")[1],
-    )
-    total_permission_hours = "{} Hours {} Minutes".format(
-        str(timedelta(hours=total_permission_hours)).split(":")[0],
-        str(timedelta(hours=total_permission_hours)).split(":")[1],
-    )
-
-    last_day = last_day_of_current_month()
-    attendance = mongo_client[MONGO_DATABASE][ATTENDANCE_COLLECTION].find(
-        {"employee_id": employee_id, "date": {"$gte": current_month, "$lte": last_day}}
-    )
-    present = 0
-    absent = 0
-    async for i in attendance:
-        if i["status"] == "present":
-            present += 1
-        elif i["status"] == "absent":
-            absent += 1
-
-    total_working_days = present + absent
-    total_present_days = present
-    total_absent_days = absent
-    present_percentage = (
-        (present / total_working_days) * 100
-        if total_working_days != 0 and present != 0
-        else 0
-    )
     res = {
         "basic_information": {
             "employee_id": emp["employee_id"],
@@ -109,18 +66,8 @@ async def get_employee_with_computed_fields(employee_id, mongo_client, month=Non
             "loan": emp["loan"],
             "salary_advance": emp["salary_advance"],
         },
-        "leaves_and_permissions": {
-            "total_leave_days": total_leave_days,
-            "monthly_leave_days": monthly_leave_days,
-            "total_permission_hours": total_permission_hours,
-            "monthly_permission_hours": monthly_permission_hours,
-        },
-        "attendance": {
-            "total_working_days": total_working_days,
-            "total_present_days": total_present_days,
-            "total_absent_days": total_absent_days,
-            "present_percentage": present_percentage,
-        },
+        "leaves_and_permissions": leaves_and_permissions,
+        "attendance": attendance,
     }
 
     return res, emp
@@ -197,6 +144,17 @@ async def create_user(employee: dict, created_by, mongo_client: AsyncIOMotorClie
     return None
 
 
+async def get_profile_image_paths(employee_ids, mongo_client: AsyncIOMotorClient):
+    employees = mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].find(
+        {"employee_id": {"$in": employee_ids}},
+        {"_id": 0, "employee_id": 1, "profile_image_path": 1},
+    )
+
+    return {
+        emp["employee_id"]: emp.get("profile_image_path") async for emp in employees
+    }
+
+
 async def get_employee(employee_id: str, mongo_client: AsyncIOMotorClient):
     emp = await mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].find_one(
         {"employee_id": employee_id}, {"_id": 0}
@@ -217,27 +175,15 @@ async def get_employee_with_salary(
     else:
         current_month = month
 
-    # Change in pipeline should be done here
-    pipeline = await pipelines.get_employee_with_salary_details(
-        employee_id, current_month
-    )
-
-    emp = mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].aggregate(pipeline)
+    emp = await get_employee(employee_id, mongo_client)
 
-    data = [e async for e in emp]
-
-    if len(data) == 1:
-        return data[0]
-    elif len(data) > 1:
-        raise HTTPException(
-            status_code=404,
-            detail="Something went wrong, check get_employee function in crud/employees.py",
-        )
-    elif len(data) == 0:
+    if not emp:
         print("Employee not found")
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    return None
+    salary = await PayslipSnapshot(mongo_client).get(employee_id, current_month)
+
+    return {**emp, **salary}
 
 
 async def get_all_employees(mongo_client, **kwargs):
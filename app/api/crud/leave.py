@@ -4,6 +4,9 @@ from fastapi import HTTPException
 
 from app.schemas.leave import LeaveBase, PermissionBase
 from app.schemas.db import LeaveInDB, PermissionInDB
+from app.api.utils.history import HistoryPage, get_history
+from app.api.lib.EmployeeSummary import EmployeeSummary
+from app.api.lib.LeaveCalendar import LeaveCalendar
 
 import datetime
 
@@ -12,23 +15,56 @@ import uuid
 MONGO_DATABASE = Config.MONGO_DATABASE
 LEAVE_COLLECTION = Config.LEAVE_COLLECTION
 
-
-async def get_leave_history(employee_id, status, mongo_client: AsyncIOMotorClient):
-    leave_history = (
-        await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
-        .find(
-            {"employee_id": employee_id, "leave_type": {"$ne": "permission"}},
-            {"_id": 0},
-        )
-        .sort("requested_at", -1)
-        .to_list(length=100)
+# Fields the history lists show; the full record comes from get_leave and
+# get_permission
+LEAVE_HISTORY_PROJECTION = {
+    "id": 1,
+    "employee_id": 1,
+    "month": 1,
+    "status": 1,
+    "remarks": 1,
+    "requested_at": 1,
+    "requested_by": 1,
+    "approved_or_rejected_by": 1,
+    "approved_or_rejected_at": 1,
+    "leave_type": 1,
+    "start_date": 1,
+    "end_date": 1,
+    "no_of_days": 1,
+    "reason": 1,
+}
+
+PERMISSION_HISTORY_PROJECTION = {
+    "id": 1,
+    "employee_id": 1,
+    "month": 1,
+    "status": 1,
+    "remarks": 1,
+    "requested_at": 1,
+    "requested_by": 1,
+    "approved_or_rejected_by": 1,
+    "approved_or_rejected_at": 1,
+    "leave_type": 1,
+    "date": 1,
+    "start_time": 1,
+    "end_time": 1,
+    "no_of_hours": 1,
+    "reason": 1,
+}
+
+
+async def get_leave_history(
+    employee_id, status, page: HistoryPage, mongo_client: AsyncIOMotorClient
+):
+    return await get_history(
+        LEAVE_COLLECTION,
+        {"employee_id": employee_id, "leave_type": {"$ne": "permission"}},
+        LEAVE_HISTORY_PROJECTION,
+        status,
+        page,
+        mongo_client,
     )
 
-    if status:
-        leave_history = list(filter(lambda x: x["status"] == status, leave_history))
-
-    return leave_history
-
 
 async def get_leave(leave_id, mongo_client: AsyncIOMotorClient):
     leave = await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find_one(
@@ -40,21 +76,18 @@ async def get_leave(leave_id, mongo_client: AsyncIOMotorClient):
     return leave
 
 
-async def get_permission_history(employee_id, status, mongo_client: AsyncIOMotorClient):
-    permission_history = (
-        await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
-        .find({"employee_id": employee_id, "leave_type": "permission"}, {"_id": 0})
-        .sort("requested_at", -1)
-        .to_list(length=100)
+async def get_permission_history(
+    employee_id, status, page: HistoryPage, mongo_client: AsyncIOMotorClient
+):
+    return await get_history(
+        LEAVE_COLLECTION,
+        {"employee_id": employee_id, "leave_type": "permission"},
+        PERMISSION_HISTORY_PROJECTION,
+        status,
+        page,
+        mongo_client,
     )
 
-    if status:
-        permission_history = list(
-            filter(lambda x: x["status"] == status, permission_history)
-        )
-
-    return permission_history
-
 
 async def get_permission(permission_id, mongo_client: AsyncIOMotorClient):
     permission = await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find_one(
@@ -74,40 +107,62 @@ async def request_leave(
 ):
     leave = leave.model_dump()
 
-    leave["id"] = str(uuid.uuid4()).replace("-", "")
-    leave["month"] = leave["start_date"].replace(day=1)
+    # A leave without an end_date is a single day
+    leave["start_date"] = datetime.datetime.combine(
+        leave["start_date"], datetime.time()
+    )
+    leave["end_date"] = datetime.datetime.combine(
+        leave["end_date"] or leave["start_date"], datetime.time()
+    )
 
-    if type == "request":
-        leave["requested_by"] = requested_by
-        leave["requested_at"] = datetime.datetime.now()
-        leave["status"] = "pending"
-        leave["remarks"] = ""
+    if leave["end_date"] < leave["start_date"]:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
 
-    elif type == "post":
-        leave["requested_by"] = requested_by
-        leave["requested_at"] = datetime.datetime.now()
-        leave["status"] = "approved"
-        leave["approved_or_rejected_by"] = requested_by
-        leave["approved_or_rejected_at"] = datetime.datetime.now()
+    calendar = LeaveCalendar(mongo_client)
 
-    leave_in_db = LeaveInDB(**leave)
+    async with calendar.lock(leave["employee_id"]):
+        overlapping = await calendar.overlapping(
+            leave["employee_id"], leave["start_date"], leave["end_date"]
+        )
+        if overlapping:
+            raise HTTPException(
+                status_code=400,
+                detail="Leave already requested from {} to {}".format(
+                    overlapping[0]["start_date"].strftime("%d-%m-%Y"),
+                    overlapping[0]["end_date"].strftime("%d-%m-%Y"),
+                ),
+            )
+
+        leave["id"] = str(uuid.uuid4()).replace("-", "")
+        leave["month"] = leave["start_date"].replace(day=1)
+
+        if type == "request":
+            leave["requested_by"] = requested_by
+            leave["requested_at"] = datetime.datetime.now()
+            leave["status"] = "pending"
+            leave["remarks"] = ""
+
+        elif type == "post":
+            leave["requested_by"] = requested_by
+            leave["requested_at"] = datetime.datetime.now()
+            leave["status"] = "approved"
+            leave["approved_or_rejected_by"] = requested_by
+            leave["approved_or_rejected_at"] = datetime.datetime.now()
+
+        leave_in_db = LeaveInDB(**leave)
+
+        inserted = await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].insert_one(
+            leave_in_db.model_dump()
+        )
 
-    if await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].insert_one(
-        leave_in_db.model_dump()
-    ):
+    if inserted:
+        await EmployeeSummary(mongo_client).record_approved(leave_in_db.model_dump())
         return leave_in_db.model_dump()
 
 
 async def respond_leave(leave, mongo_client: AsyncIOMotorClient, responder):
-    already_approved_or_rejected = await mongo_client[MONGO_DATABASE][
-        LEAVE_COLLECTION
-    ].find_one({"id": leave["id"], "status": {"$ne": "pending"}})
-    if already_approved_or_rejected:
-        raise HTTPException(
-            status_code=400,
-            detail="Leave has already been approved or rejected",
-        )
-
     data_change = {
         "status": leave["status"],
         "remarks": leave["remarks"],
@@ -115,10 +170,21 @@ async def respond_leave(leave, mongo_client: AsyncIOMotorClient, responder):
         "approved_or_rejected_by": responder,
     }
 
+    # Only a pending leave moves, so two concurrent responses cannot both
+    # succeed and count the same leave twice
     update = await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find_one_and_update(
-        {"id": leave["id"]}, {"$set": data_change}, return_document=True
+        {"id": leave["id"], "status": "pending"},
+        {"$set": data_change},
+        return_document=True,
     )
+    if not update:
+        raise HTTPException(
+            status_code=400,
+            detail="Leave has already been approved or rejected",
+        )
+
     update.pop("_id")
+    await EmployeeSummary(mongo_client).record_approved(update)
     return update
 
 
@@ -151,20 +217,13 @@ async def request_permission(
     if await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].insert_one(
         permission_in_db.model_dump()
     ):
+        await EmployeeSummary(mongo_client).record_approved(
+            permission_in_db.model_dump()
+        )
         return permission_in_db.model_dump()
 
 
 async def respond_permission(permission, mongo_client: AsyncIOMotorClient, responder):
-    already_approved_or_rejected = await mongo_client[MONGO_DATABASE][
-        LEAVE_COLLECTION
-    ].find_one({"id": permission["id"], "status": {"$ne": "pending"}})
-
-    if already_approved_or_rejected:
-        raise HTTPException(
-            status_code=400,
-            detail="Permission has already been approved or rejected",
-        )
-
     data_change = {
         "status": permission["status"],
         "remarks": permission["remarks"],
@@ -173,8 +232,17 @@ async def respond_permission(permission, mongo_client: AsyncIOMotorClient, respo
     }
 
     update = await mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].find_one_and_update(
-        {"id": permission["id"]}, {"$set": data_change}, return_document=True
+        {"id": permission["id"], "status": "pending"},
+        {"$set": data_change},
+        return_document=True,
     )
 
+    if not update:
+        raise HTTPException(
+            status_code=400,
+            detail="Permission has already been approved or rejected",
+        )
+
     update.pop("_id")
+    await EmployeeSummary(mongo_client).record_approved(update)
     return update
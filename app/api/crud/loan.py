@@ -3,8 +3,11 @@ from app.core.config import Config
 
 from app.schemas.loan import LoanBase
 from app.schemas.db import LoanInDB
+from app.api.utils.history import HistoryPage, get_history
 from fastapi import HTTPException
 
+from app.api.lib.LoanSchedule import LoanSchedule
+
 import uuid
 import datetime
 
@@ -13,20 +16,36 @@ MONGO_DATABASE = Config.MONGO_DATABASE
 LOAN_COLLECTION = Config.LOAN_COLLECTION
 LOAN_SCHEDULE_COLLECTION = Config.LOAN_SCHEDULE_COLLECTION
 
-
-async def get_loan_history(employee_id, status, mongo_client: AsyncIOMotorClient):
-    loan_history = (
-        await mongo_client[MONGO_DATABASE][LOAN_COLLECTION]
-        .find({"employee_id": employee_id}, {"_id": 0})
-        .sort("requested_at", -1)
-        .to_list(length=100)
+# The repayment schedule is left to the loan detail view
+LOAN_HISTORY_PROJECTION = {
+    "id": 1,
+    "employee_id": 1,
+    "month": 1,
+    "status": 1,
+    "remarks": 1,
+    "requested_at": 1,
+    "requested_by": 1,
+    "approved_or_rejected_by": 1,
+    "approved_or_rejected_at": 1,
+    "amount": 1,
+    "emi": 1,
+    "tenure": 1,
+    "is_completed": 1,
+}
+
+
+async def get_loan_history(
+    employee_id, status, page: HistoryPage, mongo_client: AsyncIOMotorClient
+):
+    return await get_history(
+        LOAN_COLLECTION,
+        {"employee_id": employee_id},
+        LOAN_HISTORY_PROJECTION,
+        status,
+        page,
+        mongo_client,
     )
 
-    if status:
-        loan_history = list(filter(lambda x: x["status"] == status, loan_history))
-
-    return loan_history
-
 
 async def check_for_data_change(loan, new_data, mongo_client: AsyncIOMotorClient):
     new_amount = new_data.get("amount", None)
@@ -72,13 +91,6 @@ async def check_for_data_change(loan, new_data, mongo_client: AsyncIOMotorClient
     return data_change
 
 
-async def get_next_month(date):
-    if date.month == 12:
-        return datetime.datetime(date.year + 1, 1, 1, 0, 0, 0)
-    else:
-        return datetime.datetime(date.year, date.month + 1, 1, 0, 0, 0)
-
-
 async def get_loan(loan_id, mongo_client: AsyncIOMotorClient):
     loan = await mongo_client[MONGO_DATABASE][LOAN_COLLECTION].find_one(
         {"id": loan_id}, {"_id": 0}
@@ -137,14 +149,27 @@ async def respond_loan(loan_respond_req, mongo_client: AsyncIOMotorClient, respo
         new_data_change = await check_for_data_change(loan, new_data, mongo_client)
         data_change.update(new_data_change)
 
-    update = await mongo_client[MONGO_DATABASE][LOAN_COLLECTION].find_one_and_update(
-        {"id": loan_respond_req["loan_id"]},
-        {"$set": data_change},
-        return_document=True,
-    )
+    # Approval writes the status, any change to the amount or EMI and the
+    # repayment schedule computed from them together
+    if data_change["status"] == "approved":
+        update = await LoanSchedule(mongo_client).sync(
+            loan, data_change, expect={"status": "pending"}
+        )
+    else:
+        update = await mongo_client[MONGO_DATABASE][
+            LOAN_COLLECTION
+        ].find_one_and_update(
+            {"id": loan_respond_req["loan_id"], "status": "pending"},
+            {"$set": data_change},
+            return_document=True,
+        )
+        if not update:
+            raise HTTPException(
+                status_code=400, detail="Loan has already been approved or rejected"
+            )
 
     update["loan_id"] = update["id"]
-    update.pop("_id")
+    update.pop("_id", None)
 
     return update
 
@@ -159,39 +184,13 @@ async def build_repayment_schedule(loan, mongo_client: AsyncIOMotorClient):
     if repayment_schedule:
         raise HTTPException(status_code=400, detail="Repayment schedule already built")
 
-    repayment_schedule = []
-    loan_amount = loan["amount"]
-    loan_tenure = loan["tenure"]
-    loan_emi = loan["emi"]
-    month = loan["month"]
-    for i in range(int(loan_tenure)):
-        if i == 0:
-            month = datetime.datetime.combine(month, datetime.time())
-        else:
-            month = await get_next_month(month)
-        repayment_schedule.append(
-            {
-                "employee_id": loan["employee_id"],
-                "id": str(uuid.uuid4()).replace("-", ""),
-                "loan_id": loan["id"],
-                "month": month,
-                "amount": loan_emi if loan_amount > loan_emi else loan_amount,
-                "status": "pending",
-                "adjusted": False,
-            }
-        )
-        loan_amount -= loan_emi
+    await LoanSchedule(mongo_client).sync(
+        loan,
+        expect={"repayment_schedule": None},
+        conflict="Repayment schedule already built",
+    )
 
-    if await mongo_client[MONGO_DATABASE][LOAN_SCHEDULE_COLLECTION].insert_many(
-        repayment_schedule
-    ):
-        for schedule in repayment_schedule:
-            schedule.pop("_id")
-            schedule["id"] = str(uuid.uuid4()).replace("-", "")
-        await mongo_client[MONGO_DATABASE][LOAN_COLLECTION].update_one(
-            {"id": loan["id"]}, {"$set": {"repayment_schedule": repayment_schedule}}
-        )
-        return True
+    return True
 
 
 async def get_repayment_schedule(loan_id, mongo_client: AsyncIOMotorClient):
@@ -205,7 +204,8 @@ async def get_repayment_schedule(loan_id, mongo_client: AsyncIOMotorClient):
     res = (
         await mongo_client[MONGO_DATABASE][LOAN_SCHEDULE_COLLECTION]
         .find({"loan_id": loan_id}, {"_id": 0})
-        .to_list(length=100)
+        .sort("month", 1)
+        .to_list(None)
     )
 
     return res
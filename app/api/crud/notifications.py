@@ -0,0 +1,170 @@
+from app.database import AsyncIOMotorClient
+from app.core.config import Config
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+import base64
+import datetime
+import json
+
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+NOTIFICATION_COLLECTION = Config.NOTIFICATION_COLLECTION
+NOTIFICATION_COUNTER_COLLECTION = Config.NOTIFICATION_COUNTER_COLLECTION
+
+UNREAD = "pending"
+READ = "read"
+
+# Listing every status as an $in keeps the (target, status, created_at) index
+# usable for the created_at sort when no status filter is given
+STATUSES = [UNREAD, READ]
+
+
+def encode_cursor(notification):
+    return base64.urlsafe_b64encode(
+        json.dumps(
+            [notification["created_at"].isoformat(), notification["id"]]
+        ).encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(created_at), id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def get_notifications(
+    targets, status, limit, cursor, mongo_client: AsyncIOMotorClient
+):
+    query = {
+        "target": {"$in": targets},
+        "status": {"$in": [status] if status else STATUSES},
+    }
+
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": id}},
+        ]
+
+    notifications = (
+        await mongo_client[MONGO_DATABASE][NOTIFICATION_COLLECTION]
+        .find(query, {"_id": 0, "delivery": 0})
+        .sort([("created_at", -1), ("id", -1)])
+        .limit(limit + 1)
+        .to_list(None)
+    )
+
+    next_cursor = None
+
+    if len(notifications) > limit:
+        notifications = notifications[:limit]
+        next_cursor = encode_cursor(notifications[-1])
+
+    return notifications, next_cursor
+
+
+async def count_unread(targets, mongo_client: AsyncIOMotorClient):
+    counters = (
+        await mongo_client[MONGO_DATABASE][NOTIFICATION_COUNTER_COLLECTION]
+        .find({"target": {"$in": targets}}, {"_id": 0, "unread": 1})
+        .to_list(None)
+    )
+
+    return max(sum(counter.get("unread", 0) for counter in counters), 0)
+
+
+async def increment_unread(counts, mongo_client: AsyncIOMotorClient):
+    """counts maps target -> number of new unread notifications"""
+
+    if not counts:
+        return
+
+    await mongo_client[MONGO_DATABASE][NOTIFICATION_COUNTER_COLLECTION].bulk_write(
+        [
+            UpdateOne(
+                {"target": target},
+                {
+                    "$inc": {"unread": count},
+                    "$set": {"updated_at": datetime.datetime.now()},
+                },
+                upsert=True,
+            )
+            for target, count in counts.items()
+        ],
+        ordered=False,
+    )
+
+
+async def mark_as_read(ids, targets, employee_id, mongo_client: AsyncIOMotorClient):
+    """Mark unread notifications in the inbox as read, all of them when ids is
+    None, and decrement each target's counter by what actually changed.
+
+    Updating one target at a time gives an exact modified count per counter
+    even when two requests mark the same notifications concurrently.
+    """
+
+    collection = mongo_client[MONGO_DATABASE][NOTIFICATION_COLLECTION]
+    now = datetime.datetime.now()
+    counts = {}
+
+    for target in targets:
+        query = {"target": target, "status": UNREAD}
+
+        if ids is not None:
+            query["id"] = {"$in": ids}
+
+        result = await collection.update_many(
+            query,
+            {"$set": {"status": READ, "read_at": now, "read_by": employee_id}},
+        )
+
+        if result.modified_count:
+            counts[target] = -result.modified_count
+
+    await increment_unread(counts, mongo_client)
+
+    return sum(-count for count in counts.values())
+
+
+async def rebuild_unread_counters(mongo_client: AsyncIOMotorClient):
+    """Recount every target's unread notifications, e.g. to backfill counters
+    for notifications written before they existed"""
+
+    counts = {
+        doc["_id"]: doc["unread"]
+        async for doc in mongo_client[MONGO_DATABASE][
+            NOTIFICATION_COLLECTION
+        ].aggregate(
+            [
+                {"$match": {"status": UNREAD}},
+                {"$group": {"_id": "$target", "unread": {"$sum": 1}}},
+            ]
+        )
+    }
+
+    counters = mongo_client[MONGO_DATABASE][NOTIFICATION_COUNTER_COLLECTION]
+    now = datetime.datetime.now()
+
+    await counters.update_many(
+        {"target": {"$nin": list(counts)}}, {"$set": {"unread": 0, "updated_at": now}}
+    )
+
+    if counts:
+        await counters.bulk_write(
+            [
+                UpdateOne(
+                    {"target": target},
+                    {"$set": {"unread": unread, "updated_at": now}},
+                    upsert=True,
+                )
+                for target, unread in counts.items()
+            ],
+            ordered=False,
+        )
+
+    return counts
@@ -15,6 +15,8 @@ from app.schemas.db import (
     SalaryIncentivesInDB,
 )
 from app.api.utils import first_day_of_current_month
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
+from app.api.utils.history import HistoryPage, get_history
 
 import uuid
 import datetime
@@ -26,6 +28,19 @@ SALARY_INCENTIVES_COLLECTION = Config.SALARY_INCENTIVES_COLLECTION
 LOAN_COLLECTION = Config.LOAN_COLLECTION
 SALARY_ADVANCE_COLLECTION = Config.SALARY_ADVANCE_COLLECTION
 
+SALARY_ADVANCE_HISTORY_PROJECTION = {
+    "id": 1,
+    "employee_id": 1,
+    "month": 1,
+    "status": 1,
+    "remarks": 1,
+    "requested_at": 1,
+    "requested_by": 1,
+    "approved_or_rejected_by": 1,
+    "approved_or_rejected_at": 1,
+    "amount": 1,
+}
+
 
 async def get_all_salaries(mongo_client: AsyncIOMotorClient):
     return (
@@ -36,22 +51,17 @@ async def get_all_salaries(mongo_client: AsyncIOMotorClient):
 
 
 async def get_salary_advance_history(
-    employee_id, status, mongo_client: AsyncIOMotorClient
+    employee_id, status, page: HistoryPage, mongo_client: AsyncIOMotorClient
 ):
-    salary_advance_history = (
-        await mongo_client[MONGO_DATABASE][SALARY_ADVANCE_COLLECTION]
-        .find({"employee_id": employee_id}, {"_id": 0})
-        .sort("requested_at", -1)
-        .to_list(length=100)
+    return await get_history(
+        SALARY_ADVANCE_COLLECTION,
+        {"employee_id": employee_id},
+        SALARY_ADVANCE_HISTORY_PROJECTION,
+        status,
+        page,
+        mongo_client,
     )
 
-    if status:
-        salary_advance_history = list(
-            filter(lambda x: x["status"] == status, salary_advance_history)
-        )
-
-    return salary_advance_history
-
 
 async def get_salary_history(employee_id, mongo_client: AsyncIOMotorClient):
     salary_history = (
@@ -154,6 +164,9 @@ async def request_advance(
     if await mongo_client[MONGO_DATABASE][SALARY_ADVANCE_COLLECTION].insert_one(
         salary_advance_in_db.model_dump()
     ):
+        await PayslipSnapshot(mongo_client).refresh(
+            salary_advance_in_db.employee_id, salary_advance_in_db.month
+        )
         return salary_advance_in_db.model_dump()
 
 
@@ -183,6 +196,8 @@ async def respond_salary_advance(salary, responder, mongo_client: AsyncIOMotorCl
 
     update.pop("_id")
 
+    await PayslipSnapshot(mongo_client).refresh(update["employee_id"], update["month"])
+
     return update
 
     # FIXME: If not update decide the response
@@ -222,6 +237,7 @@ async def update_salary(
         salary["created_by"] = updated_by
 
         if await mongo_client[MONGO_DATABASE][SALARY_COLLECTION].insert_one(salary):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
     else:
@@ -234,6 +250,7 @@ async def update_salary(
             {"$set": salary},
             upsert=True,
         ):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
 
@@ -272,6 +289,7 @@ async def update_monthly_compensation(
         if await mongo_client[MONGO_DATABASE][
             MONTHLY_COMPENSATION_COLLECTION
         ].insert_one(salary):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
     else:
@@ -286,6 +304,7 @@ async def update_monthly_compensation(
             {"$set": salary},
             return_document=True,
         ):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
 
@@ -317,6 +336,7 @@ async def update_salary_incentives(
         if await mongo_client[MONGO_DATABASE][SALARY_INCENTIVES_COLLECTION].insert_one(
             salary
         ):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
     else:
@@ -331,6 +351,7 @@ async def update_salary_incentives(
             {"$set": salary},
             return_document=True,
         ):
+            await PayslipSnapshot(mongo_client).refresh(employee_id, month)
             return salary
 
 
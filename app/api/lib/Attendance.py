@@ -1,109 +1,336 @@
 from app.core.config import Config
+import calendar
 import datetime
 
-from app.schemas.attendance import AttendanceBase, AttendanceInDB
+from pymongo import UpdateOne
+
+from app.api.lib.JobLedger import JobLedger
+from app.api.lib.LeaveCalendar import LeaveCalendar
+from app.core import pipelines
 
 MONGO_DATABASE = Config.MONGO_DATABASE
 ATTENDANCE_COLLECTION = Config.ATTENDANCE_COLLECTION
-LEAVE_COLLECTION = Config.LEAVE_COLLECTION
+ATTENDANCE_MONTHLY_COLLECTION = Config.ATTENDANCE_MONTHLY_COLLECTION
 EMPLOYEE_COLLECTION = Config.EMPLOYEE_COLLECTION
+JOB_BATCH_SIZE = Config.JOB_BATCH_SIZE
+
+# One bitmap per status in each (employee_id, month) document; bit d - 1 is
+# day d of the month. A day has at most one status bit set.
+STATUSES = ("present", "absent", "holiday")
+
+ALL_DAYS = (1 << 31) - 1
+
+
+def month_of(date):
+    return datetime.datetime(date.year, date.month, 1)
+
+
+def day_mask(date):
+    return 1 << (date.day - 1)
+
+
+def count_days(bitmap):
+    return bin(bitmap or 0).count("1")
+
+
+def mark_update(status, mask, now=None):
+    """Atomically set one day to status and clear it in the other bitmaps"""
+
+    return {
+        "$bit": {
+            name: {"or": mask} if name == status else {"and": ALL_DAYS & ~mask}
+            for name in STATUSES
+        },
+        "$set": {"updated_at": now or datetime.datetime.now()},
+    }
+
+
+def month_counts(doc):
+    return {status: count_days((doc or {}).get(status)) for status in STATUSES}
+
+
+def attendance_stats(counts):
+    """Working days are the days marked present or absent; holidays and
+    unmarked days do not count"""
+
+    working_days = counts["present"] + counts["absent"]
+
+    return {
+        "total_working_days": working_days,
+        "total_present_days": counts["present"],
+        "total_absent_days": counts["absent"],
+        "present_percentage": (counts["present"] / working_days) * 100
+        if working_days
+        else 0,
+    }
+
+
+def month_view(employee_id, month, doc, start_date=None, end_date=None):
+    """Day by day statuses of one month document, optionally clipped to a
+    date range"""
+
+    days = []
+
+    for day in range(1, calendar.monthrange(month.year, month.month)[1] + 1):
+        date = month.replace(day=day)
+
+        if (start_date and date < start_date) or (end_date and date > end_date):
+            continue
+
+        status = next(
+            (s for s in STATUSES if (doc or {}).get(s, 0) & day_mask(date)), None
+        )
+        days.append({"date": date, "status": status})
+
+    counts = {
+        status: sum(1 for day in days if day["status"] == status) for status in STATUSES
+    }
+
+    return {"employee_id": employee_id, "month": month, "days": days, **counts}
 
 
 class Attendance:
     def __init__(self, mongo_client):
         self.mongo_client = mongo_client
 
+    @property
+    def collection(self):
+        return self.mongo_client[MONGO_DATABASE][ATTENDANCE_MONTHLY_COLLECTION]
+
     async def get_attendance(self, employee_id):
-        return await self.mongo_client[MONGO_DATABASE][ATTENDANCE_COLLECTION].find_one(
-            {"employee_id": employee_id}
+        """The current month"""
+
+        return await self.get_attendance_by_month(employee_id, datetime.datetime.now())
+
+    async def mark(self, employee_id, date, status):
+        await self.collection.update_one(
+            {"employee_id": employee_id, "month": month_of(date)},
+            mark_update(status, day_mask(date)),
+            upsert=True,
         )
 
-    async def update_attendance(self, employee_id, attendance):
-        pass
+    async def mark_day(self, date, statuses):
+        """Mark one day for many employees, leaving any employee whose day is
+        already marked untouched. Returns the statuses actually written."""
+
+        month = month_of(date)
+        mask = day_mask(date)
+
+        marked = await self.collection.find(
+            {
+                "employee_id": {"$in": list(statuses)},
+                "month": month,
+                "$or": [{status: {"$bitsAnySet": mask}} for status in STATUSES],
+            },
+            {"_id": 0, "employee_id": 1},
+        ).to_list(None)
+
+        for doc in marked:
+            statuses.pop(doc["employee_id"], None)
+
+        if statuses:
+            now = datetime.datetime.now()
+
+            await self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"employee_id": employee_id, "month": month},
+                        mark_update(status, mask, now),
+                        upsert=True,
+                    )
+                    for employee_id, status in statuses.items()
+                ],
+                ordered=False,
+            )
+
+        return statuses
 
     async def post_attendance(self):
         today = datetime.datetime.now().replace(
             hour=0, minute=0, second=0, microsecond=0
         )
 
-        # for i in range(1, 32):
-        #     today = today.replace(day=i)
+        ledger = JobLedger(self.mongo_client, "attendance", today.strftime("%Y-%m-%d"))
 
-        # if today.weekday() == 6:
-        #     return None
-        current_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        run = await ledger.acquire()
 
-        leave_record = (
-            await self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
-            .find(
-                {
-                    "month": current_month,
-                    "leave_type": {"$ne": "permission"},
-                    "status": "approved",
-                }
-            )
-            .to_list(1000)
-        )
+        if run is None:
+            return await ledger.get()
 
-        absent_list = []
+        try:
+            return await self._post_attendance(today, ledger, run["cursor"])
+        except Exception as e:
+            await ledger.fail(e)
+            raise
 
-        if leave_record:
-            for record in leave_record:
-                print(record)
-                end_date = record.get("end_date")
-                start_date = record.get("start_date")
+    async def _post_attendance(self, today, ledger, cursor=None):
+        # for i in range(1, 32):
+        #     today = today.replace(day=i)
 
-                if not end_date:
-                    end_date = start_date
+        # if today.weekday() == 6:
+        #     return None
 
-                if start_date <= today <= end_date:
-                    absent_list.append(record.get("employee_id"))
+        absent_list = set(await LeaveCalendar(self.mongo_client).on_leave(today))
 
         employee_list = await self.mongo_client[MONGO_DATABASE][
             EMPLOYEE_COLLECTION
         ].distinct("employee_id")
 
-        present_list = list(set(employee_list) - set(absent_list))
+        # Sorted so the ledger cursor is a stable resume point
+        employee_list = sorted(employee_list)
 
-        attendance_list = []
+        if cursor:
+            employee_list = [i for i in employee_list if i > cursor]
 
-        for employee_id in present_list:
-            attendance_list.append(
-                AttendanceInDB(
-                    employee_id=employee_id, date=today, status="present"
-                ).model_dump()
-            )
+        for i in range(0, len(employee_list), JOB_BATCH_SIZE):
+            batch = employee_list[i : i + JOB_BATCH_SIZE]
 
-        for employee_id in absent_list:
-            attendance_list.append(
-                AttendanceInDB(
-                    employee_id=employee_id, date=today, status="absent"
-                ).model_dump()
+            written = await self.mark_day(
+                today,
+                {
+                    employee_id: "absent" if employee_id in absent_list else "present"
+                    for employee_id in batch
+                },
             )
-        if len(attendance_list)!=0:
-            await self.mongo_client[MONGO_DATABASE][ATTENDANCE_COLLECTION].insert_many(
-                attendance_list
+
+            await ledger.checkpoint(
+                batch[-1], inserted=len(written), processed=len(batch)
             )
 
-        return attendance_list
+        return await ledger.complete()
 
-    async def delete_attendance(self, employee_id):
-        pass
+    async def delete_attendance(self, employee_id, date=None):
+        """Unmark one day, or drop every month of the employee without a date"""
+
+        if date is None:
+            await self.collection.delete_many({"employee_id": employee_id})
+            return
+
+        await self.collection.update_one(
+            {"employee_id": employee_id, "month": month_of(date)},
+            {
+                "$bit": {
+                    status: {"and": ALL_DAYS & ~day_mask(date)} for status in STATUSES
+                },
+                "$set": {"updated_at": datetime.datetime.now()},
+            },
+        )
 
     async def get_attendance_by_date(self, employee_id, date):
-        pass
+        doc = await self.collection.find_one(
+            {"employee_id": employee_id, "month": month_of(date)}, {"_id": 0}
+        )
+
+        return next(
+            (s for s in STATUSES if (doc or {}).get(s, 0) & day_mask(date)), None
+        )
 
     async def get_attendance_by_month(self, employee_id, month):
-        pass
+        month = month_of(month)
+
+        doc = await self.collection.find_one(
+            {"employee_id": employee_id, "month": month}, {"_id": 0}
+        )
+
+        return month_view(employee_id, month, doc)
+
+    async def get_month_counts(self, employee_id, month):
+        """present/absent/holiday day counts of one month, from its bitmaps"""
+
+        doc = await self.collection.find_one(
+            {"employee_id": employee_id, "month": month_of(month)},
+            {"_id": 0, **{status: 1 for status in STATUSES}},
+        )
+
+        return month_counts(doc)
 
     async def get_attendance_by_year(self, employee_id, year):
-        pass
+        return await self.get_attendance_by_year_range(employee_id, year, year)
 
     async def get_attendance_by_date_range(self, employee_id, start_date, end_date):
-        pass
+        months = await self.get_attendance_by_month_range(
+            employee_id, start_date, end_date, start_date=start_date, end_date=end_date
+        )
+
+        return [day for month in months for day in month["days"]]
+
+    async def get_attendance_by_month_range(
+        self, employee_id, start_month, end_month, start_date=None, end_date=None
+    ):
+        """One view per month from start_month to end_month inclusive, a
+        single indexed range scan of at most one document per month"""
+
+        start_month, end_month = month_of(start_month), month_of(end_month)
+
+        docs = {
+            doc["month"]: doc
+            async for doc in self.collection.find(
+                {
+                    "employee_id": employee_id,
+                    "month": {"$gte": start_month, "$lte": end_month},
+                },
+                {"_id": 0},
+            )
+        }
+
+        months = []
+        month = start_month
+
+        while month <= end_month:
+            months.append(
+                month_view(employee_id, month, docs.get(month), start_date, end_date)
+            )
+            month = (month + datetime.timedelta(days=32)).replace(day=1)
 
-    async def get_attendance_by_month_range(self, employee_id, start_month, end_month):
-        pass
+        return months
 
     async def get_attendance_by_year_range(self, employee_id, start_year, end_year):
-        pass
+        return await self.get_attendance_by_month_range(
+            employee_id,
+            datetime.datetime(start_year, 1, 1),
+            datetime.datetime(end_year, 12, 1),
+        )
+
+    async def migrate_rows(self):
+        """Fold the legacy one-document-per-day collection into the monthly
+        bitmaps. Like mark_update, each migrated day is cleared in the other
+        bitmaps before its own bit is set, so a day keeps a single status and
+        running it again changes nothing."""
+
+        operations = []
+        migrated = 0
+
+        async for row in self.mongo_client[MONGO_DATABASE][
+            ATTENDANCE_COLLECTION
+        ].aggregate(await pipelines.get_attendance_bitmaps(), allowDiskUse=True):
+            days = 0
+            for status in STATUSES:
+                days |= int(row[status])
+
+            operations.append(
+                UpdateOne(
+                    {"employee_id": row["employee_id"], "month": row["month"]},
+                    {
+                        "$bit": {
+                            status: {
+                                "and": ALL_DAYS & ~days,
+                                "or": int(row[status]),
+                            }
+                            for status in STATUSES
+                        },
+                        "$set": {"updated_at": datetime.datetime.now()},
+                    },
+                    upsert=True,
+                )
+            )
+
+            if len(operations) == JOB_BATCH_SIZE:
+                await self.collection.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+                operations = []
+
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+
+        return migrated
@@ -0,0 +1,142 @@
+import datetime
+
+from pymongo import UpdateOne
+
+from app.api.lib.Attendance import Attendance, attendance_stats
+from app.core import pipelines
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+LEAVE_COLLECTION = Config.LEAVE_COLLECTION
+EMPLOYEE_MONTHLY_SUMMARY_COLLECTION = Config.EMPLOYEE_MONTHLY_SUMMARY_COLLECTION
+
+COUNTERS = ["leave_days", "permission_hours"]
+
+
+def format_hours(hours):
+    minutes = round(hours * 60)
+    return "{} Hours {:02d} Minutes".format(minutes // 60, minutes % 60)
+
+
+class EmployeeSummary:
+    """Leave and permission counters per (employee_id, month).
+
+    Approving a leave or permission increments the counters, so the profile
+    page reads one document per month worked instead of every leave row.
+    rebuild() recomputes them from the raw rows, for backfills and to correct
+    drift; it runs from the summary rebuild command, never on a read. Attendance counts come straight from the monthly bitmaps.
+    """
+
+    def __init__(self, mongo_client: AsyncIOMotorClient):
+        self.mongo_client = mongo_client
+        self.collection = mongo_client[MONGO_DATABASE][
+            EMPLOYEE_MONTHLY_SUMMARY_COLLECTION
+        ]
+
+    async def increment(self, counts):
+        """counts maps (employee_id, month) -> {counter: amount}"""
+
+        if not counts:
+            return
+
+        now = datetime.datetime.now()
+
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"employee_id": employee_id, "month": month},
+                    {"$inc": amounts, "$set": {"updated_at": now}},
+                    upsert=True,
+                )
+                for (employee_id, month), amounts in counts.items()
+            ],
+            ordered=False,
+        )
+
+    async def record_approved(self, leave):
+        """Count a leave or permission that has just become approved"""
+
+        if leave.get("status") != "approved":
+            return
+
+        if leave.get("leave_type") == "permission":
+            amounts = {"permission_hours": leave.get("no_of_hours") or 0}
+        else:
+            amounts = {"leave_days": leave.get("no_of_days") or 0}
+
+        await self.increment({(leave["employee_id"], leave["month"]): amounts})
+
+    async def get(self, employee_id, month):
+        """All-time totals and the given month's counters, in one aggregation
+        over the employee's monthly documents. None when the employee has no
+        counters yet."""
+
+        result = await self.collection.aggregate(
+            [
+                {"$match": {"employee_id": employee_id}},
+                {
+                    "$facet": {
+                        "total": [
+                            {
+                                "$group": {
+                                    "_id": None,
+                                    **{c: {"$sum": "$" + c} for c in COUNTERS},
+                                }
+                            }
+                        ],
+                        "month": [
+                            {"$match": {"month": month}},
+                            {"$project": {"_id": 0, **{c: 1 for c in COUNTERS}}},
+                        ],
+                    }
+                },
+            ]
+        ).to_list(1)
+
+        if not result or not result[0]["total"]:
+            return None
+
+        total = result[0]["total"][0]
+        current = result[0]["month"][0] if result[0]["month"] else {}
+
+        return (
+            {c: total.get(c, 0) for c in COUNTERS},
+            {c: current.get(c, 0) for c in COUNTERS},
+        )
+
+    async def rebuild(self, employee_ids=None):
+        """Recompute the counters from the leave collection. Each month with
+        approved rows is replaced by a single $merge; nothing is zeroed
+        first, so concurrent increments on other months are never lost."""
+
+        query = {} if employee_ids is None else {"employee_id": {"$in": employee_ids}}
+
+        await self.mongo_client[MONGO_DATABASE][LEAVE_COLLECTION].aggregate(
+            await pipelines.get_employee_monthly_summary(employee_ids)
+        ).to_list(None)
+
+        return await self.collection.count_documents(query)
+
+    async def leaves_and_attendance(self, employee_id, month):
+        """The leaves_and_permissions and attendance sections of the profile"""
+
+        # Read-only: an employee without counters has no approved leave since
+        # they were introduced. History from before that is backfilled once
+        # with `python -m app.manage summary rebuild`, never on a read.
+        zeros = {c: 0 for c in COUNTERS}
+        total, current = await self.get(employee_id, month) or (zeros, zeros)
+
+        counts = await Attendance(self.mongo_client).get_month_counts(
+            employee_id, month
+        )
+
+        return (
+            {
+                "total_leave_days": total["leave_days"],
+                "monthly_leave_days": current["leave_days"],
+                "total_permission_hours": format_hours(total["permission_hours"]),
+                "monthly_permission_hours": format_hours(current["permission_hours"]),
+            },
+            attendance_stats(counts),
+        )
@@ -0,0 +1,150 @@
+import datetime
+import os
+import socket
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+JOB_RUNS_COLLECTION = Config.JOB_RUNS_COLLECTION
+JOB_LEASE_SECONDS = Config.JOB_LEASE_SECONDS
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class JobLedger:
+    """One document per scheduled run in job_runs, keyed by run_key.
+
+    Every replica runs its own scheduler, so a job first takes a lease on its
+    run_key. Only the lease owner executes, it checkpoints a cursor after each
+    batch and a run that died half way is picked up from that cursor once the
+    lease expires. A completed run_key is never executed again.
+    """
+
+    def __init__(
+        self,
+        mongo_client: AsyncIOMotorClient,
+        job,
+        run_key,
+        lease_seconds=JOB_LEASE_SECONDS,
+    ):
+        self.mongo_client = mongo_client
+        self.collection = mongo_client[MONGO_DATABASE][JOB_RUNS_COLLECTION]
+        self.job = job
+        self.run_key = "{}:{}".format(job, run_key)
+        self.lease_seconds = lease_seconds
+        self.owner = "{}:{}:{}".format(
+            socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8]
+        )
+        self.attempt_started_at = None
+
+    def _lease_expiry(self, now):
+        return now + datetime.timedelta(seconds=self.lease_seconds)
+
+    async def acquire(self):
+        """Return the run document if this process now owns the run, else None"""
+
+        now = datetime.datetime.now()
+
+        try:
+            run = await self.collection.find_one_and_update(
+                {
+                    "run_key": self.run_key,
+                    "status": {"$ne": "completed"},
+                    "lease_expires_at": {"$lte": now},
+                },
+                {
+                    "$set": {
+                        "status": "running",
+                        "owner": self.owner,
+                        "lease_expires_at": self._lease_expiry(now),
+                        "attempt_started_at": now,
+                        "error": None,
+                    },
+                    "$setOnInsert": {
+                        "job": self.job,
+                        "started_at": now,
+                        "cursor": None,
+                        "counts": {},
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+                projection={"_id": 0},
+            )
+        except DuplicateKeyError:
+            # The run is completed or another replica holds a live lease;
+            # the unique run_key index comes from app/database/indexes.py
+            return None
+
+        self.attempt_started_at = now
+
+        return run
+
+    async def checkpoint(self, cursor, **counts):
+        """Persist the cursor, add counts and extend the lease"""
+
+        now = datetime.datetime.now()
+
+        update = {
+            "$set": {
+                "cursor": cursor,
+                "lease_expires_at": self._lease_expiry(now),
+                "checkpointed_at": now,
+            }
+        }
+
+        if counts:
+            update["$inc"] = {"counts.{}".format(k): v for k, v in counts.items()}
+
+        result = await self.collection.update_one(
+            {"run_key": self.run_key, "owner": self.owner, "status": "running"},
+            update,
+        )
+
+        if result.matched_count == 0:
+            raise LeaseLost(self.run_key)
+
+    async def complete(self, **summary):
+        now = datetime.datetime.now()
+
+        return await self.collection.find_one_and_update(
+            {"run_key": self.run_key, "owner": self.owner},
+            {
+                "$set": {
+                    "status": "completed",
+                    "finished_at": now,
+                    "lease_expires_at": now,
+                    "duration_seconds": (now - self.attempt_started_at).total_seconds(),
+                    **summary,
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0},
+        )
+
+    async def fail(self, error):
+        # Release the lease right away so the next trigger resumes the run
+        now = datetime.datetime.now()
+
+        await self.collection.update_one(
+            {"run_key": self.run_key, "owner": self.owner},
+            {
+                "$set": {
+                    "status": "failed",
+                    "error": repr(error),
+                    "lease_expires_at": now,
+                    "duration_seconds": (now - self.attempt_started_at).total_seconds(),
+                }
+            },
+        )
+
+    async def get(self):
+        return await self.collection.find_one({"run_key": self.run_key}, {"_id": 0})
@@ -0,0 +1,97 @@
+import contextlib
+import datetime
+import uuid
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+LEAVE_COLLECTION = Config.LEAVE_COLLECTION
+LEAVE_LOCKS_COLLECTION = Config.LEAVE_LOCKS_COLLECTION
+
+# Longest an overlap check and insert may hold an employee's lock; a lock
+# left behind by a crashed request frees itself after this
+LEAVE_LOCK_SECONDS = 10
+
+# A rejected leave frees its dates again
+ACTIVE_STATUSES = ["pending", "approved"]
+
+
+class LeaveCalendar:
+    """Interval queries over the leave collection.
+
+    A leave covers start_date to end_date inclusive, so it overlaps [start,
+    end] when start_date <= end and end_date >= start. Permissions carry no
+    start_date/end_date and never match.
+    """
+
+    def __init__(self, mongo_client: AsyncIOMotorClient):
+        self.collection = mongo_client[MONGO_DATABASE][LEAVE_COLLECTION]
+        self.locks = mongo_client[MONGO_DATABASE][LEAVE_LOCKS_COLLECTION]
+
+    @contextlib.asynccontextmanager
+    async def lock(self, employee_id):
+        """Serialize overlap check and insert per employee, so two concurrent
+        requests cannot both pass the check. Relies on the unique employee_id
+        index of leave_locks: while a live lock exists the upsert collides
+        with it and the request gets a 409."""
+
+        owner = uuid.uuid4().hex
+        now = datetime.datetime.now()
+
+        try:
+            await self.locks.find_one_and_update(
+                {"employee_id": employee_id, "locked_until": {"$lte": now}},
+                {
+                    "$set": {
+                        "owner": owner,
+                        "locked_until": now
+                        + datetime.timedelta(seconds=LEAVE_LOCK_SECONDS),
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=409,
+                detail="Another leave request for this employee is in progress",
+            )
+
+        try:
+            yield
+        finally:
+            await self.locks.update_one(
+                {"employee_id": employee_id, "owner": owner},
+                {"$set": {"locked_until": datetime.datetime.now()}},
+            )
+
+    async def overlapping(self, employee_id, start_date, end_date):
+        """The employee's pending or approved leaves that share a day with
+        [start_date, end_date], served by (employee_id, start_date, end_date)"""
+
+        return await self.collection.find(
+            {
+                "employee_id": employee_id,
+                "start_date": {"$lte": end_date},
+                "end_date": {"$gte": start_date},
+                "status": {"$in": ACTIVE_STATUSES},
+            },
+            {"_id": 0, "id": 1, "start_date": 1, "end_date": 1, "status": 1},
+        ).to_list(None)
+
+    async def on_leave(self, date):
+        """employee_ids with an approved leave covering date. The
+        (status, end_date, start_date) index bounds the scan to approved
+        leaves that have not ended before date."""
+
+        return await self.collection.distinct(
+            "employee_id",
+            {
+                "status": "approved",
+                "end_date": {"$gte": date},
+                "start_date": {"$lte": date},
+            },
+        )
@@ -0,0 +1,235 @@
+import datetime
+import uuid
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
+
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+LOAN_COLLECTION = Config.LOAN_COLLECTION
+LOAN_SCHEDULE_COLLECTION = Config.LOAN_SCHEDULE_COLLECTION
+
+# Raised by a standalone server, which has no transactions
+ILLEGAL_OPERATION = 20
+
+# Per installment, the most rounding the last installment may absorb
+ROUNDING_TOLERANCE = 0.01
+
+
+def amortize(amount, emi, tenure, start_month):
+    """Months and amounts of the installments: emi every month and whatever
+    is left in the last one. Only the cents lost to rounding are moved to the
+    last installment; an emi and tenure that do not cover the amount are a
+    400 rather than a balloon payment. Installments that would be zero are
+    dropped."""
+
+    tenure = int(tenure)
+
+    if tenure < 1 or amount <= 0:
+        return [], []
+
+    if amount - emi * tenure > ROUNDING_TOLERANCE * tenure:
+        raise HTTPException(
+            status_code=400,
+            detail="EMI of {} over {} months does not cover {}".format(
+                emi, tenure, amount
+            ),
+        )
+
+    offsets = np.arange(tenure)
+
+    amounts = np.minimum(emi, np.maximum(amount - emi * offsets, 0)).astype(float)
+    amounts = amounts.round(2)
+    # The cents lost to rounding are paid with the last installment
+    amounts[-1] = round(amount - amounts[:-1].sum(), 2)
+
+    months = np.datetime64(start_month.strftime("%Y-%m"), "M") + offsets
+
+    keep = amounts > 0
+
+    return [
+        datetime.datetime(month.year, month.month, 1)
+        for month in months[keep].astype("datetime64[D]").tolist()
+    ], amounts[keep].tolist()
+
+
+def check_terms(amount, emi, tenure):
+    """400 unless amount, emi and tenure make a schedule, so a loan is never
+    stored with terms its repayment schedule cannot be built from"""
+
+    if emi is None or tenure is None:
+        raise HTTPException(status_code=400, detail="emi and tenure are required")
+
+    if amount <= 0 or emi <= 0 or tenure < 1:
+        raise HTTPException(
+            status_code=400, detail="amount, emi and tenure must be positive"
+        )
+
+    amortize(amount, emi, tenure, datetime.datetime.now())
+
+
+def schedule_rows(loan, amount, tenure, start_month):
+    months, amounts = amortize(amount, loan["emi"], tenure, start_month)
+
+    return [
+        {
+            "employee_id": loan["employee_id"],
+            "id": str(uuid.uuid4()).replace("-", ""),
+            "loan_id": loan["id"],
+            "month": month,
+            "amount": installment,
+            "status": "pending",
+            "adjusted": False,
+        }
+        for month, installment in zip(months, amounts)
+    ]
+
+
+def is_settled(row):
+    return row["status"] != "pending" or row.get("adjusted")
+
+
+class LoanSchedule:
+    """Repayment schedules in loan_schedule, the single source of truth.
+
+    The loan document only keeps the ids of its installments. sync() applies
+    a change to the loan and rewrites its pending installments in one
+    transaction, or in ordered writes on a server without transactions.
+    """
+
+    transactions = None
+
+    def __init__(self, mongo_client: AsyncIOMotorClient):
+        self.mongo_client = mongo_client
+        self.loans = mongo_client[MONGO_DATABASE][LOAN_COLLECTION]
+        self.schedule = mongo_client[MONGO_DATABASE][LOAN_SCHEDULE_COLLECTION]
+
+    async def sync(
+        self,
+        loan,
+        data_change=None,
+        expect=None,
+        conflict="Loan has already been approved or rejected",
+    ):
+        """Set data_change on the loan and recompute its schedule from the
+        resulting amount, emi and tenure. Installments already settled are
+        kept and the rest of the amount is spread over the months after them.
+
+        expect narrows the loan update, e.g. {"status": "pending"}; when the
+        loan no longer matches it nothing is written and this raises 400 with
+        conflict as the detail.
+        """
+
+        loan = {**loan, **(data_change or {})}
+
+        if LoanSchedule.transactions is not False:
+            try:
+                async with await self.mongo_client.start_session() as session:
+                    async with session.start_transaction():
+                        res, months = await self._write(
+                            loan, data_change, expect, conflict, session
+                        )
+                LoanSchedule.transactions = True
+            except OperationFailure as e:
+                if e.code != ILLEGAL_OPERATION:
+                    raise
+                LoanSchedule.transactions = False
+
+        if LoanSchedule.transactions is False:
+            res, months = await self._write(loan, data_change, expect, conflict)
+
+        res.pop("_id", None)
+
+        snapshot = PayslipSnapshot(self.mongo_client)
+        for month in sorted(months):
+            await snapshot.refresh(loan["employee_id"], month)
+
+        return res
+
+    async def _write(self, loan, data_change, expect, conflict, session=None):
+        """Recompute from the installments read in the same session, so a
+        transaction never writes a schedule derived from a stale read.
+        Returns the loan and every month whose deduction may have changed."""
+
+        existing = (
+            await self.schedule.find(
+                {"loan_id": loan["id"]}, {"_id": 0}, session=session
+            )
+            .sort("month", 1)
+            .to_list(None)
+        )
+        settled = [row for row in existing if is_settled(row)]
+
+        if settled:
+            start_month = settled[-1]["month"] + datetime.timedelta(days=32)
+        else:
+            start_month = loan["month"]
+
+        # The rest of the amount over the rest of the agreed term
+        rows = schedule_rows(
+            loan,
+            loan["amount"] - sum(row["amount"] for row in settled),
+            int(loan["tenure"]) - len(settled),
+            start_month,
+        )
+
+        # The loan goes first: it is the guard against two concurrent syncs,
+        # and without a transaction its ids are what a rerun recomputes from
+        res = await self.loans.find_one_and_update(
+            {"id": loan["id"], **(expect or {})},
+            {
+                "$set": {
+                    **(data_change or {}),
+                    "repayment_schedule": [row["id"] for row in settled + rows],
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if not res:
+            raise HTTPException(status_code=400, detail=conflict)
+
+        await self.schedule.delete_many(
+            {"loan_id": loan["id"], "status": "pending", "adjusted": {"$ne": True}},
+            session=session,
+        )
+
+        if rows:
+            await self.schedule.insert_many(rows, session=session)
+            for row in rows:
+                row.pop("_id", None)
+
+        months = {row["month"] for row in existing if not is_settled(row)}
+        months.update(row["month"] for row in rows)
+
+        return res, months
+
+    async def relink(self):
+        """Point every loan's repayment_schedule at the ids in loan_schedule.
+        Schedules built before the ids were kept in step embedded copies with
+        ids of their own."""
+
+        operations = []
+
+        async for row in self.schedule.aggregate(
+            [
+                {"$sort": {"loan_id": 1, "month": 1}},
+                {"$group": {"_id": "$loan_id", "ids": {"$push": "$id"}}},
+            ],
+            allowDiskUse=True,
+        ):
+            operations.append(
+                UpdateOne(
+                    {"id": row["_id"]}, {"$set": {"repayment_schedule": row["ids"]}}
+                )
+            )
+
+        if operations:
+            await self.loans.bulk_write(operations, ordered=False)
+
+        return len(operations)
@@ -1,4 +1,11 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
 from minio import Minio
+from minio.error import S3Error
 from app.core.config import Config
 from dotenv import load_dotenv
 import os
@@ -7,29 +14,134 @@ load_dotenv()
 
 ENVIRONMENT = os.getenv("ENVIRONMENT")
 
+# Cached URLs are re-signed once this fraction of their lifetime has passed
+URL_REFRESH_AFTER = 0.9
+
 
 class MinIO:
-    def __init__(self):
-        endpoint = Config.MINIO_ENDPOINT
-        access_key = Config.MINIO_ACCESS_KEY
-        secret_key = Config.MINIO_SECRET_KEY
+    """Application-scoped object storage.
 
-        self.bucket_name = "salary-management"
+    One Minio client is shared by every request. The bucket is checked once
+    at startup, and with the region configured presigned URLs are signed
+    locally without a round trip to the server. Signed URLs are cached until
+    shortly before they expire. Blocking calls that do talk to the server
+    (stat_object, put_object) run in a worker thread.
+    """
+
+    def __init__(
+        self,
+        bucket_name=Config.MINIO_BUCKET,
+        url_expiry_seconds=Config.MINIO_URL_EXPIRY_SECONDS,
+        url_cache_size=Config.MINIO_URL_CACHE_SIZE,
+    ):
+        self.bucket_name = bucket_name
         self.profile_prefix = "profile/"
+        self.url_expiry = timedelta(seconds=url_expiry_seconds)
+        self.url_cache_size = url_cache_size
 
-        self.client = Minio(
-            endpoint=endpoint,
-            access_key=access_key,
-            secret_key=secret_key,
-            secure=True if ENVIRONMENT == "prod" or ENVIRONMENT == "staging" else False,
-        )
+        self._client = None
+        self.urls = OrderedDict()
+        self.lock = threading.Lock()
 
-        try:
-            found = self.client.bucket_exists("salary-management")
-            if not found:
-                self.client.make_bucket("salary-management")
-            else:
-                pass
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Minio(
+                endpoint=Config.MINIO_ENDPOINT,
+                access_key=Config.MINIO_ACCESS_KEY,
+                secret_key=Config.MINIO_SECRET_KEY,
+                secure=True
+                if ENVIRONMENT == "prod" or ENVIRONMENT == "staging"
+                else False,
+                region=Config.MINIO_REGION,
+            )
+
+        return self._client
+
+    def ensure_bucket(self):
+        if not self.client.bucket_exists(self.bucket_name):
+            self.client.make_bucket(self.bucket_name)
 
+    async def start(self):
+        try:
+            await asyncio.to_thread(self.ensure_bucket)
         except Exception as e:
             print(e)
+
+    def presigned_url(self, object_name):
+        """Presigned GET URL for object_name, signed locally and cached"""
+
+        if not object_name:
+            return None
+
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.urls.get(object_name)
+
+            if cached and cached[1] > now:
+                self.urls.move_to_end(object_name)
+                self.hits += 1
+                return cached[0]
+
+        url = self.client.presigned_get_object(
+            self.bucket_name, object_name, expires=self.url_expiry
+        )
+
+        with self.lock:
+            self.misses += 1
+            self.urls[object_name] = (
+                url,
+                now + self.url_expiry.total_seconds() * URL_REFRESH_AFTER,
+            )
+            self.urls.move_to_end(object_name)
+
+            while len(self.urls) > self.url_cache_size:
+                self.urls.popitem(last=False)
+
+        return url
+
+    def presigned_urls(self, object_names):
+        """Batch of presigned URLs keyed by object name"""
+
+        return {name: self.presigned_url(name) for name in set(object_names) if name}
+
+    async def stat(self, object_name):
+        """Object metadata, None when the object does not exist"""
+
+        if not object_name:
+            return None
+
+        try:
+            return await asyncio.to_thread(
+                self.client.stat_object, self.bucket_name, object_name
+            )
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+
+    async def put(self, object_name, data, length, content_type, **kwargs):
+        return await asyncio.to_thread(
+            self.client.put_object,
+            self.bucket_name,
+            object_name,
+            data,
+            length=length,
+            content_type=content_type,
+            **kwargs
+        )
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "cached_urls": len(self.urls),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+storage = MinIO()
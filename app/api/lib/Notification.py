@@ -1,7 +1,8 @@
 from app.database import AsyncIOMotorClient
 from fastapi import HTTPException
 from app.core.config import Config
-from app.api.lib.RabbitMQ import RabbitMQ
+from app.api.lib.NotificationOutbox import notification_dispatcher, pending_delivery
+from app.api.crud import notifications as notification_crud
 
 from app.schemas.notification import NotificationBase, SendNotification
 
@@ -24,7 +25,6 @@ class Notification(object):
         self.sender_id = sender_id
         self.source = source
         self.mongo_client = mongo_client
-        self.mq = RabbitMQ()
 
     async def create_notification(self, notification: NotificationBase):
         notification_in_db = notification.model_dump()
@@ -33,11 +33,9 @@ class Notification(object):
         ):
             return notification_in_db
 
-    async def get_all_notifications(self):
-        return (
-            await self.mongo_client[MONGO_DATABASE][NOTIFICATION_COLLECTION]
-            .find({}, {"_id": 0})
-            .to_list(None)
+    async def get_all_notifications(self, targets, status=None, limit=20, cursor=None):
+        return await notification_crud.get_notifications(
+            targets, status, limit, cursor, self.mongo_client
         )
 
     async def get_notification(self, notification_id):
@@ -71,16 +69,38 @@ class Notification(object):
         pass
 
     async def send_notification(self, send: SendNotification):
+        """Write every recipient to the notification outbox with one
+        insert_many. Delivery to the employee_notification exchange happens in
+        the background dispatcher, so the caller never waits on the broker.
+        Role targets such as MD or HR_<branch> are routing keys, so the broker
+        fans them out to every bound queue.
+
+        Returns the outbox status of each recipient.
+        """
+
         recipients = send.notifier
 
+        if not recipients:
+            return []
+
+        delivery = pending_delivery()
+
+        await self.mongo_client[MONGO_DATABASE][NOTIFICATION_COLLECTION].insert_many(
+            [
+                {**recipient.model_dump(), "delivery": dict(delivery)}
+                for recipient in recipients
+            ]
+        )
+
+        counts = {}
         for recipient in recipients:
-            await self.create_notification(recipient)
-            recipient.title = recipient.description
+            counts[recipient.target] = counts.get(recipient.target, 0) + 1
+
+        await notification_crud.increment_unread(counts, self.mongo_client)
 
-            self.mq.publish(
-                exchange="employee_notification",
-                routing_key=recipient.target,
-                data=recipient.model_dump(),
-            )
+        notification_dispatcher.wake()
 
-        return True
+        return [
+            {"id": recipient.id, "target": recipient.target, "status": "pending"}
+            for recipient in recipients
+        ]
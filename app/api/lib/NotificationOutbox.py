@@ -0,0 +1,309 @@
+import asyncio
+import datetime
+import logging
+import os
+import socket
+import uuid
+
+from pymongo import UpdateOne
+
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+from app.api.lib.Publisher import publisher
+
+logger = logging.getLogger(__name__)
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+NOTIFICATION_COLLECTION = Config.NOTIFICATION_COLLECTION
+
+EXCHANGE = "employee_notification"
+
+# A claimed batch that is not settled within this many seconds (crashed
+# dispatcher) becomes claimable again
+CLAIM_SECONDS = 60
+
+RETRY_BACKOFF_SECONDS = 2
+RETRY_BACKOFF_MAX_SECONDS = 300
+
+
+def pending_delivery(now=None):
+    """Delivery subdocument stored with every new notification"""
+
+    return {
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now or datetime.datetime.now(),
+        "last_error": None,
+        "sent_at": None,
+    }
+
+
+def retry_delay(attempts):
+    return min(
+        RETRY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), RETRY_BACKOFF_MAX_SECONDS
+    )
+
+
+class NotificationDispatcher:
+    """Drains the notification outbox to the employee_notification exchange.
+
+    Request handlers only insert notifications with delivery.status "pending"
+    and wake the dispatcher, so their latency no longer depends on the broker.
+    The dispatcher claims due rows in batches, publishes them with one
+    publisher job and settles each row: "sent", "unroutable" (no queue is
+    bound for the target, retrying would not help), back to "pending" with
+    exponential backoff, or "failed" once max_attempts is reached.
+
+    Claims carry an owner and an expiry so several API processes can run a
+    dispatcher against the same collection.
+    """
+
+    def __init__(
+        self,
+        batch_size=Config.NOTIFICATION_OUTBOX_BATCH_SIZE,
+        poll_seconds=Config.NOTIFICATION_OUTBOX_POLL_SECONDS,
+        max_attempts=Config.NOTIFICATION_OUTBOX_MAX_ATTEMPTS,
+    ):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.owner = "{}:{}:{}".format(
+            socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8]
+        )
+
+        self.mongo_client = None
+        self.task = None
+        self.event = None
+
+        self.batches = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.unroutable = 0
+        self.last_error = None
+        self.last_run_at = None
+
+    def collection(self, mongo_client=None):
+        return (mongo_client or self.mongo_client)[MONGO_DATABASE][
+            NOTIFICATION_COLLECTION
+        ]
+
+    def start(self, mongo_client: AsyncIOMotorClient):
+        if self.task is not None:
+            return
+
+        self.mongo_client = mongo_client
+        self.event = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        task, self.task = self.task, None
+
+        if task is None:
+            return
+
+        task.cancel()
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+
+    async def run(self):
+        while True:
+            try:
+                # Keep draining while full batches come back
+                while await self.dispatch_batch() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = repr(e)
+                logger.error("Notification outbox dispatch failed: {}".format(e))
+
+            try:
+                await asyncio.wait_for(self.event.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+            self.event.clear()
+
+    def due_query(self, now):
+        return {
+            "$or": [
+                {
+                    "delivery.status": "pending",
+                    "delivery.next_attempt_at": {"$lte": now},
+                },
+                {
+                    "delivery.status": "sending",
+                    "delivery.claim_expires_at": {"$lte": now},
+                },
+            ]
+        }
+
+    async def claim(self, now):
+        ids = [
+            doc["id"]
+            async for doc in self.collection()
+            .find(self.due_query(now), {"_id": 0, "id": 1})
+            .sort("delivery.next_attempt_at", 1)
+            .limit(self.batch_size)
+        ]
+
+        if not ids:
+            return []
+
+        claim_id = uuid.uuid4().hex
+
+        # Re-checking the due filter makes the claim safe against another
+        # dispatcher that picked the same rows in between
+        await self.collection().update_many(
+            {"$and": [{"id": {"$in": ids}}, self.due_query(now)]},
+            {
+                "$set": {
+                    "delivery.status": "sending",
+                    "delivery.claim": claim_id,
+                    "delivery.owner": self.owner,
+                    "delivery.claim_expires_at": now
+                    + datetime.timedelta(seconds=CLAIM_SECONDS),
+                }
+            },
+        )
+
+        return (
+            await self.collection()
+            .find({"delivery.claim": claim_id}, {"_id": 0})
+            .to_list(None)
+        )
+
+    async def dispatch_batch(self):
+        now = datetime.datetime.now()
+        self.last_run_at = now
+
+        notifications = await self.claim(now)
+
+        if not notifications:
+            return 0
+
+        messages = []
+
+        for notification in notifications:
+            message = {
+                key: value for key, value in notification.items() if key != "delivery"
+            }
+            message["title"] = message["description"]
+            messages.append((EXCHANGE, notification["target"], message))
+
+        statuses = await publisher.publish_many(messages, mandatory=True)
+
+        settled_at = datetime.datetime.now()
+        updates = []
+
+        for notification, status in zip(notifications, statuses):
+            attempts = notification["delivery"].get("attempts", 0) + 1
+            update = {
+                "delivery.attempts": attempts,
+                "delivery.claim": None,
+                "delivery.owner": None,
+                "delivery.claim_expires_at": None,
+            }
+
+            if status == "confirmed":
+                self.sent += 1
+                update.update(
+                    {
+                        "delivery.status": "sent",
+                        "delivery.sent_at": settled_at,
+                        "delivery.last_error": None,
+                    }
+                )
+            elif status == "unroutable":
+                self.unroutable += 1
+                update.update(
+                    {"delivery.status": "unroutable", "delivery.last_error": status}
+                )
+            elif attempts >= self.max_attempts:
+                self.failed += 1
+                update.update(
+                    {"delivery.status": "failed", "delivery.last_error": status}
+                )
+            else:
+                self.retried += 1
+                update.update(
+                    {
+                        "delivery.status": "pending",
+                        "delivery.next_attempt_at": settled_at
+                        + datetime.timedelta(seconds=retry_delay(attempts)),
+                        "delivery.last_error": status,
+                    }
+                )
+
+            updates.append(
+                UpdateOne(
+                    {
+                        "id": notification["id"],
+                        "delivery.claim": notification["delivery"]["claim"],
+                    },
+                    {"$set": update},
+                )
+            )
+
+        await self.collection().bulk_write(updates, ordered=False)
+
+        self.batches += 1
+
+        return len(notifications)
+
+    async def metrics(self, mongo_client: AsyncIOMotorClient = None):
+        now = datetime.datetime.now()
+        collection = self.collection(mongo_client)
+
+        by_status = {
+            doc["_id"]: doc["count"]
+            async for doc in collection.aggregate(
+                [
+                    {"$match": {"delivery.status": {"$exists": True}}},
+                    {"$group": {"_id": "$delivery.status", "count": {"$sum": 1}}},
+                ]
+            )
+        }
+
+        oldest = await collection.find_one(
+            {"delivery.status": {"$in": ["pending", "sending"]}},
+            {"_id": 0, "created_at": 1, "delivery": 1},
+            sort=[("created_at", 1)],
+        )
+
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "owner": self.owner,
+            "batch_size": self.batch_size,
+            "poll_seconds": self.poll_seconds,
+            "max_attempts": self.max_attempts,
+            "outbox": by_status,
+            "oldest_pending_created_at": oldest["created_at"] if oldest else None,
+            "lag_seconds": round((now - oldest["created_at"]).total_seconds(), 3)
+            if oldest and oldest.get("created_at")
+            else 0,
+            "oldest_pending_attempts": oldest["delivery"].get("attempts", 0)
+            if oldest
+            else None,
+            "oldest_pending_last_error": oldest["delivery"].get("last_error")
+            if oldest
+            else None,
+            "batches": self.batches,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "unroutable": self.unroutable,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at,
+        }
+
+
+notification_dispatcher = NotificationDispatcher()
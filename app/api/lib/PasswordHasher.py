@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.core.config import Config
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """Runs bcrypt hash/verify on a bounded thread pool off the event loop.
+
+    bcrypt releases the GIL while it works, so threads give real parallelism
+    without the pickling cost of a process pool. At most max_workers hashes
+    run at once; when max_queue is set, calls beyond that many pending ones
+    are rejected with 503 instead of piling up behind a login burst.
+    """
+
+    def __init__(
+        self,
+        max_workers=Config.PASSWORD_HASHER_WORKERS,
+        max_queue=Config.PASSWORD_HASHER_MAX_QUEUE,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hasher"
+        )
+        self.lock = threading.Lock()
+
+        self.pending = 0
+        self.running = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _run(self, submitted_at, fn, *args):
+        started_at = time.perf_counter()
+
+        with self.lock:
+            self.running += 1
+            self.wait_seconds += started_at - submitted_at
+
+        try:
+            return fn(*args)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_seconds += time.perf_counter() - started_at
+
+    async def _submit(self, fn, *args):
+        if self.max_queue and self.pending >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many password requests in progress, try again shortly",
+            )
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._run, time.perf_counter(), fn, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(pwd_context.verify, plain_password, hashed_password)
+
+    def metrics(self):
+        with self.lock:
+            running = self.running
+            completed = self.completed
+            wait_seconds = self.wait_seconds
+            run_seconds = self.run_seconds
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue or None,
+            "running": running,
+            "queued": max(self.pending - running, 0),
+            "peak_pending": self.peak_pending,
+            "completed": completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(wait_seconds / completed * 1000, 2)
+            if completed
+            else None,
+            "avg_run_ms": round(run_seconds / completed * 1000, 2)
+            if completed
+            else None,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
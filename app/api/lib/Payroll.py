@@ -0,0 +1,169 @@
+import asyncio
+
+import pandas as pd
+
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+EMPLOYEE_COLLECTION = Config.EMPLOYEE_COLLECTION
+SALARY_COLLECTION = Config.SALARY_COLLECTION
+MONTHLY_COMPENSATION_COLLECTION = Config.MONTHLY_COMPENSATION_COLLECTION
+SALARY_INCENTIVES_COLLECTION = Config.SALARY_INCENTIVES_COLLECTION
+SALARY_ADVANCE_COLLECTION = Config.SALARY_ADVANCE_COLLECTION
+LOAN_SCHEDULE_COLLECTION = Config.LOAN_SCHEDULE_COLLECTION
+
+SALARY_FIELDS = ["gross_salary", "pf", "esi"]
+
+MONTHLY_COMPENSATION_FIELDS = [
+    "loss_of_pay",
+    "leave_cashback",
+    "last_year_leave_cashback",
+    "attendance_special_allowance",
+    "other_special_allowance",
+    "overtime",
+]
+
+SALARY_INCENTIVES_FIELDS = ["allowance", "increment", "bonus"]
+
+# Same arithmetic as the net_salary stage of
+# pipelines.get_employee_with_salary_details
+EARNINGS = [
+    "gross_salary",
+    "attendance_special_allowance",
+    "leave_cashback",
+    "last_year_leave_cashback",
+    "other_special_allowance",
+    "overtime",
+    "allowance",
+    "increment",
+    "bonus",
+]
+
+DEDUCTIONS = ["pf", "esi", "loss_of_pay", "salary_advance", "loan"]
+
+PAYROLL_COLUMNS = (
+    SALARY_FIELDS
+    + MONTHLY_COMPENSATION_FIELDS
+    + ["salary_advance", "loan"]
+    + SALARY_INCENTIVES_FIELDS
+    + ["net_salary"]
+)
+
+
+class Payroll:
+    """Set-based net salary computation for many employees at once.
+
+    Each salary component collection is read exactly once per call and the
+    rows are joined in memory on employee_id, instead of running the
+    correlated $lookup pipeline once per employee document.
+    """
+
+    def __init__(self, mongo_client: AsyncIOMotorClient):
+        self.mongo_client = mongo_client
+        self.db = mongo_client[MONGO_DATABASE]
+
+    async def get_employees(self, employee_ids=None, branch=None):
+        query = {}
+        if employee_ids is not None:
+            query["employee_id"] = {"$in": list(employee_ids)}
+        if branch is not None:
+            query["branch"] = branch
+
+        return await self.db[EMPLOYEE_COLLECTION].find(query, {"_id": 0}).to_list(None)
+
+    async def _find_components(self, collection, fields, employee_ids, month):
+        projection = {"_id": 0, "employee_id": 1}
+        projection.update({field: 1 for field in fields})
+
+        rows = (
+            await self.db[collection]
+            .find({"employee_id": {"$in": employee_ids}, "month": month}, projection)
+            .to_list(None)
+        )
+
+        frame = pd.DataFrame(rows, columns=["employee_id"] + fields)
+
+        # The $lookup pipeline picks the first matching document per employee
+        return frame.drop_duplicates("employee_id").set_index("employee_id")
+
+    async def _sum_components(self, collection, name, employee_ids, month, **match):
+        pipeline = [
+            {
+                "$match": {
+                    "employee_id": {"$in": employee_ids},
+                    "month": month,
+                    **match,
+                }
+            },
+            {"$group": {"_id": "$employee_id", name: {"$sum": "$amount"}}},
+        ]
+
+        rows = await self.db[collection].aggregate(pipeline).to_list(None)
+
+        frame = pd.DataFrame(rows, columns=["_id", name])
+
+        return frame.rename(columns={"_id": "employee_id"}).set_index("employee_id")
+
+    async def compute(self, month, employee_ids) -> pd.DataFrame:
+        """Return one row per employee_id with every salary column and net_salary"""
+
+        employee_ids = list(dict.fromkeys(employee_ids))
+
+        frame = pd.DataFrame(index=pd.Index(employee_ids, name="employee_id"))
+
+        if not employee_ids:
+            return frame.reindex(columns=PAYROLL_COLUMNS)
+
+        components = await asyncio.gather(
+            self._find_components(
+                SALARY_COLLECTION, SALARY_FIELDS, employee_ids, month
+            ),
+            self._find_components(
+                MONTHLY_COMPENSATION_COLLECTION,
+                MONTHLY_COMPENSATION_FIELDS,
+                employee_ids,
+                month,
+            ),
+            self._find_components(
+                SALARY_INCENTIVES_COLLECTION,
+                SALARY_INCENTIVES_FIELDS,
+                employee_ids,
+                month,
+            ),
+            self._sum_components(
+                SALARY_ADVANCE_COLLECTION,
+                "salary_advance",
+                employee_ids,
+                month,
+                status="approved",
+            ),
+            self._sum_components(LOAN_SCHEDULE_COLLECTION, "loan", employee_ids, month),
+        )
+
+        for component in components:
+            frame = frame.join(component)
+
+        frame = frame.reindex(columns=PAYROLL_COLUMNS[:-1])
+        frame = frame.apply(pd.to_numeric, errors="coerce").fillna(0.0)
+
+        frame["net_salary"] = frame[EARNINGS].sum(axis=1) - frame[DEDUCTIONS].sum(
+            axis=1
+        )
+
+        return frame
+
+    async def get_employees_with_salary(self, month, employee_ids=None, branch=None):
+        """Employee documents merged with their salary columns for the month.
+
+        The records have the same shape as the documents produced by
+        pipelines.get_employee_with_salary_details.
+        """
+
+        employees = await self.get_employees(employee_ids=employee_ids, branch=branch)
+
+        frame = await self.compute(month, [emp["employee_id"] for emp in employees])
+
+        salaries = frame.to_dict("index")
+
+        return [{**emp, **salaries[emp["employee_id"]]} for emp in employees]
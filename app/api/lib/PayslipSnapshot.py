@@ -0,0 +1,157 @@
+import datetime
+
+from pymongo import ReplaceOne
+
+from app.api.lib.Payroll import Payroll, PAYROLL_COLUMNS
+from app.api.utils import get_next_month
+from app.core import pipelines
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+EMPLOYEE_COLLECTION = Config.EMPLOYEE_COLLECTION
+PAYSLIP_SNAPSHOT_COLLECTION = Config.PAYSLIP_SNAPSHOT_COLLECTION
+
+SNAPSHOT_PROJECTION = {"_id": 0, "employee_id": 1, **{k: 1 for k in PAYROLL_COLUMNS}}
+
+
+class PayslipSnapshot:
+    """Materialized net salary per (employee_id, month).
+
+    Every write that changes a salary input refreshes only the affected
+    employee-month, so reads are a single indexed find_one.
+    """
+
+    def __init__(self, mongo_client: AsyncIOMotorClient):
+        self.mongo_client = mongo_client
+        self.collection = mongo_client[MONGO_DATABASE][PAYSLIP_SNAPSHOT_COLLECTION]
+
+    async def refresh(self, employee_id, month):
+        snapshots = await self.refresh_many(month, [employee_id])
+        return snapshots.get(employee_id)
+
+    async def refresh_many(self, month, employee_ids=None):
+        payroll = Payroll(self.mongo_client)
+
+        if employee_ids is None:
+            employee_ids = await self.mongo_client[MONGO_DATABASE][
+                EMPLOYEE_COLLECTION
+            ].distinct("employee_id")
+
+        frame = await payroll.compute(month, employee_ids)
+
+        snapshots = frame.to_dict("index")
+
+        refreshed_at = datetime.datetime.now()
+
+        operations = [
+            ReplaceOne(
+                {"employee_id": employee_id, "month": month},
+                {
+                    "employee_id": employee_id,
+                    "month": month,
+                    **snapshot,
+                    "refreshed_at": refreshed_at,
+                },
+                upsert=True,
+            )
+            for employee_id, snapshot in snapshots.items()
+        ]
+
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+        return {
+            employee_id: {"employee_id": employee_id, **snapshot}
+            for employee_id, snapshot in snapshots.items()
+        }
+
+    async def get(self, employee_id, month):
+        snapshot = await self.collection.find_one(
+            {"employee_id": employee_id, "month": month}, SNAPSHOT_PROJECTION
+        )
+
+        if snapshot:
+            return snapshot
+
+        return await self.refresh(employee_id, month)
+
+    async def get_many(self, employee_ids, month):
+        snapshots = {
+            snapshot["employee_id"]: snapshot
+            async for snapshot in self.collection.find(
+                {"employee_id": {"$in": list(employee_ids)}, "month": month},
+                SNAPSHOT_PROJECTION,
+            )
+        }
+
+        missing = [i for i in employee_ids if i not in snapshots]
+
+        if missing:
+            snapshots.update(await self.refresh_many(month, missing))
+
+        return snapshots
+
+    async def rebuild(self, start_month, end_month, employee_ids=None):
+        """Backfill every month from start_month to end_month, both inclusive"""
+
+        month = start_month
+        rebuilt = {}
+
+        while month <= end_month:
+            snapshots = await self.refresh_many(month, employee_ids)
+            rebuilt[month] = len(snapshots)
+
+            next_month, next_year = get_next_month(month.month, month.year)
+            month = datetime.datetime(next_year, next_month, 1)
+
+        return rebuilt
+
+    async def check(self, month, employee_ids=None):
+        """Diff the snapshot against the live $lookup pipeline for a month"""
+
+        if employee_ids is None:
+            employee_ids = await self.mongo_client[MONGO_DATABASE][
+                EMPLOYEE_COLLECTION
+            ].distinct("employee_id")
+
+        pipeline = await pipelines.get_employee_with_salary_details(
+            list(employee_ids), month
+        )
+
+        live = {
+            emp["employee_id"]: emp
+            async for emp in self.mongo_client[MONGO_DATABASE][
+                EMPLOYEE_COLLECTION
+            ].aggregate(pipeline)
+        }
+
+        snapshots = {
+            snapshot["employee_id"]: snapshot
+            async for snapshot in self.collection.find(
+                {"employee_id": {"$in": list(live.keys())}, "month": month},
+                SNAPSHOT_PROJECTION,
+            )
+        }
+
+        mismatches = []
+
+        for employee_id, emp in live.items():
+            snapshot = snapshots.get(employee_id)
+
+            if not snapshot:
+                mismatches.append({"employee_id": employee_id, "field": None})
+                continue
+
+            for field in PAYROLL_COLUMNS:
+                if abs(snapshot.get(field, 0) - (emp.get(field) or 0)) > 1e-6:
+                    mismatches.append(
+                        {
+                            "employee_id": employee_id,
+                            "field": field,
+                            "snapshot": snapshot.get(field),
+                            "live": emp.get(field),
+                        }
+                    )
+
+        return mismatches
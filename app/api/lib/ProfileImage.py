@@ -0,0 +1,179 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image, ImageOps
+
+from app.core.config import Config
+
+CHUNK_SIZE = 64 * 1024
+
+# Multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Refuse images that would decode to more pixels than this (decompression bombs)
+MAX_PIXELS = 40_000_000
+
+WEBP_QUALITY = 85
+
+# Variant name -> square edge in pixels, None keeps the original dimensions
+VARIANTS = {"64": 64, "256": 256, "original": None}
+
+
+def sniff(head: bytes):
+    """Content type from the file's magic bytes, None when not an allowed image"""
+
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def profile_image_prefix(employee_id):
+    return "profile/{}".format(employee_id)
+
+
+def variant_path(profile_image_path, variant):
+    """Object name of a variant of an uploaded profile image. Images uploaded
+    before variants existed are stored as a single object, which is returned
+    for every variant."""
+
+    if not profile_image_path or not profile_image_path.endswith("/original.webp"):
+        return profile_image_path
+
+    return "{}/{}.webp".format(profile_image_path.rsplit("/", 1)[0], variant)
+
+
+class UploadSizeLimitMiddleware:
+    """Caps the request body of the given paths while it is being received.
+
+    Starlette spools a multipart body to disk before the route or any of its
+    dependencies run, so the cap has to sit on the ASGI receive channel. A
+    Content-Length over the cap is refused before anything is read; a body
+    without one (chunked) fails with 413 as soon as it passes the cap.
+    """
+
+    def __init__(self, app, paths, max_bytes):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+
+        if content_length and content_length.isdigit():
+            if int(content_length) > self.max_bytes:
+                response = JSONResponse(
+                    {"detail": "Profile image is too large"}, status_code=413
+                )
+                return await response(scope, receive, send)
+
+        received = 0
+        too_large = False
+
+        async def capped_receive():
+            nonlocal received, too_large
+
+            message = await receive()
+
+            if message["type"] == "http.request" and not too_large:
+                received += len(message.get("body", b""))
+
+                if received > self.max_bytes:
+                    # Stop reading and end the body here; whatever the route
+                    # answers to the truncated form is replaced with the 413
+                    too_large = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+
+            return message
+
+        async def capped_send(message):
+            if not too_large:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                response = JSONResponse(
+                    {"detail": "Profile image is too large"}, status_code=413
+                )
+                await response(scope, receive, send)
+
+        await self.app(scope, capped_receive, capped_send)
+
+
+async def read_capped(file: UploadFile, max_bytes=Config.PROFILE_IMAGE_MAX_BYTES):
+    """Read the spooled upload in chunks, failing with 413 as soon as it passes
+    max_bytes. This bounds memory; the upload itself is capped while it is
+    received by UploadSizeLimitMiddleware."""
+
+    data = bytearray()
+
+    while chunk := await file.read(CHUNK_SIZE):
+        data += chunk
+
+        if len(data) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail="Profile image must be at most {} MB".format(
+                    round(max_bytes / (1024 * 1024), 1)
+                ),
+            )
+
+    return bytes(data)
+
+
+def render_variants(data: bytes):
+    """Decode once and encode every variant as WebP"""
+
+    image = Image.open(io.BytesIO(data))
+
+    if image.width * image.height > MAX_PIXELS:
+        raise ValueError("Image has too many pixels")
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+
+    for name, size in VARIANTS.items():
+        variant = image if size is None else ImageOps.fit(image, (size, size))
+
+        buffer = io.BytesIO()
+        variant.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        variants[name] = buffer.getvalue()
+
+    return variants
+
+
+class ProfileImageProcessor:
+    """Decodes and re-encodes profile images on a bounded thread pool.
+
+    Pillow releases the GIL while resizing and encoding, so threads keep the
+    event loop free without pickling image bytes to another process.
+    """
+
+    def __init__(self, max_workers=Config.PROFILE_IMAGE_WORKERS):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="profile-image"
+        )
+
+    async def render(self, data: bytes):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, render_variants, data
+            )
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise HTTPException(status_code=400, detail="Invalid image file")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+profile_images = ProfileImageProcessor()
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pika
+from pika.exceptions import (
+    AMQPChannelError,
+    AMQPConnectionError,
+    NackError,
+    UnroutableError,
+)
+
+from app.core.config import Config
+from app.api.lib.RabbitMQ import CustomEncoder
+
+logger = logging.getLogger(__name__)
+
+# Idle workers service heartbeats at this interval
+HEARTBEAT_INTERVAL = 10
+
+RECONNECT_BACKOFF = [0.2, 1, 5]
+
+
+class PublishError(Exception):
+    pass
+
+
+class PublisherWorker(threading.Thread):
+    """Owns one BlockingConnection and one confirm channel.
+
+    pika connections are not thread safe, so every AMQP call for this
+    connection happens on this thread.
+    """
+
+    def __init__(self, publisher, index):
+        super().__init__(name="rabbitmq-publisher-{}".format(index), daemon=True)
+        self.publisher = publisher
+        self.connection = None
+        self.channel = None
+
+    def connect(self):
+        self.close()
+
+        self.connection = pika.BlockingConnection(
+            pika.ConnectionParameters(
+                host=Config.RABBITMQ_HOST,
+                credentials=pika.PlainCredentials(
+                    Config.RABBITMQ_USERNAME, Config.RABBITMQ_PASSWORD
+                ),
+                heartbeat=HEARTBEAT_INTERVAL * 6,
+                blocked_connection_timeout=30,
+            )
+        )
+        self.channel = self.connection.channel()
+        self.channel.confirm_delivery()
+
+        self.publisher.connects += 1
+
+    def ensure_channel(self):
+        if self.connection is None or self.connection.is_closed:
+            self.connect()
+        elif self.channel is None or self.channel.is_closed:
+            self.channel = self.connection.channel()
+            self.channel.confirm_delivery()
+
+        return self.channel
+
+    def close(self):
+        try:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
+
+        self.connection = None
+        self.channel = None
+
+    def execute(self, future, fn):
+        retries = self.publisher.retries
+
+        for attempt in range(retries + 1):
+            try:
+                future.set_result(fn(self.ensure_channel()))
+                return
+            except (NackError, UnroutableError) as e:
+                # Nacked and unroutable messages are answers, not outages
+                future.set_exception(PublishError(repr(e)))
+                return
+            except (AMQPConnectionError, AMQPChannelError) as e:
+                logger.warning(
+                    "RabbitMQ publisher {} attempt {} failed: {}".format(
+                        self.name, attempt + 1, repr(e)
+                    )
+                )
+
+                if isinstance(e, AMQPConnectionError):
+                    self.close()
+                else:
+                    self.channel = None
+
+                if attempt < retries:
+                    time.sleep(
+                        RECONNECT_BACKOFF[min(attempt, len(RECONNECT_BACKOFF) - 1)]
+                    )
+                    continue
+
+                future.set_exception(PublishError(repr(e)))
+            except Exception as e:
+                future.set_exception(e)
+                return
+
+    def run(self):
+        while True:
+            try:
+                job = self.publisher.jobs.get(timeout=HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                try:
+                    if self.connection is not None and self.connection.is_open:
+                        self.connection.process_data_events(time_limit=0)
+                except Exception:
+                    self.close()
+                continue
+
+            if job is None:
+                break
+
+            future, fn = job
+
+            if future.set_running_or_notify_cancel():
+                self.execute(future, fn)
+
+        self.close()
+
+
+class Publisher:
+    """Application-scoped RabbitMQ publisher.
+
+    A small pool of worker threads, each with its own connection and confirm
+    channel, takes jobs from a shared queue. Coroutines await a future that
+    resolves once the broker has confirmed the message, so no blocking AMQP
+    call runs on the event loop and no request opens its own connection.
+    """
+
+    def __init__(
+        self,
+        channels=Config.RABBITMQ_PUBLISHER_CHANNELS,
+        retries=Config.RABBITMQ_PUBLISH_RETRIES,
+    ):
+        self.channels = channels
+        self.retries = retries
+        self.jobs = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+
+        self.published = 0
+        self.failed = 0
+        self.connects = 0
+
+    def start(self):
+        with self.lock:
+            if self.workers:
+                return
+
+            self.workers = [PublisherWorker(self, i) for i in range(self.channels)]
+
+            for worker in self.workers:
+                worker.start()
+
+    async def stop(self):
+        with self.lock:
+            workers, self.workers = self.workers, []
+
+        for _ in workers:
+            self.jobs.put(None)
+
+        for worker in workers:
+            await asyncio.to_thread(worker.join, 5)
+
+    async def run(self, fn):
+        """Run fn(channel) on a publisher thread and await its result"""
+
+        if not self.workers:
+            self.start()
+
+        future = Future()
+        self.jobs.put((future, fn))
+
+        return await asyncio.wrap_future(future)
+
+    async def publish(self, data, exchange, routing_key):
+        status = (await self.publish_many([(exchange, routing_key, data)]))[0]
+
+        if status != "confirmed":
+            raise PublishError(status)
+
+    async def publish_many(self, messages, mandatory=False):
+        """Publish (exchange, routing_key, data) tuples as a single worker job.
+
+        Returns one status per message: "confirmed", "unroutable" (mandatory
+        and no queue is bound to the routing key), "nacked" or "failed". A
+        reconnect in the middle of the batch resumes after the last message
+        the broker confirmed.
+        """
+
+        bodies = [
+            (exchange, routing_key, json.dumps(data, cls=CustomEncoder))
+            for exchange, routing_key, data in messages
+        ]
+        statuses = [None] * len(bodies)
+
+        def publish(channel):
+            for i, (exchange, routing_key, body) in enumerate(bodies):
+                if statuses[i] is not None:
+                    continue
+
+                try:
+                    channel.basic_publish(
+                        exchange=exchange,
+                        routing_key=routing_key,
+                        body=body,
+                        properties=pika.BasicProperties(delivery_mode=2),
+                        mandatory=mandatory,
+                    )
+                    statuses[i] = "confirmed"
+                except UnroutableError:
+                    statuses[i] = "unroutable"
+                except NackError:
+                    statuses[i] = "nacked"
+
+        if bodies:
+            try:
+                await self.run(publish)
+            except Exception as e:
+                logger.error("Error while publishing message to RabbitMQ: {}".format(e))
+
+        statuses = [status or "failed" for status in statuses]
+
+        self.published += statuses.count("confirmed")
+        self.failed += len(statuses) - statuses.count("confirmed")
+
+        return statuses
+
+    async def ensure_exchange(self, exchange, type="topic"):
+        return await self.run(
+            lambda channel: channel.exchange_declare(
+                exchange=exchange, exchange_type=type, durable=True
+            )
+        )
+
+    async def ensure_queue(self, queue, durable=True):
+        return await self.run(
+            lambda channel: channel.queue_declare(queue=queue, durable=durable)
+        )
+
+    async def bind_queue(self, queue, exchange, routing_key):
+        return await self.run(
+            lambda channel: channel.queue_bind(
+                exchange=exchange, queue=queue, routing_key=routing_key
+            )
+        )
+
+    async def unbind_queue(self, queue, exchange, routing_key):
+        return await self.run(
+            lambda channel: channel.queue_unbind(queue, exchange, routing_key)
+        )
+
+    def metrics(self):
+        return {
+            "channels": self.channels,
+            "alive_workers": sum(worker.is_alive() for worker in self.workers),
+            "queued_jobs": self.jobs.qsize(),
+            "published": self.published,
+            "failed": self.failed,
+            "connects": self.connects,
+        }
+
+
+publisher = Publisher()
@@ -0,0 +1,200 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import Counter
+
+from loguru import logger
+from pymongo import monitoring
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import Config
+
+# Commands the driver issues on its own; they are not the request's doing
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions"}
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+def query_shape(value):
+    """The field names of a filter without its values, so two queries that
+    differ only in the values they look up have the same shape"""
+
+    if isinstance(value, dict):
+        return (
+            "{" + ",".join(k + query_shape(v) for k, v in sorted(value.items())) + "}"
+        )
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return "[" + ",".join(query_shape(v) for v in value) + "]"
+    return ""
+
+
+def command_filter(command_name, command):
+    if command_name in ("find", "count", "distinct"):
+        return command.get("filter") or command.get("query")
+    if command_name == "findAndModify":
+        return command.get("query")
+    if command_name in ("update", "delete"):
+        statements = command.get(command_name + "s") or [{}]
+        return statements[0].get("q")
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return pipeline[0].get("$match")
+    return None
+
+
+class RequestProfile:
+    """Mongo commands issued while serving one request.
+
+    Motor runs every command on a worker thread with a copy of the request's
+    context, so the listener finds this profile through current_profile and
+    records into it from those threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest = None
+        self.shapes = Counter()
+
+    def start(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = None
+
+        shape = "{} {} {}".format(
+            event.command_name,
+            collection,
+            query_shape(command_filter(event.command_name, event.command)),
+        )
+
+        with self.lock:
+            self.started[(event.connection_id, event.request_id)] = (
+                event.command_name,
+                collection,
+                shape,
+            )
+
+    def finish(self, event):
+        with self.lock:
+            started = self.started.pop((event.connection_id, event.request_id), None)
+            if started is None:
+                return
+
+            command_name, collection, shape = started
+            duration_ms = event.duration_micros / 1000
+
+            self.count += 1
+            self.total_ms += duration_ms
+            self.shapes[shape] += 1
+
+            if duration_ms >= self.slowest_ms:
+                self.slowest_ms = duration_ms
+                self.slowest = "{} {}".format(command_name, collection or "-")
+
+    def repeated(self, threshold):
+        """Shapes issued more than threshold times, the usual sign of N+1"""
+
+        with self.lock:
+            return {
+                shape: count
+                for shape, count in self.shapes.items()
+                if count > threshold
+            }
+
+    def server_timing(self):
+        timings = ['db;dur={:.1f};desc="{} commands"'.format(self.total_ms, self.count)]
+
+        if self.slowest:
+            timings.append(
+                'db-slowest;dur={:.1f};desc="{}"'.format(self.slowest_ms, self.slowest)
+            )
+
+        return ", ".join(timings)
+
+
+class QueryProfiler(monitoring.CommandListener):
+    """Command listener that attributes each command to the request in flight.
+    Commands issued outside a request (crons, the outbox dispatcher) are not
+    recorded."""
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+
+        profile = current_profile.get()
+        if profile is not None:
+            profile.start(event)
+
+    def succeeded(self, event):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish(event)
+
+    def failed(self, event):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish(event)
+
+
+class QueryProfilerMiddleware(BaseHTTPMiddleware):
+    """Logs every request with its Mongo round trips and returns them in a
+    Server-Timing header. With n_plus_one set, warns when one request issues
+    more than that many commands of the same shape."""
+
+    def __init__(self, app, n_plus_one=Config.QUERY_PROFILER_N_PLUS_ONE):
+        super().__init__(app)
+        self.n_plus_one = n_plus_one
+
+    async def dispatch(self, request, call_next):
+        rid = uuid.uuid4().hex[:8]
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        start = time.perf_counter()
+
+        try:
+            response = await call_next(request)
+        finally:
+            current_profile.reset(token)
+
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        response.headers["Server-Timing"] = "{}, app;dur={:.1f}".format(
+            profile.server_timing(), duration_ms
+        )
+
+        log = logger.bind(
+            rid=rid,
+            method=request.method,
+            path=request.url.path,
+            status_code=response.status_code,
+            duration_ms=round(duration_ms, 2),
+            db_commands=profile.count,
+            db_ms=round(profile.total_ms, 2),
+            db_slowest=profile.slowest,
+            db_slowest_ms=round(profile.slowest_ms, 2),
+        )
+        log.info(
+            "rid={} {} {} status_code={} completed_in={:.2f}ms db={}/{:.2f}ms",
+            rid,
+            request.method,
+            request.url.path,
+            response.status_code,
+            duration_ms,
+            profile.count,
+            profile.total_ms,
+        )
+
+        if self.n_plus_one:
+            for shape, count in profile.repeated(self.n_plus_one).items():
+                log.warning(
+                    "rid={} possible N+1: {} issued {} times", rid, shape, count
+                )
+
+        return response
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,142 @@
+import csv
+import io
+import tempfile
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle
+
+from fastapi import HTTPException
+
+# Reports larger than this are spooled to disk instead of memory
+SPOOL_MAX_SIZE = 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+# Registered once per workbook and referenced by name from every styled cell
+BOLD_STYLE = "report_bold"
+
+FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+
+class ReportSheet:
+    def __init__(self, writer, title):
+        self.writer = writer
+        self.title = title
+
+        if writer.format == "xlsx":
+            self.worksheet = writer.workbook.create_sheet(title)
+        else:
+            self.file = tempfile.SpooledTemporaryFile(
+                max_size=SPOOL_MAX_SIZE, mode="w+", newline=""
+            )
+            self.csv = csv.writer(self.file)
+
+    def append(self, row, bold=False):
+        if self.writer.format == "csv":
+            self.csv.writerow(row)
+            return
+
+        if bold:
+            row = [self._bold_cell(value) for value in row]
+
+        self.worksheet.append(row)
+
+    def _bold_cell(self, value):
+        cell = WriteOnlyCell(self.worksheet, value=value)
+        cell.style = BOLD_STYLE
+        return cell
+
+    async def append_cursor(self, cursor, to_row, total_field=None):
+        """Append one row per document of a Motor cursor, returning the total"""
+
+        total = 0
+
+        async for doc in cursor:
+            self.append(to_row(doc))
+
+            if total_field:
+                total += doc[total_field] or 0
+
+        return total
+
+
+class ReportWriter:
+    """Writes a report row by row and streams the finished file.
+
+    xlsx sheets use openpyxl's write-only mode, which flushes rows to a
+    temporary file as they are appended, so memory does not grow with the
+    number of rows. csv writes each sheet to its own spooled file and joins
+    them on close.
+    """
+
+    def __init__(self, format="xlsx", filename="report"):
+        if format not in FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid format. Expected one of: {}".format(
+                    ", ".join(FORMATS.keys())
+                ),
+            )
+
+        self.format = format
+        self.filename = "{}.{}".format(filename, format)
+        self.media_type = FORMATS[format]
+        self.sheets = []
+        self.file = None
+
+        if format == "xlsx":
+            self.workbook = openpyxl.Workbook(write_only=True)
+            self.workbook.add_named_style(
+                NamedStyle(name=BOLD_STYLE, font=Font(bold=True))
+            )
+
+    def create_sheet(self, title):
+        # Sheets keep their creation order, so builders that run concurrently
+        # must create their sheets before their first await
+        sheet = ReportSheet(self, title)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+        if self.format == "xlsx":
+            if not self.sheets:
+                self.workbook.create_sheet()
+
+            self.workbook.save(self.file)
+        else:
+            output = io.TextIOWrapper(self.file, newline="", write_through=True)
+
+            for i, sheet in enumerate(self.sheets):
+                # A csv has no tabs, so later sheets follow under their title
+                if i:
+                    output.write("\r\n{}\r\n".format(sheet.title))
+
+                sheet.file.seek(0)
+
+                while chunk := sheet.file.read(CHUNK_SIZE):
+                    output.write(chunk)
+
+                sheet.file.close()
+
+            output.detach()
+
+        self.file.seek(0)
+
+        return self
+
+    def iter_chunks(self):
+        try:
+            while chunk := self.file.read(CHUNK_SIZE):
+                yield chunk
+        finally:
+            self.file.close()
+
+    @property
+    def headers(self):
+        return {"Content-Disposition": "attachment; filename={}".format(self.filename)}
@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+
+from app.core.config import Config
+from app.database import AsyncIOMotorClient
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+USERS_COLLECTION = Config.USERS_COLLECTION
+
+REDIS_KEY = "user_exists:{}"
+
+
+class UserCache:
+    """uuid -> "this user still exists", checked on every authenticated call.
+
+    The memory backend is a per-process TTL/LRU map. The redis backend is
+    shared by every replica, so an invalidation on one replica is seen by
+    all of them; with the memory backend the TTL bounds how long another
+    replica can keep a stale entry. Only existing users are cached.
+    """
+
+    def __init__(
+        self,
+        backend=Config.USER_CACHE_BACKEND,
+        ttl=Config.USER_CACHE_TTL_SECONDS,
+        max_size=Config.USER_CACHE_MAX_SIZE,
+        redis_url=Config.REDIS_URL,
+    ):
+        if backend not in ["memory", "redis", "off"]:
+            raise ValueError("Unknown user cache backend {}".format(backend))
+
+        self.backend = backend
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.redis = None
+
+        if backend == "redis":
+            import redis.asyncio as redis
+
+            self.redis = redis.from_url(redis_url)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def _get(self, uuid):
+        if self.backend == "redis":
+            return await self.redis.exists(REDIS_KEY.format(uuid)) == 1
+
+        entry = self.entries.get(uuid)
+
+        if entry is None:
+            return False
+
+        if entry < time.monotonic():
+            del self.entries[uuid]
+            return False
+
+        self.entries.move_to_end(uuid)
+
+        return True
+
+    async def _set(self, uuid):
+        if self.backend == "redis":
+            await self.redis.set(REDIS_KEY.format(uuid), 1, ex=self.ttl)
+            return
+
+        self.entries[uuid] = time.monotonic() + self.ttl
+        self.entries.move_to_end(uuid)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def exists(self, uuid, mongo_client: AsyncIOMotorClient):
+        if self.backend != "off" and await self._get(uuid):
+            self.hits += 1
+            return True
+
+        self.misses += 1
+
+        user = await mongo_client[MONGO_DATABASE][USERS_COLLECTION].find_one(
+            {"uuid": uuid}, {"_id": 1}
+        )
+
+        if not user:
+            return False
+
+        if self.backend != "off":
+            await self._set(uuid)
+
+        return True
+
+    async def invalidate(self, *uuids):
+        uuids = [uuid for uuid in uuids if uuid]
+
+        if not uuids or self.backend == "off":
+            return
+
+        self.invalidations += len(uuids)
+
+        if self.backend == "redis":
+            await self.redis.delete(*[REDIS_KEY.format(uuid) for uuid in uuids])
+            return
+
+        for uuid in uuids:
+            self.entries.pop(uuid, None)
+
+    async def invalidate_where(self, query, mongo_client: AsyncIOMotorClient):
+        """Invalidate every user matching a users collection query"""
+
+        uuids = await mongo_client[MONGO_DATABASE][USERS_COLLECTION].distinct(
+            "uuid", query
+        )
+
+        await self.invalidate(*uuids)
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+
+        return {
+            "backend": self.backend,
+            "ttl_seconds": self.ttl,
+            "size": len(self.entries) if self.backend == "memory" else None,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+user_cache = UserCache()
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Response, Request, HTTPException
-from app.database import get_mongo, AsyncIOMotorClient
-from fastapi.responses import FileResponse
+from app.database import get_mongo, get_reporting_mongo, AsyncIOMotorClient
+from fastapi.responses import FileResponse, StreamingResponse
 import pandas as pd
 
 
@@ -28,6 +28,12 @@ import datetime
 
 from app.api.utils.employees import verify_login_token, verify_custom_master_token
 
+from app.api.lib.UserCache import user_cache
+from app.api.lib.PasswordHasher import password_hasher
+from app.api.lib.MinIO import storage
+from app.api.lib.NotificationOutbox import notification_dispatcher
+from app.api.crud import notifications as notification_crud
+
 router = APIRouter()
 
 
@@ -273,17 +279,78 @@ async def delete_bank_salary_batch(
 async def download_report(
     report_type: str,
     request: Request,
-    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    mongo_client: AsyncIOMotorClient = Depends(get_reporting_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     query_params = request.query_params
     print(report_type, query_params)
     obj = AdminController(payload, mongo_client)
-    output = await obj.download_report(report_type, query_params)
+    report = await obj.download_report(report_type, query_params)
 
-    headers = {"Content-Disposition": "attachment; filename=report.xlsx"}
-    return Response(
-        content=output.read(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers=headers,
+    return StreamingResponse(
+        report.iter_chunks(),
+        media_type=report.media_type,
+        headers=report.headers,
     )
+
+
+@router.get("/metrics/user-cache")
+@role_required(["MD"])
+async def get_user_cache_metrics(
+    payload: dict = Depends(verify_login_token),
+):
+    return {
+        "message": "User cache metrics fetched successfully",
+        "status_code": 200,
+        "data": user_cache.metrics(),
+    }
+
+
+@router.get("/metrics/password-hasher")
+@role_required(["MD"])
+async def get_password_hasher_metrics(
+    payload: dict = Depends(verify_login_token),
+):
+    return {
+        "message": "Password hasher metrics fetched successfully",
+        "status_code": 200,
+        "data": password_hasher.metrics(),
+    }
+
+
+@router.get("/metrics/object-storage")
+@role_required(["MD"])
+async def get_object_storage_metrics(
+    payload: dict = Depends(verify_login_token),
+):
+    return {
+        "message": "Object storage metrics fetched successfully",
+        "status_code": 200,
+        "data": storage.metrics(),
+    }
+
+
+@router.get("/metrics/notification-outbox")
+@role_required(["MD"])
+async def get_notification_outbox_metrics(
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    return {
+        "message": "Notification outbox metrics fetched successfully",
+        "status_code": 200,
+        "data": await notification_dispatcher.metrics(mongo_client),
+    }
+
+
+@router.post("/notifications/rebuild-unread-counters")
+@role_required(["MD"])
+async def rebuild_unread_counters(
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    return {
+        "message": "Unread counters rebuilt successfully",
+        "status_code": 200,
+        "data": await notification_crud.rebuild_unread_counters(mongo_client),
+    }
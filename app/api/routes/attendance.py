@@ -1,23 +1,74 @@
-from fastapi import APIRouter, Depends, Response, Request
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from typing import Optional
 
-from app.database import get_mongo, AsyncIOMotorClient
+from app.database import get_mongo, get_reporting_mongo, AsyncIOMotorClient
 
 from app.api.controllers.attendance import AttendanceController
 
-from app.api.utils.employees import verify_login_token, verify_custom_master_token
+from app.api.utils.employees import verify_login_token
+
+import datetime
 
 router = APIRouter()
 
 
+@router.get("/branch/{branch}")
+async def get_branch_attendance(
+    branch: str,
+    month: str = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    mongo_client: AsyncIOMotorClient = Depends(get_reporting_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    """Present, absent and holiday counts of every employee of a branch"""
+
+    att_obj = AttendanceController(payload, mongo_client)
+    res = await att_obj.get_branch_attendance(
+        branch, month=month, start_date=start_date, end_date=end_date
+    )
+    return {
+        "message": "Attendance fetched successfully",
+        "status_code": 200,
+        "data": res,
+    }
+
+
+@router.get("/branch/{branch}/export")
+async def export_branch_attendance(
+    branch: str,
+    format: str = "xlsx",
+    month: str = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    mongo_client: AsyncIOMotorClient = Depends(get_reporting_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    att_obj = AttendanceController(payload, mongo_client)
+    report = await att_obj.export_branch_attendance(
+        branch, format=format, month=month, start_date=start_date, end_date=end_date
+    )
+
+    return StreamingResponse(
+        report.iter_chunks(),
+        media_type=report.media_type,
+        headers=report.headers,
+    )
+
+
 @router.get("/{employee_id}")
 async def get_attendance(
     employee_id: str,
     month: str = None,
-    start_date: str = None,
-    end_date: str = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
     mongo_client: AsyncIOMotorClient = Depends(get_mongo),
     payload: dict = Depends(verify_login_token),
 ):
+    """Day by day attendance for a month (YYYY-MM) or a date range, the current
+    month by default"""
+
     att_obj = AttendanceController(payload, mongo_client)
     res = await att_obj.get_attendance(
         employee_id, month=month, start_date=start_date, end_date=end_date
@@ -27,3 +78,23 @@ async def get_attendance(
         "status_code": 200,
         "data": res,
     }
+
+
+@router.get("/{employee_id}/summary")
+async def get_attendance_summary(
+    employee_id: str,
+    month: str = None,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    att_obj = AttendanceController(payload, mongo_client)
+    res = await att_obj.get_attendance_summary(
+        employee_id, month=month, start_date=start_date, end_date=end_date
+    )
+    return {
+        "message": "Attendance fetched successfully",
+        "status_code": 200,
+        "data": res,
+    }
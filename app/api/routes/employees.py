@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, Response, BackgroundTasks
 
 # Import all the Schemas
-from app.schemas.request import EmployeeCreateRequest, EmployeeUpdateRequest
+from app.schemas.request import (
+    EmployeeCreateRequest,
+    EmployeeUpdateRequest,
+    EmployeeAvatarsRequest,
+)
 from app.schemas.response import EmployeeCreateResponse, EmployeeUpdateResponse
 
 # import DB Utils
@@ -122,6 +126,22 @@ async def upload_profile_image(
     }
 
 
+@router.post("/avatars")
+async def get_avatars(
+    body: EmployeeAvatarsRequest,
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    obj = EmployeeController(payload, mongo_client)
+    res = await obj.get_avatars(body.employee_ids, body.size.value)
+
+    return {
+        "message": "Success",
+        "status_code": 200,
+        "data": res,
+    }
+
+
 @router.put("/update")
 async def update(
     employee_id: str,
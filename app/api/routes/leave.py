@@ -14,6 +14,7 @@ from app.schemas.response import (
 
 from app.api.controllers.leave import LeaveController
 from app.api.utils.employees import verify_login_token
+from app.api.utils.history import HistoryPage
 from app.api.utils.auth import role_required
 from app.schemas.employees import StatusEnum
 
@@ -259,15 +260,21 @@ async def respond_leave(
 async def get_leave_history(
     employee_id: str,
     status: StatusEnum = None,
+    page: HistoryPage = Depends(),
     mongo_client: AsyncIOMotorClient = Depends(get_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     if status and status.value == "all":
         status = None
     leave_controller = LeaveController(payload, mongo_client)
-    res = await leave_controller.get_leave_history(employee_id, status)
+    res, next_cursor = await leave_controller.get_leave_history(
+        employee_id, status, page
+    )
     return LeaveHistoryResponse(
-        message="Leave history fetched successfully", status_code=200, data=res
+        message="Leave history fetched successfully",
+        status_code=200,
+        data=res,
+        next_cursor=next_cursor,
     )
 
 
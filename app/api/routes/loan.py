@@ -10,6 +10,7 @@ from app.schemas.request import (
 from app.api.controllers.loan import LoanController
 
 from app.api.utils.employees import verify_login_token
+from app.api.utils.history import HistoryPage
 from app.api.utils.auth import role_required
 
 from app.schemas.response import (
@@ -244,18 +245,20 @@ async def adjust_loan(
 async def get_loan_history(
     employee_id: str,
     status: StatusEnum = None,
+    page: HistoryPage = Depends(),
     mongo_client: AsyncIOMotorClient = Depends(get_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     if status and status.value == "all":
         status = None
     loan_controller = LoanController(payload, mongo_client)
-    res = await loan_controller.get_loan_history(employee_id, status)
+    res, next_cursor = await loan_controller.get_loan_history(employee_id, status, page)
 
     return LoanHistoryResponse(
         message="Loan history fetched successfully",
         status_code=200,
         data=res,
+        next_cursor=next_cursor,
     )
 
 
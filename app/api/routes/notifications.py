@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Query
+from app.database import get_mongo, AsyncIOMotorClient
+
+from typing import Optional
+
+from app.schemas.notification import MarkNotificationsRead
+
+from app.api.controllers.notifications import NotificationController
+
+from app.api.utils.employees import verify_login_token
+
+
+router = APIRouter()
+
+
+@router.get("")
+async def get_notifications(
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    notification_controller = NotificationController(payload, mongo_client)
+
+    return {
+        "message": "Notifications fetched successfully",
+        "status_code": 200,
+        "data": await notification_controller.get_notifications(status, limit, cursor),
+    }
+
+
+@router.get("/unread-count")
+async def get_unread_count(
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    notification_controller = NotificationController(payload, mongo_client)
+
+    return {
+        "message": "Unread count fetched successfully",
+        "status_code": 200,
+        "data": {"unread": await notification_controller.get_unread_count()},
+    }
+
+
+@router.post("/read")
+async def mark_as_read(
+    body: MarkNotificationsRead,
+    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    payload: dict = Depends(verify_login_token),
+):
+    notification_controller = NotificationController(payload, mongo_client)
+
+    return {
+        "message": "Notifications marked as read",
+        "status_code": 200,
+        "data": await notification_controller.mark_as_read(body.ids),
+    }
@@ -16,6 +16,7 @@ from app.schemas.response import (
 from app.api.controllers.leave import LeaveController
 
 from app.api.utils.employees import verify_login_token
+from app.api.utils.history import HistoryPage
 from app.api.utils.auth import role_required
 from app.schemas.employees import StatusEnum
 
@@ -68,15 +69,21 @@ async def respond_permission(
 async def get_permission_history(
     employee_id: str,
     status: StatusEnum = None,
+    page: HistoryPage = Depends(),
     mongo_client: AsyncIOMotorClient = Depends(get_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     if status and status.value == "all":
         status = None
     leave_controller = LeaveController(payload, mongo_client)
-    res = await leave_controller.get_permission_history(employee_id, status)
+    res, next_cursor = await leave_controller.get_permission_history(
+        employee_id, status, page
+    )
     return PermissionHistoryResponse(
-        message="Permission history retrieved successfully", status_code=200, data=res
+        message="Permission history retrieved successfully",
+        status_code=200,
+        data=res,
+        next_cursor=next_cursor,
     )
 
 
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Response, Request
 
 
 # import DB Utils
-from app.database import get_mongo, AsyncIOMotorClient
+from app.database import get_mongo, get_reporting_mongo, AsyncIOMotorClient
 
 from app.api.controllers.salary import SalaryController
 
@@ -25,6 +25,7 @@ from app.schemas.response import (
 )
 from app.schemas.employees import StatusEnum
 from app.api.utils.employees import verify_login_token
+from app.api.utils.history import HistoryPage
 
 import datetime
 
@@ -33,7 +34,7 @@ router = APIRouter()
 
 @router.get("/", status_code=200)
 async def get_all_salaries(
-    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    mongo_client: AsyncIOMotorClient = Depends(get_reporting_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     sal_obj = SalaryController(payload, mongo_client)
@@ -296,17 +297,21 @@ async def respond_advance(
 async def get_salary_advance_history(
     employee_id: str,
     status: StatusEnum = None,
+    page: HistoryPage = Depends(),
     mongo_client: AsyncIOMotorClient = Depends(get_mongo),
     payload: dict = Depends(verify_login_token),
 ):
     if status and status.value == "all":
         status = None
     sal_obj = SalaryController(payload, mongo_client)
-    res = await sal_obj.get_salary_advance_history(employee_id, status)
+    res, next_cursor = await sal_obj.get_salary_advance_history(
+        employee_id, status, page
+    )
     return {
         "message": "Salary Advance History fetched successfully",
         "status_code": 200,
         "data": res,
+        "next_cursor": next_cursor,
     }
 
 
@@ -4,14 +4,14 @@ from app.database import AsyncIOMotorClient
 from fastapi import HTTPException, Security, Header
 
 
-from passlib.context import CryptContext
-
 from app.core.config import Config
 from datetime import datetime, timedelta
 import string
 import secrets
 
 from app.api.crud import auth as auth_crud
+from app.api.lib.UserCache import user_cache
+from app.api.lib.PasswordHasher import password_hasher
 import uuid
 import jwt
 
@@ -30,9 +30,6 @@ SECRET_KEY = Config.SECRET_KEY
 ALGORITHM = Config.ALGORITHM
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 async def check_if_employee_id_exists(employee_id, mongo_client: AsyncIOMotorClient):
     return await mongo_client[MONGO_DATABASE][EMPLOYEE_COLLECTION].find_one(
         {"employee_id": employee_id}
@@ -86,11 +83,11 @@ async def generate_random_password(length: int = 12) -> str:
 
 
 async def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return await password_hasher.hash(password)
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 async def create_access_token(
@@ -138,9 +135,7 @@ async def verify_login_token(
 
         mongo_client = await get_mongo()
 
-        user = await auth_crud.get_user_by_uuid(payload["uuid"], mongo_client)
-
-        if not user:
+        if not await user_cache.exists(payload["uuid"], mongo_client):
             raise HTTPException(status_code=401, detail="Invalid authentication")
 
         return payload  # or any specific user data you need from the payload
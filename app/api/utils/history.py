@@ -0,0 +1,110 @@
+from fastapi import HTTPException, Query
+from typing import Optional
+
+from app.core.config import Config
+
+import base64
+import datetime
+import json
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+
+# Also the largest page, and the default so clients that do not page yet get
+# the same rows as before
+HISTORY_PAGE_SIZE = 100
+
+SORT = [("requested_at", -1), ("id", -1)]
+
+
+class HistoryPage:
+    """Query parameters shared by the history endpoints, use as
+    `page: HistoryPage = Depends()`"""
+
+    def __init__(
+        self,
+        limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+    ):
+        if start_date and end_date and start_date > end_date:
+            raise HTTPException(
+                status_code=400, detail="start_date must not be after end_date"
+            )
+
+        self.limit = limit
+        self.cursor = cursor
+        self.start_date = start_date
+        self.end_date = end_date
+
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(
+        json.dumps([row["requested_at"].isoformat(), row["id"]]).encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        requested_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(requested_at), id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def history_query(query, status, page: HistoryPage):
+    """query narrowed by status, requested_at range and the page's cursor"""
+
+    query = dict(query)
+
+    if status:
+        query["status"] = getattr(status, "value", status)
+
+    requested_at = {}
+
+    if page.start_date:
+        requested_at["$gte"] = datetime.datetime.combine(
+            page.start_date, datetime.time.min
+        )
+    if page.end_date:
+        requested_at["$lt"] = datetime.datetime.combine(
+            page.end_date + datetime.timedelta(days=1), datetime.time.min
+        )
+    if requested_at:
+        query["requested_at"] = requested_at
+
+    if page.cursor:
+        last_requested_at, last_id = decode_cursor(page.cursor)
+        query["$or"] = [
+            {"requested_at": {"$lt": last_requested_at}},
+            {"requested_at": last_requested_at, "id": {"$lt": last_id}},
+        ]
+
+    return query
+
+
+async def get_history(
+    collection, query, projection, status, page: HistoryPage, mongo_client
+):
+    """One page of an employee's requests, newest first, and the cursor of the
+    next page (None on the last one).
+
+    Keyset pagination on (requested_at, id) is served by the
+    (employee_id, requested_at, id) indexes, so every page costs the same.
+    """
+
+    rows = (
+        await mongo_client[MONGO_DATABASE][collection]
+        .find(history_query(query, status, page), {"_id": 0, **projection})
+        .sort(SORT)
+        .limit(page.limit + 1)
+        .to_list(None)
+    )
+
+    next_cursor = None
+
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor(rows[-1])
+
+    return rows, next_cursor
@@ -0,0 +1,22 @@
+def role_target(payload):
+    """Routing key of the role notifications an employee receives, None for
+    plain employees. Matches the keys bound to the employee's queue at login.
+    """
+
+    role = payload.get("primary_role")
+
+    if not role or role == "employee":
+        return None
+
+    if role == "HR":
+        return "HR_{}".format((payload.get("branch") or "").replace(" ", "_"))
+
+    return role
+
+
+def notification_targets(payload):
+    """Every notification target in an employee's inbox"""
+
+    role = role_target(payload)
+
+    return [payload["employee_id"]] + ([role] if role else [])
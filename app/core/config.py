@@ -19,11 +19,44 @@ class Config(object):
     RABBITMQ_HOST = os.getenv("RABBITMQ_HOST")
     RABBITMQ_USERNAME = os.getenv("RABBITMQ_USERNAME")
     RABBITMQ_PASSWORD = os.getenv("RABBITMQ_PASSWORD")
+    # One publisher thread, connection and confirm channel per slot
+    RABBITMQ_PUBLISHER_CHANNELS = int(os.getenv("RABBITMQ_PUBLISHER_CHANNELS") or 2)
+    RABBITMQ_PUBLISH_RETRIES = int(os.getenv("RABBITMQ_PUBLISH_RETRIES") or 3)
+
+    PASSWORD_HASHER_WORKERS = int(os.getenv("PASSWORD_HASHER_WORKERS") or 4)
+    # Pending hash/verify calls beyond this are rejected with 503, 0 disables
+    PASSWORD_HASHER_MAX_QUEUE = int(os.getenv("PASSWORD_HASHER_MAX_QUEUE") or 0)
+
+    REDIS_URL = os.getenv("REDIS_URL")
+
+    # memory, redis or amqp (needs aio-pika). redis and amqp share rooms and
+    # emits between Socket.IO nodes; memory only works for a single node
+    SOCKETIO_MANAGER = os.getenv("SOCKETIO_MANAGER") or "memory"
+    # Defaults to REDIS_URL for redis and the RabbitMQ settings for amqp
+    SOCKETIO_MANAGER_URL = os.getenv("SOCKETIO_MANAGER_URL")
+    # Unacknowledged notifications each employee queue may have in flight
+    SOCKETIO_PREFETCH = int(os.getenv("SOCKETIO_PREFETCH") or 20)
+    # Sockets are disconnected gradually over this many seconds on SIGTERM
+    SOCKETIO_DRAIN_SECONDS = float(os.getenv("SOCKETIO_DRAIN_SECONDS") or 5)
+
+    # memory, redis or off
+    USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND") or "memory"
+    USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS") or 60)
+    USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE") or 10000)
 
     MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT")
     MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY")
     MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY")
     MINIO_BUCKET = os.getenv("MINIO_BUCKET") or "salary-management"
+    # Known region lets presigned URLs be signed without asking the server
+    MINIO_REGION = os.getenv("MINIO_REGION") or "us-east-1"
+    MINIO_URL_EXPIRY_SECONDS = int(os.getenv("MINIO_URL_EXPIRY_SECONDS") or 86400)
+    MINIO_URL_CACHE_SIZE = int(os.getenv("MINIO_URL_CACHE_SIZE") or 10000)
+
+    PROFILE_IMAGE_MAX_BYTES = int(
+        os.getenv("PROFILE_IMAGE_MAX_BYTES") or 5 * 1024 * 1024
+    )
+    PROFILE_IMAGE_WORKERS = int(os.getenv("PROFILE_IMAGE_WORKERS") or 2)
 
     MONGO_HOST = os.getenv("MONGO_HOST")
     MONGO_PORT = os.getenv("MONGO_PORT")
@@ -32,6 +65,30 @@ class Config(object):
 
     MONGO_DATABASE = os.getenv("MONGO_DATABASE") or "hhp-esm"
 
+    # Client profiles: interactive serves API requests, reporting the report
+    # downloads and exports, batch the crons and background workers. Each
+    # gets its own pool so one workload cannot starve another.
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS") or "zstd,zlib"
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS") or 60000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+        os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS") or 5000
+    )
+
+    MONGO_INTERACTIVE_POOL_SIZE = int(os.getenv("MONGO_INTERACTIVE_POOL_SIZE") or 100)
+    MONGO_INTERACTIVE_TIMEOUT_MS = int(
+        os.getenv("MONGO_INTERACTIVE_TIMEOUT_MS") or 10000
+    )
+
+    MONGO_REPORTING_POOL_SIZE = int(os.getenv("MONGO_REPORTING_POOL_SIZE") or 10)
+    MONGO_REPORTING_TIMEOUT_MS = int(os.getenv("MONGO_REPORTING_TIMEOUT_MS") or 120000)
+    MONGO_REPORTING_READ_PREFERENCE = (
+        os.getenv("MONGO_REPORTING_READ_PREFERENCE") or "secondaryPreferred"
+    )
+
+    MONGO_BATCH_POOL_SIZE = int(os.getenv("MONGO_BATCH_POOL_SIZE") or 10)
+    # 0 leaves batch operations without a time limit
+    MONGO_BATCH_TIMEOUT_MS = int(os.getenv("MONGO_BATCH_TIMEOUT_MS") or 0)
+
     USERS_COLLECTION = os.getenv("USERS_COLLECTION") or "users"
 
     EMPLOYEE_COLLECTION = os.getenv("EMPLOYEES_COLLECTION") or "employees"
@@ -48,11 +105,28 @@ class Config(object):
 
     ATTENDANCE_COLLECTION = os.getenv("ATTENDANCE_COLLECTION") or "attendance"
 
+    ATTENDANCE_MONTHLY_COLLECTION = (
+        os.getenv("ATTENDANCE_MONTHLY_COLLECTION") or "attendance_monthly"
+    )
+
     LOCATION_COLLECTION = os.getenv("LOCATION_COLLECTION") or "location"
 
     LOAN_SCHEDULE_COLLECTION = os.getenv("LOAN_SCHEDULE_COLLECTION") or "loan_schedule"
 
     NOTIFICATION_COLLECTION = os.getenv("NOTIFICATION_COLLECTION") or "notifications"
+    NOTIFICATION_COUNTER_COLLECTION = (
+        os.getenv("NOTIFICATION_COUNTER_COLLECTION") or "notification_counters"
+    )
+
+    NOTIFICATION_OUTBOX_BATCH_SIZE = int(
+        os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE") or 100
+    )
+    NOTIFICATION_OUTBOX_POLL_SECONDS = float(
+        os.getenv("NOTIFICATION_OUTBOX_POLL_SECONDS") or 5
+    )
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(
+        os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS") or 8
+    )
 
     MONTHLY_COMPENSATION_COLLECTION = (
         os.getenv("MONTHLY_COMPENSATION_COLLECTION") or "monthly_compensation"
@@ -70,6 +144,26 @@ class Config(object):
         os.getenv("OTHER_SALARY_COMPONENTS_COLLECTION") or "other_salary_components"
     )
 
+    PAYSLIP_SNAPSHOT_COLLECTION = (
+        os.getenv("PAYSLIP_SNAPSHOT_COLLECTION") or "payslip_snapshot"
+    )
+
+    EMPLOYEE_MONTHLY_SUMMARY_COLLECTION = (
+        os.getenv("EMPLOYEE_MONTHLY_SUMMARY_COLLECTION") or "employee_monthly_summary"
+    )
+
+    JOB_RUNS_COLLECTION = os.getenv("JOB_RUNS_COLLECTION") or "job_runs"
+
+    LEAVE_LOCKS_COLLECTION = os.getenv("LEAVE_LOCKS_COLLECTION") or "leave_locks"
+
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS") or 600)
+
+    JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE") or 500)
+
+    # Warn when one request issues more than this many commands of the same
+    # shape; 0 turns the N+1 detector off
+    QUERY_PROFILER_N_PLUS_ONE = int(os.getenv("QUERY_PROFILER_N_PLUS_ONE") or 0)
+
     RULES_AND_GUIDELINES_COLLECTION = (
         os.getenv("RULES_AND_GUIDELINES_COLLECTION") or "rules_and_guidelines"
     )
@@ -78,8 +172,6 @@ class Config(object):
 
     BRANCH_DROPDOWN = [{"label": x, "value": x} for x in BRANCHES]
 
-    INDEX_CONFIG_FILE_LOCATION = os.getenv("INDEX_CONFIG_FILE_LOCATION")
-
 
 # class Settings(BaseModel):
 #     authjwt_secret_key: str = "secret"
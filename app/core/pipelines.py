@@ -1,3 +1,8 @@
+import datetime
+
+from app.core.config import Config
+
+
 async def get_employee_with_salary_details(employee_id, month):
     if isinstance(employee_id, str):
         employee_id = [employee_id]
@@ -457,3 +462,208 @@ async def get_permission_report(start_date, end_date):
             }
         },
     ]
+
+
+async def get_employee_monthly_summary(employee_ids=None):
+    """Approved leave days and permission hours per (employee_id, month),
+    bucketed on the server from the raw leave rows and merged into the
+    monthly summary collection"""
+
+    leave_match = {"status": "approved"}
+
+    if employee_ids is not None:
+        leave_match["employee_id"] = {"$in": employee_ids}
+
+    is_permission = {"$eq": ["$leave_type", "permission"]}
+
+    return [
+        {"$match": leave_match},
+        {
+            "$project": {
+                "_id": 0,
+                "employee_id": 1,
+                "month": 1,
+                "leave_days": {
+                    "$cond": [is_permission, 0, {"$ifNull": ["$no_of_days", 0]}]
+                },
+                "permission_hours": {
+                    "$cond": [is_permission, {"$ifNull": ["$no_of_hours", 0]}, 0]
+                },
+            }
+        },
+        {
+            "$group": {
+                "_id": {"employee_id": "$employee_id", "month": "$month"},
+                "leave_days": {"$sum": "$leave_days"},
+                "permission_hours": {"$sum": "$permission_hours"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "employee_id": "$_id.employee_id",
+                "month": "$_id.month",
+                "leave_days": 1,
+                "permission_hours": 1,
+                "updated_at": "$$NOW",
+            }
+        },
+        {
+            "$merge": {
+                "into": Config.EMPLOYEE_MONTHLY_SUMMARY_COLLECTION,
+                "on": ["employee_id", "month"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
+
+async def get_attendance_bitmaps():
+    """Legacy one-document-per-day attendance rows folded into one bitmap per
+    status per (employee_id, month), bit d - 1 standing for day d.
+
+    Legacy data can hold several rows for one day; the latest created wins,
+    so each day ends up with exactly one status bit.
+    """
+
+    def bitmap(status):
+        return {
+            "$sum": {
+                "$cond": [
+                    {"$eq": ["$status", status]},
+                    {"$pow": [2, {"$subtract": [{"$dayOfMonth": "$_id.date"}, 1]}]},
+                    0,
+                ]
+            }
+        }
+
+    return [
+        {"$match": {"status": {"$in": ["present", "absent", "holiday"]}}},
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {
+            "$group": {
+                "_id": {
+                    "employee_id": "$employee_id",
+                    "date": {
+                        "$dateFromParts": {
+                            "year": {"$year": "$date"},
+                            "month": {"$month": "$date"},
+                            "day": {"$dayOfMonth": "$date"},
+                        }
+                    },
+                },
+                "status": {"$last": "$status"},
+            }
+        },
+        {
+            "$group": {
+                "_id": {
+                    "employee_id": "$_id.employee_id",
+                    "month": {
+                        "$dateFromParts": {
+                            "year": {"$year": "$_id.date"},
+                            "month": {"$month": "$_id.date"},
+                        }
+                    },
+                },
+                "present": bitmap("present"),
+                "absent": bitmap("absent"),
+                "holiday": bitmap("holiday"),
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "employee_id": "$_id.employee_id",
+                "month": "$_id.month",
+                "present": 1,
+                "absent": 1,
+                "holiday": 1,
+            }
+        },
+    ]
+
+
+async def get_attendance_counts(employee_ids, start_date, end_date):
+    """Present, absent and holiday days per employee between start_date and
+    end_date inclusive, counted on the server from the monthly bitmaps.
+
+    The month range scan is served by the (employee_id, month) index; the
+    first and last month only count the bits inside the range.
+    """
+
+    start_month = datetime.datetime(start_date.year, start_date.month, 1)
+    end_month = datetime.datetime(end_date.year, end_date.month, 1)
+
+    first_bit = {"$cond": [{"$eq": ["$month", start_month]}, start_date.day - 1, 0]}
+    last_bit = {"$cond": [{"$eq": ["$month", end_month]}, end_date.day, 31]}
+
+    def days_set(status):
+        return {
+            "$sum": {
+                "$map": {
+                    "input": {"$range": [first_bit, last_bit]},
+                    "as": "bit",
+                    "in": {
+                        "$mod": [
+                            {
+                                "$floor": {
+                                    "$divide": [
+                                        {"$ifNull": ["$" + status, 0]},
+                                        {"$pow": [2, "$$bit"]},
+                                    ]
+                                }
+                            },
+                            2,
+                        ]
+                    },
+                }
+            }
+        }
+
+    return [
+        {
+            "$match": {
+                "employee_id": {"$in": employee_ids},
+                "month": {"$gte": start_month, "$lte": end_month},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "employee_id": 1,
+                "present": days_set("present"),
+                "absent": days_set("absent"),
+                "holiday": days_set("holiday"),
+            }
+        },
+        {
+            "$group": {
+                "_id": "$employee_id",
+                "present": {"$sum": "$present"},
+                "absent": {"$sum": "$absent"},
+                "holiday": {"$sum": "$holiday"},
+            }
+        },
+        {
+            "$lookup": {
+                "from": Config.EMPLOYEE_COLLECTION,
+                "localField": "_id",
+                "foreignField": "employee_id",
+                "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+                "as": "employee",
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "employee_id": "$_id",
+                "name": {"$first": "$employee.name"},
+                "present": {"$toInt": "$present"},
+                "absent": {"$toInt": "$absent"},
+                "holiday": {"$toInt": "$holiday"},
+            }
+        },
+        {"$sort": {"employee_id": 1}},
+    ]
@@ -7,3 +7,13 @@ mongo = MongoManger()
 
 async def get_mongo() -> AsyncIOMotorClient:
     return mongo.client
+
+
+async def get_reporting_mongo() -> AsyncIOMotorClient:
+    """Separate pool for report aggregations, reading from a secondary when
+    one is available"""
+    return mongo.clients["reporting"]
+
+
+async def get_batch_mongo() -> AsyncIOMotorClient:
+    return mongo.clients["batch"]
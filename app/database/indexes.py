@@ -0,0 +1,467 @@
+from loguru import logger
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from app.core.config import Config
+
+MONGO_DATABASE = Config.MONGO_DATABASE
+
+# Error code of a unique index build that meets duplicate keys
+DUPLICATE_KEY = 11000
+
+# Duplicate key values reported per index that could not be built
+DUPLICATES_REPORTED = 20
+
+
+def index(*keys, **options):
+    """IndexModel from field names, "-field" for descending"""
+
+    return IndexModel(
+        [
+            (key[1:], DESCENDING) if key.startswith("-") else (key, ASCENDING)
+            for key in keys
+        ],
+        **options,
+    )
+
+
+# Every index the application relies on, by collection. Startup creates what
+# is missing and refuses to start when one cannot be built; nothing here is
+# ever dropped automatically.
+INDEXES = {
+    Config.USERS_COLLECTION: [
+        index("uuid", unique=True),
+        index("email", unique=True),
+        index("employee_id"),
+    ],
+    Config.EMPLOYEE_COLLECTION: [
+        index("employee_id", unique=True),
+        index("email"),
+        index("phone"),
+        # Branch reports list the branch's employees in employee_id order
+        index("branch", "employee_id"),
+        index("is_marketing_staff", "marketing_manager"),
+    ],
+    Config.ROLES_COLLECTION: [
+        index("role", unique=True),
+    ],
+    Config.TEMP_JWT_ID_COLLECTION: [
+        index("jwt_id", unique=True),
+        index("uuid", "type"),
+    ],
+    Config.SALARY_COLLECTION: [
+        index("employee_id", "month", unique=True),
+        index("id"),
+    ],
+    Config.MONTHLY_COMPENSATION_COLLECTION: [
+        index("employee_id", "month", unique=True),
+        index("month"),
+    ],
+    Config.SALARY_INCENTIVES_COLLECTION: [
+        index("employee_id", "month", unique=True),
+        index("month"),
+    ],
+    Config.SALARY_ADVANCE_COLLECTION: [
+        index("employee_id", "month"),
+        index("employee_id", "-requested_at", "-id"),
+        index("id", unique=True),
+    ],
+    # Not unique: permissions have no start_date/end_date, and a rejected
+    # leave's dates can be requested again. Overlaps are rejected on request.
+    Config.LEAVE_COLLECTION: [
+        index("employee_id", "start_date", "end_date"),
+        index("status", "end_date", "start_date"),
+        index("employee_id", "-requested_at", "-id"),
+        index("id", unique=True),
+        index("month", "status"),
+    ],
+    Config.LOAN_COLLECTION: [
+        index("employee_id", "-requested_at", "-id"),
+        index("id", unique=True),
+    ],
+    # The unique key's (employee_id, month) prefix serves the payroll lookups
+    Config.LOAN_SCHEDULE_COLLECTION: [
+        index("employee_id", "month", "loan_id", unique=True),
+        index("loan_id", "month"),
+        index("id", unique=True),
+    ],
+    # Legacy per-day rows, kept until `manage attendance migrate` has run
+    Config.ATTENDANCE_COLLECTION: [
+        index("employee_id", "date", unique=True),
+    ],
+    Config.ATTENDANCE_MONTHLY_COLLECTION: [
+        index("employee_id", "month", unique=True),
+    ],
+    Config.LOCATION_COLLECTION: [
+        index("employee_id", "date"),
+        index("date"),
+        index("id", unique=True),
+    ],
+    Config.PAYSLIP_SNAPSHOT_COLLECTION: [
+        index("employee_id", "month", unique=True),
+    ],
+    Config.EMPLOYEE_MONTHLY_SUMMARY_COLLECTION: [
+        index("employee_id", "month", unique=True),
+    ],
+    Config.NOTIFICATION_COLLECTION: [
+        index("id", unique=True),
+        # The inbox keysets on (created_at, id), so the index carries both
+        index("target", "status", "-created_at", "-id"),
+        index("delivery.status", "delivery.next_attempt_at"),
+        index("delivery.claim", sparse=True),
+    ],
+    # One lock per employee; the unique key is what makes the lock exclusive
+    Config.LEAVE_LOCKS_COLLECTION: [
+        index("employee_id", unique=True),
+    ],
+    Config.NOTIFICATION_COUNTER_COLLECTION: [
+        index("target", unique=True),
+    ],
+    Config.JOB_RUNS_COLLECTION: [
+        index("run_key", unique=True),
+    ],
+    Config.RULES_AND_GUIDELINES_COLLECTION: [
+        index("id", unique=True),
+    ],
+    "bank_salary_batch": [
+        index("batch_name", "branch", unique=True),
+        index("branch"),
+        index("id", unique=True),
+    ],
+}
+
+
+# Shape of each hot query in app/api/crud, app/api/lib and app/core/pipelines,
+# as (collection, filter, sort). The values only need the right types; the
+# check command explains these and reports any that scan or sort in memory.
+QUERIES = [
+    (Config.USERS_COLLECTION, {"uuid": "uuid"}, None),
+    (Config.USERS_COLLECTION, {"email": "email"}, None),
+    (Config.USERS_COLLECTION, {"employee_id": "EMP"}, None),
+    (Config.EMPLOYEE_COLLECTION, {"employee_id": {"$in": ["EMP"]}}, None),
+    (Config.EMPLOYEE_COLLECTION, {"email": "email"}, None),
+    (Config.EMPLOYEE_COLLECTION, {"phone": "phone"}, None),
+    (Config.EMPLOYEE_COLLECTION, {"branch": "branch"}, [("employee_id", ASCENDING)]),
+    (
+        Config.EMPLOYEE_COLLECTION,
+        {"is_marketing_staff": True, "marketing_manager": "EMP"},
+        None,
+    ),
+    (Config.ROLES_COLLECTION, {"role": "role"}, None),
+    (Config.TEMP_JWT_ID_COLLECTION, {"jwt_id": "jti"}, None),
+    (Config.TEMP_JWT_ID_COLLECTION, {"uuid": "uuid", "type": "refresh"}, None),
+    (Config.SALARY_COLLECTION, {"employee_id": "EMP", "month": "month"}, None),
+    (Config.SALARY_COLLECTION, {"id": "id"}, None),
+    (
+        Config.MONTHLY_COMPENSATION_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (
+        Config.MONTHLY_COMPENSATION_COLLECTION,
+        {"employee_id": "EMP"},
+        [("month", DESCENDING)],
+    ),
+    (
+        Config.MONTHLY_COMPENSATION_COLLECTION,
+        {"month": {"$gte": "start", "$lte": "end"}},
+        [("month", ASCENDING)],
+    ),
+    (
+        Config.SALARY_INCENTIVES_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (
+        Config.SALARY_INCENTIVES_COLLECTION,
+        {"employee_id": "EMP"},
+        [("month", DESCENDING)],
+    ),
+    (
+        Config.SALARY_INCENTIVES_COLLECTION,
+        {"month": {"$gte": "start", "$lte": "end"}},
+        [("month", ASCENDING)],
+    ),
+    (
+        Config.SALARY_ADVANCE_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (
+        Config.SALARY_ADVANCE_COLLECTION,
+        {"employee_id": "EMP"},
+        [("requested_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    (Config.SALARY_ADVANCE_COLLECTION, {"id": "id"}, None),
+    (
+        Config.LEAVE_COLLECTION,
+        {"employee_id": "EMP", "leave_type": "permission"},
+        [("requested_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    (Config.LEAVE_COLLECTION, {"employee_id": "EMP", "status": "approved"}, None),
+    (Config.LEAVE_COLLECTION, {"id": "id"}, None),
+    (
+        Config.LEAVE_COLLECTION,
+        {
+            "employee_id": "EMP",
+            "start_date": {"$lte": "end"},
+            "end_date": {"$gte": "start"},
+            "status": {"$in": ["pending", "approved"]},
+        },
+        None,
+    ),
+    (
+        Config.LEAVE_COLLECTION,
+        {
+            "status": "approved",
+            "end_date": {"$gte": "date"},
+            "start_date": {"$lte": "date"},
+        },
+        None,
+    ),
+    (
+        Config.LEAVE_COLLECTION,
+        {"month": {"$gte": "start", "$lte": "end"}, "status": "approved"},
+        None,
+    ),
+    (
+        Config.LOAN_COLLECTION,
+        {"employee_id": "EMP"},
+        [("requested_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    (Config.LOAN_COLLECTION, {"id": "id"}, None),
+    (
+        Config.LOAN_SCHEDULE_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (Config.LOAN_SCHEDULE_COLLECTION, {"loan_id": "loan"}, None),
+    (Config.LOAN_SCHEDULE_COLLECTION, {"id": "id"}, None),
+    (
+        Config.ATTENDANCE_MONTHLY_COLLECTION,
+        {"employee_id": "EMP", "month": {"$gte": "start", "$lte": "end"}},
+        None,
+    ),
+    (
+        Config.ATTENDANCE_MONTHLY_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (
+        Config.ATTENDANCE_MONTHLY_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": {"$gte": "start", "$lte": "end"}},
+        None,
+    ),
+    (
+        Config.LOCATION_COLLECTION,
+        {"employee_id": "EMP", "date": {"$gte": "start", "$lte": "end"}},
+        None,
+    ),
+    (Config.LOCATION_COLLECTION, {"date": {"$gte": "start", "$lte": "end"}}, None),
+    (Config.LOCATION_COLLECTION, {"id": "id"}, None),
+    (
+        Config.PAYSLIP_SNAPSHOT_COLLECTION,
+        {"employee_id": {"$in": ["EMP"]}, "month": "month"},
+        None,
+    ),
+    (Config.EMPLOYEE_MONTHLY_SUMMARY_COLLECTION, {"employee_id": "EMP"}, None),
+    (Config.NOTIFICATION_COLLECTION, {"id": "id"}, None),
+    (
+        Config.NOTIFICATION_COLLECTION,
+        {"target": {"$in": ["EMP"]}, "status": {"$in": ["pending", "read"]}},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    (
+        Config.NOTIFICATION_COLLECTION,
+        {"delivery.status": "pending", "delivery.next_attempt_at": {"$lte": 0}},
+        None,
+    ),
+    (Config.NOTIFICATION_COLLECTION, {"delivery.claim": "claim"}, None),
+    (Config.NOTIFICATION_COUNTER_COLLECTION, {"target": {"$in": ["EMP"]}}, None),
+    (Config.JOB_RUNS_COLLECTION, {"run_key": "run"}, None),
+    (Config.RULES_AND_GUIDELINES_COLLECTION, {"id": "rules"}, None),
+    ("bank_salary_batch", {"branch": "branch"}, None),
+    ("bank_salary_batch", {"id": "id"}, None),
+]
+
+
+def _options(spec):
+    """The options that make two indexes on the same keys different"""
+
+    return {
+        option: spec.get(option)
+        for option in ("unique", "sparse", "partialFilterExpression")
+        if spec.get(option)
+    }
+
+
+def _matches(existing, model):
+    return list(existing["key"]) == list(model.document["key"].items()) and _options(
+        existing
+    ) == _options(model.document)
+
+
+async def duplicate_keys(collection, model, limit=DUPLICATES_REPORTED):
+    """Key values held by more than one document, the reason a unique index
+    cannot be built. Most repeated first, with the ids of the documents."""
+
+    fields = list(model.document["key"])
+
+    return await collection.aggregate(
+        [
+            {"$match": model.document.get("partialFilterExpression", {})},
+            {
+                "$group": {
+                    "_id": {field.replace(".", "_"): "$" + field for field in fields},
+                    "count": {"$sum": 1},
+                    "ids": {"$push": "$_id"},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit},
+        ],
+        allowDiskUse=True,
+    ).to_list(None)
+
+
+async def reconcile_collection(collection, models):
+    """Create the collection's missing indexes and rebuild any whose name is
+    taken by different options. Indexes outside the manifest are left alone
+    and reported."""
+
+    existing = await collection.index_information()
+    report = {
+        "created": [],
+        "rebuilt": [],
+        "failed": {},
+        "duplicates": {},
+        "unmanaged": [],
+    }
+
+    for model in models:
+        name = model.document["name"]
+
+        if any(_matches(spec, model) for spec in existing.values()):
+            continue
+
+        try:
+            if name in existing:
+                await collection.drop_index(name)
+                report["rebuilt"].append(name)
+
+            await collection.create_indexes([model])
+
+            if name not in report["rebuilt"]:
+                report["created"].append(name)
+        except OperationFailure as e:
+            report["failed"][name] = str(e.details.get("errmsg") if e.details else e)
+
+            if e.code == DUPLICATE_KEY:
+                report["duplicates"][name] = await duplicate_keys(collection, model)
+
+    managed = [list(model.document["key"].items()) for model in models]
+    report["unmanaged"] = [
+        name
+        for name, spec in existing.items()
+        if name != "_id_" and list(spec["key"]) not in managed
+    ]
+
+    return report
+
+
+async def reconcile_indexes(mongo_client, manifest=INDEXES):
+    """Bring every collection in the manifest up to date. Safe to run on every
+    startup: indexes that already exist are skipped without a build."""
+
+    db = mongo_client[MONGO_DATABASE]
+    reports = {}
+
+    for collection, models in manifest.items():
+        report = await reconcile_collection(db[collection], models)
+        reports[collection] = report
+
+        for name in report["created"]:
+            logger.info("Created index {}.{}", collection, name)
+        for name in report["rebuilt"]:
+            logger.info("Rebuilt index {}.{}", collection, name)
+        for name, error in report["failed"].items():
+            logger.error("Could not build index {}.{}: {}", collection, name, error)
+
+    return reports
+
+
+def failed_indexes(reports):
+    """collection.name of every index a reconcile could not build"""
+
+    return [
+        "{}.{}".format(collection, name)
+        for collection, report in reports.items()
+        for name in report["failed"]
+    ]
+
+
+async def missing_indexes(mongo_client, manifest=INDEXES):
+    """(collection, index name) for every manifest index not on the server"""
+
+    db = mongo_client[MONGO_DATABASE]
+    missing = []
+
+    for collection, models in manifest.items():
+        existing = await db[collection].index_information()
+
+        missing.extend(
+            (collection, model.document["name"])
+            for model in models
+            if not any(_matches(spec, model) for spec in existing.values())
+        )
+
+    return missing
+
+
+def _plan_problems(plan):
+    """Stages of a winning plan that mean a collection scan or in-memory sort"""
+
+    problems = []
+
+    if plan.get("stage") == "COLLSCAN":
+        problems.append("COLLSCAN")
+    if plan.get("stage") == "SORT":
+        problems.append("in-memory SORT")
+
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            problems.extend(_plan_problems(child))
+
+    return problems
+
+
+async def explain_query(mongo_client, collection, query, sort=None):
+    command = {"find": collection, "filter": query}
+
+    if sort:
+        command["sort"] = dict(sort)
+
+    explained = await mongo_client[MONGO_DATABASE].command(
+        "explain", command, verbosity="queryPlanner"
+    )
+    plan = explained["queryPlanner"]["winningPlan"]
+
+    # Slot based engine plans keep the classic tree under queryPlan. A missing
+    # collection explains as EOF, which is reported as nothing to fix.
+    return _plan_problems(plan.get("queryPlan", plan))
+
+
+async def check_queries(mongo_client, queries=QUERIES):
+    """(collection, query, sort, problems) for every query that is not fully
+    served by an index"""
+
+    unindexed = []
+
+    for collection, query, sort in queries:
+        problems = await explain_query(mongo_client, collection, query, sort)
+
+        if problems:
+            unindexed.append((collection, query, sort, problems))
+
+    return unindexed
@@ -4,15 +4,37 @@ from dotenv import load_dotenv
 from app.core.config import Config
 import os
 import json
-from pymongo import IndexModel, ASCENDING, DESCENDING
+from app.database.indexes import reconcile_indexes, failed_indexes
 
 load_dotenv()
 
 ENV = os.getenv("ENVIRONMENT")
 
+# Options per workload, on top of the shared ones in MongoManger.create_client.
+# timeoutMS bounds every operation, including the maxTimeMS sent with finds
+# and aggregations.
+CLIENT_PROFILES = {
+    "interactive": {
+        "maxPoolSize": Config.MONGO_INTERACTIVE_POOL_SIZE,
+        "readPreference": "primary",
+        "timeoutMS": Config.MONGO_INTERACTIVE_TIMEOUT_MS,
+    },
+    "reporting": {
+        "maxPoolSize": Config.MONGO_REPORTING_POOL_SIZE,
+        "readPreference": Config.MONGO_REPORTING_READ_PREFERENCE,
+        "timeoutMS": Config.MONGO_REPORTING_TIMEOUT_MS,
+    },
+    "batch": {
+        "maxPoolSize": Config.MONGO_BATCH_POOL_SIZE,
+        "readPreference": "primary",
+        "timeoutMS": Config.MONGO_BATCH_TIMEOUT_MS or None,
+    },
+}
+
 
 class MongoManger:
     client: AsyncIOMotorClient = None
+    clients: dict = {}
 
     def __init__(self):
         self.mongo_uri = None
@@ -35,17 +57,30 @@ class MongoManger:
                 Config.MONGO_HOST, Config.MONGO_PORT
             )
 
+    def create_client(self, profile="interactive"):
+        return AsyncIOMotorClient(
+            self.mongo_uri,
+            appname="salary-management-{}".format(profile),
+            compressors=Config.MONGO_COMPRESSORS,
+            maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            **CLIENT_PROFILES[profile],
+        )
+
     async def connect_to_database(self):
         logger.info("Connect to the MongoDB...")
-        self.client = AsyncIOMotorClient(self.mongo_uri)
+        self.clients = {
+            profile: self.create_client(profile) for profile in CLIENT_PROFILES
+        }
+        self.client = self.clients["interactive"]
         await self.create_roles()
         await self.create_indexes()
         logger.info("Successfully connected to the MongoDB!")
 
     async def close_database_connection(self):
         logger.info("Close MongoDB connection...")
-        await self.drop_indexes()
-        self.client.close()
+        for client in self.clients.values():
+            client.close()
         logger.info("The MongoDB connection is closed!")
 
     async def create_roles(self):
@@ -62,21 +97,14 @@ class MongoManger:
             )
 
     async def create_indexes(self):
-        with open(Config.INDEX_CONFIG_FILE_LOCATION) as f:
-            data = json.load(f)
-
-        logger.info("Creating Indexes")
-        for i in data["indexes"]:
-            if i["fields"] == []:
-                continue
-            index = IndexModel(i["fields"], unique=i.get("unique", False))
-            self.client[Config.MONGO_DATABASE][i["collection"]].create_indexes([index])
-
-    async def drop_indexes(self):
-        collections = await self.client[Config.MONGO_DATABASE].list_collection_names()
-        logger.info("Dropping Indexes")
-        for collection in collections:
-            print(collection)
-            if collection == "Get Profile":
-                continue
-            await self.client[Config.MONGO_DATABASE][collection].drop_indexes()
+        # Index builds can outlast the interactive profile's timeout
+        logger.info("Reconciling Indexes")
+        failed = failed_indexes(await reconcile_indexes(self.clients["batch"]))
+
+        # Queries and upserts rely on these, unique ones to keep duplicates
+        # out; running without them would only hide the problem
+        if failed:
+            raise RuntimeError(
+                "Could not build indexes {}. Run python -m app.manage indexes "
+                "sync for the duplicate keys to resolve.".format(", ".join(failed))
+            )
@@ -8,15 +8,26 @@ from app.core.errors import http_error_handler
 from starlette.exceptions import HTTPException
 
 from starlette.middleware.base import BaseHTTPMiddleware
+from pymongo import monitoring
 
-from app.database import mongo, AsyncIOMotorClient, get_mongo
+from app.database import mongo, AsyncIOMotorClient, get_mongo, get_batch_mongo
 
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.lib.RabbitMQ import RabbitMQ
+from app.api.lib.Publisher import publisher
+from app.api.lib.NotificationOutbox import notification_dispatcher
 
 from app.api.lib.Attendance import Attendance
 from app.api.crons.salary import SalaryCron
+from app.api.lib.PasswordHasher import password_hasher
+from app.api.lib.MinIO import storage
+from app.api.lib.ProfileImage import (
+    profile_images,
+    UploadSizeLimitMiddleware,
+    MULTIPART_OVERHEAD,
+)
+from app.core.config import Config
+from app.api.lib.QueryProfiler import query_profiler, QueryProfilerMiddleware
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
@@ -44,15 +55,6 @@ import time
 
 load_dotenv()
 
-try:
-    mq = RabbitMQ()
-
-    mq.ensure_exchange("employee_notification")
-
-    mq.connection.close()
-except Exception as e:
-    print(e)
-
 if os.getenv("ENVIRONMENT") == "prod" or os.getenv("ENVIRONMENT") == "staging":
     sentry_sdk.init(
         dsn=os.getenv("SENTRY_DSN"),
@@ -61,6 +63,9 @@ if os.getenv("ENVIRONMENT") == "prod" or os.getenv("ENVIRONMENT") == "staging":
         enable_tracing=True,
     )
 
+# Registered before the client is created at startup
+monitoring.register(query_profiler)
+
 app = FastAPI(
     title="HHP Salary Management APIs",
     description="This is the API documentation for the HHP Salary Management System",
@@ -68,23 +73,6 @@ app = FastAPI(
 )
 
 
-# @app.middleware("http")
-# async def log_requests(request: Request, call_next):
-#     idem = "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
-#     logger.info(f"rid={idem} start request path={request.url.path}")
-#     start_time = time.time()
-
-#     response = await call_next(request)
-
-#     process_time = (time.time() - start_time) * 1000
-#     formatted_process_time = "{0:.2f}".format(process_time)
-#     logger.info(
-#         f"rid={idem} completed_in={formatted_process_time}ms status_code={response.status_code}"
-#     )
-
-#     return response
-
-
 local_tz = timezone("Asia/Kolkata")
 
 scheduler = AsyncIOScheduler(timezone=local_tz)
@@ -93,16 +81,16 @@ scheduler = AsyncIOScheduler(timezone=local_tz)
 # @monitor(monitor_slug="attendance-job")
 async def attendance_job():
     with monitor(monitor_slug=os.getenv("SENTRY_ATTENDANCE_MONITORING_SLUG")):
-        obj = Attendance(mongo.client)
-        list = await obj.post_attendance()
-        print("Attendance Job Ran", datetime.datetime.now())
+        obj = Attendance(mongo.clients["batch"])
+        run = await obj.post_attendance()
+        print("Attendance Job Ran", datetime.datetime.now(), run)
 
 
 async def salary_job():
     with monitor(monitor_slug=os.getenv("SENTRY_SALARY_INCREMENT_SLUG")):
-        obj = SalaryCron(mongo.client)
-        await obj.update_basic_salary()
-        print("Salary Job Ran")
+        obj = SalaryCron(mongo.clients["batch"])
+        report = await obj.update_basic_salary()
+        print("Salary Job Ran", report.get("run"))
 
 
 scheduler.add_job(salary_job, "cron", day="last", hour=23, minute=00, second=00)
@@ -123,14 +111,34 @@ class StatusCodeMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(StatusCodeMiddleware)
 
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/api/v1/employees/profile_image"],
+    max_bytes=Config.PROFILE_IMAGE_MAX_BYTES + MULTIPART_OVERHEAD,
+)
+
 
 @app.on_event("startup")
 async def startup():
     await mongo.connect_to_database()
+    await storage.start()
+
+    publisher.start()
+
+    try:
+        await publisher.ensure_exchange("employee_notification")
+    except Exception as e:
+        print(e)
+
+    notification_dispatcher.start(mongo.clients["batch"])
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    password_hasher.shutdown()
+    profile_images.shutdown()
+    await notification_dispatcher.stop()
+    await publisher.stop()
     await mongo.close_database_connection()
 
 
@@ -158,10 +166,24 @@ async def test():
 
 @app.get("/increment")
 async def inc(
-    mongo_client: AsyncIOMotorClient = Depends(get_mongo),
+    dry_run: bool = False,
+    mongo_client: AsyncIOMotorClient = Depends(get_batch_mongo),
 ):
     obj = SalaryCron(mongo_client)
-    await obj.update_basic_salary()
+    report = await obj.update_basic_salary(dry_run=dry_run)
+
+    if report.get("skipped"):
+        message = "Salary increment already ran or is running on another instance"
+    elif dry_run:
+        message = "Salary increment dry run"
+    else:
+        message = "Salary increment applied"
+
+    return {
+        "message": message,
+        "status_code": 200,
+        "data": report,
+    }
 
 
 app.include_router(api_router, prefix="/api/v1")
@@ -176,6 +198,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added after CORS so it is the outermost middleware and logs the final
+# status code, preflights included
+app.add_middleware(QueryProfilerMiddleware)
+
 
 # app.add_exception_handler(Response,)
 
@@ -192,8 +218,6 @@ app.add_middleware(
 
 # Leave
 
-# FIXME: When leave for same date is requested, return error
-
 
 # FIXME: THE JWT Secret should be stored in a .env file, it currently in the crud file
 
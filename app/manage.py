@@ -0,0 +1,191 @@
+import sys
+
+sys.dont_write_bytecode = True
+
+import argparse
+import asyncio
+import datetime
+import pprint
+
+from app.database import mongo, AsyncIOMotorClient
+
+from app.api.lib.PayslipSnapshot import PayslipSnapshot
+from app.api.lib.EmployeeSummary import EmployeeSummary
+from app.api.lib.Attendance import Attendance
+from app.api.lib.LoanSchedule import LoanSchedule
+from app.database.indexes import reconcile_indexes, missing_indexes, check_queries
+
+# Maintenance commands, run from the repository root:
+#   python -m app.manage payslip rebuild --start 2024-01 --end 2024-03
+#   python -m app.manage payslip check --month 2024-03
+#   python -m app.manage summary rebuild --employee-id EMP001
+#   python -m app.manage attendance migrate
+#   python -m app.manage loan relink
+#   python -m app.manage indexes sync
+#   python -m app.manage indexes check
+
+
+def month_type(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Date format is incorrect. Expected format: YYYY-MM"
+        )
+
+
+async def payslip_rebuild(mongo_client, args):
+    rebuilt = await PayslipSnapshot(mongo_client).rebuild(
+        args.start, args.end, employee_ids=args.employee_id
+    )
+
+    for month, count in rebuilt.items():
+        print("{}: {} snapshots".format(month.strftime("%Y-%m"), count))
+
+
+async def payslip_check(mongo_client, args):
+    mismatches = await PayslipSnapshot(mongo_client).check(
+        args.month, employee_ids=args.employee_id
+    )
+
+    if mismatches:
+        pprint.pprint(mismatches)
+        print("{} mismatches".format(len(mismatches)))
+        return 1
+
+    print("Snapshot is consistent with the live pipeline")
+    return 0
+
+
+async def summary_rebuild(mongo_client, args):
+    count = await EmployeeSummary(mongo_client).rebuild(args.employee_id)
+    print("{} employee-months".format(count))
+
+
+async def attendance_migrate(mongo_client, args):
+    count = await Attendance(mongo_client).migrate_rows()
+    print("{} employee-months".format(count))
+
+
+async def loan_relink(mongo_client, args):
+    count = await LoanSchedule(mongo_client).relink()
+    print("{} loans".format(count))
+
+
+async def indexes_sync(mongo_client, args):
+    reports = await reconcile_indexes(mongo_client)
+
+    for collection, report in reports.items():
+        for name in report["unmanaged"]:
+            print("{}.{}: not in the manifest".format(collection, name))
+
+        for name, error in report["failed"].items():
+            print("{}.{}: {}".format(collection, name, error))
+
+            for group in report["duplicates"].get(name, []):
+                print(
+                    "  {} documents share {}: {}".format(
+                        group["count"], group["_id"], group["ids"]
+                    )
+                )
+
+    return 1 if any(report["failed"] for report in reports.values()) else 0
+
+
+async def indexes_check(mongo_client, args):
+    problems = 0
+
+    for collection, name in await missing_indexes(mongo_client):
+        problems += 1
+        print("{}.{}: missing".format(collection, name))
+
+    for collection, query, sort, reasons in await check_queries(mongo_client):
+        problems += 1
+        print("{}: {} sort={}: {}".format(collection, query, sort, ", ".join(reasons)))
+
+    if problems:
+        print("{} problems".format(problems))
+        return 1
+
+    print("Every hot query is served by an index")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    payslip = commands.add_parser("payslip", help="Payslip snapshot maintenance")
+    payslip_commands = payslip.add_subparsers(dest="action", required=True)
+
+    rebuild = payslip_commands.add_parser("rebuild", help="Backfill a month range")
+    rebuild.add_argument("--start", type=month_type, required=True)
+    rebuild.add_argument("--end", type=month_type, required=True)
+    rebuild.add_argument("--employee-id", action="append")
+    rebuild.set_defaults(handler=payslip_rebuild)
+
+    check = payslip_commands.add_parser(
+        "check", help="Diff the snapshot against the live pipeline"
+    )
+    check.add_argument("--month", type=month_type, required=True)
+    check.add_argument("--employee-id", action="append")
+    check.set_defaults(handler=payslip_check)
+
+    summary = commands.add_parser(
+        "summary", help="Leave and permission counter maintenance"
+    )
+    summary_commands = summary.add_subparsers(dest="action", required=True)
+
+    rebuild = summary_commands.add_parser(
+        "rebuild", help="Recount from the leave rows, all employees by default"
+    )
+    rebuild.add_argument("--employee-id", action="append")
+    rebuild.set_defaults(handler=summary_rebuild)
+
+    attendance = commands.add_parser("attendance", help="Attendance maintenance")
+    attendance_commands = attendance.add_subparsers(dest="action", required=True)
+
+    migrate = attendance_commands.add_parser(
+        "migrate", help="Fold the per-day attendance rows into monthly bitmaps"
+    )
+    migrate.set_defaults(handler=attendance_migrate)
+
+    loan = commands.add_parser("loan", help="Loan repayment schedule maintenance")
+    loan_commands = loan.add_subparsers(dest="action", required=True)
+
+    relink = loan_commands.add_parser(
+        "relink", help="Store the loan_schedule ids on every loan"
+    )
+    relink.set_defaults(handler=loan_relink)
+
+    indexes = commands.add_parser("indexes", help="Index manifest maintenance")
+    indexes_commands = indexes.add_subparsers(dest="action", required=True)
+
+    sync = indexes_commands.add_parser(
+        "sync",
+        help="Create missing manifest indexes now and list the duplicate keys "
+        "that block unique ones",
+    )
+    sync.set_defaults(handler=indexes_sync)
+
+    check = indexes_commands.add_parser(
+        "check", help="Report hot queries that scan or sort in memory"
+    )
+    check.set_defaults(handler=indexes_check)
+
+    return parser
+
+
+async def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    mongo_client = mongo.create_client("batch")
+
+    try:
+        return await args.handler(mongo_client, args)
+    finally:
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()) or 0)
@@ -60,7 +60,6 @@ class LeaveInDB(LeaveBase):
     leave_type: str = "casual"
     start_date: datetime.datetime
     end_date: datetime.datetime
-    # FIXME: Store the month and year in which the leave was taken
     month: datetime.datetime
     status: Optional[LeaveApplicationStatus] = "pending"
     remarks: Optional[str] = ""
@@ -49,9 +49,14 @@ class NotificationBase(BaseModel):
     source: str
     status: str = "pending"
     target: str
-    created_at: datetime = datetime.now()
+    created_at: datetime = Field(default_factory=datetime.now)
     meta: NotificationMeta
 
 
 class SendNotification(BaseModel):
     notifier: List[NotificationBase]
+
+
+class MarkNotificationsRead(BaseModel):
+    # None marks every unread notification in the inbox
+    ids: Optional[List[str]] = None
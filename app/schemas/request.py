@@ -4,6 +4,7 @@ from pydantic import (
     root_validator,
     ValidationError,
     model_validator,
+    Field,
 )
 from fastapi import HTTPException
 from app.schemas.employees import EmployeeBase, BankDetails, Address, GovtIDProofs
@@ -19,7 +20,8 @@ from app.schemas.loan import LoanBase, LoanAdjustmentBase
 from enum import Enum
 
 import datetime
-from typing import Optional
+import math
+from typing import Optional, List
 import pprint
 
 exclude_fields_for_employee_update = ["employee_id", "email"]
@@ -83,6 +85,17 @@ class EmployeeCreateRequest(EmployeeBase):
         return values
 
 
+class AvatarSize(str, Enum):
+    SMALL = "64"
+    MEDIUM = "256"
+    ORIGINAL = "original"
+
+
+class EmployeeAvatarsRequest(BaseModel):
+    employee_ids: List[str] = Field(max_length=500)
+    size: AvatarSize = AvatarSize.SMALL
+
+
 # TODO: Keep this and EmployeeBase in sync
 class EmployeeUpdateRequest(BaseModel):
     name: Optional[str] = None
@@ -361,17 +374,15 @@ class LoanCreateRequest(LoanBase):
                 raise HTTPException(
                     status_code=400, detail="EMI must be less than loan amount"
                 )
-            values["tenure"] = (
-                amount / payback_value
-                if amount % payback_value == 0
-                else amount // payback_value + 1
-            )
+            # Enough months to repay the whole amount, paise included
+            values["tenure"] = math.ceil(float(values.get("amount")) / payback_value)
             values["emi"] = payback_value
 
         elif payback_type == "tenure":
             if not payback_value:
                 raise ValueError("Tenure must be provided for Tenure payback type")
-            values["emi"] = amount / payback_value
+            # The whole amount, paise included, so the EMI covers it
+            values["emi"] = float(values.get("amount")) / payback_value
             values["tenure"] = payback_value
 
         else:
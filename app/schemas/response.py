@@ -131,6 +131,7 @@ class GetLeaveResponse(BaseResponse):
 
 class LeaveHistoryResponse(BaseResponse):
     data: list
+    next_cursor: Optional[str] = None
 
 
 class PostPermissionResponse(BaseResponse):
@@ -155,6 +156,7 @@ class GetPermissionResponse(BaseResponse):
 class PermissionHistoryResponse(BaseResponse):
     message: str = "Permission history retrieved successfully"
     data: list
+    next_cursor: Optional[str] = None
 
 
 class SalaryAdvanceResponse(BaseModel):
@@ -215,6 +217,7 @@ class LoanRespondResponse(BaseResponse):
 
 class LoanHistoryResponse(BaseResponse):
     data: list
+    next_cursor: Optional[str] = None
 
 
 class RepaymentRecordResponse(BaseModel):
@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import os
+import random
+import sys
+import time
+
+# Run from the repository root against a scratch database:
+#   python lab/bench_payroll.py [mongodb://localhost:27017/]
+# Always the scratch database, whatever is exported in the shell: the
+# benchmark drops the collections it seeds and the database when done
+BENCH_DATABASE = "hhp-esm-bench"
+os.environ["MONGO_DATABASE"] = BENCH_DATABASE
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.api.lib.Payroll import Payroll
+from app.core import pipelines
+from app.core.config import Config
+
+if Config.MONGO_DATABASE != BENCH_DATABASE:
+    sys.exit("Refusing to run against {}".format(Config.MONGO_DATABASE))
+
+SIZES = [100, 1000, 10000]
+MONTH = datetime.datetime(2024, 1, 1)
+RUNS = 3
+
+
+async def seed(db, size):
+    for collection in [
+        "employees",
+        "salary",
+        "monthly_compensation",
+        "salary_incentives",
+        "salary_advance",
+        "loan_schedule",
+    ]:
+        await db[collection].drop()
+
+    ids = ["EMP{:05d}".format(i) for i in range(size)]
+
+    await db.employees.insert_many(
+        [{"employee_id": i, "name": i, "branch": "HHP"} for i in ids]
+    )
+    await db.salary.insert_many(
+        [
+            {"employee_id": i, "month": MONTH, "gross_salary": 30000, "pf": 1800}
+            for i in ids
+        ]
+    )
+    await db.monthly_compensation.insert_many(
+        [{"employee_id": i, "month": MONTH, "overtime": 500} for i in ids]
+    )
+    await db.salary_incentives.insert_many(
+        [{"employee_id": i, "month": MONTH, "bonus": 1000} for i in ids]
+    )
+    await db.salary_advance.insert_many(
+        [
+            {"employee_id": i, "month": MONTH, "amount": 2000, "status": "approved"}
+            for i in random.sample(ids, size // 10)
+        ]
+    )
+    await db.loan_schedule.insert_many(
+        [
+            {"employee_id": i, "month": MONTH, "amount": 1500}
+            for i in random.sample(ids, size // 5)
+        ]
+    )
+
+    for collection in [
+        "salary",
+        "monthly_compensation",
+        "salary_incentives",
+        "salary_advance",
+        "loan_schedule",
+    ]:
+        await db[collection].create_index([("employee_id", 1), ("month", 1)])
+    await db.employees.create_index("employee_id", unique=True)
+
+    return ids
+
+
+async def timed(fn):
+    best = None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def main(uri):
+    client = AsyncIOMotorClient(uri)
+    db = client[Config.MONGO_DATABASE]
+
+    print("{:>8} {:>14} {:>14} {:>8}".format("size", "pipeline (s)", "engine (s)", "x"))
+
+    for size in SIZES:
+        ids = await seed(db, size)
+
+        async def run_pipeline():
+            pipeline = await pipelines.get_employee_with_salary_details(ids, MONTH)
+            await db.employees.aggregate(pipeline).to_list(None)
+
+        async def run_engine():
+            await Payroll(client).get_employees_with_salary(MONTH, employee_ids=ids)
+
+        pipeline_time = await timed(run_pipeline)
+        engine_time = await timed(run_engine)
+
+        print(
+            "{:>8} {:>14.3f} {:>14.3f} {:>8.1f}".format(
+                size, pipeline_time, engine_time, pipeline_time / engine_time
+            )
+        )
+
+    await client.drop_database(BENCH_DATABASE)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(sys.argv[1] if len(sys.argv) > 1 else "mongodb://localhost:27017/")
+    )
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+import time
+
+# Run from the repository root against a local broker:
+#   RABBITMQ_HOST=localhost RABBITMQ_USERNAME=guest RABBITMQ_PASSWORD=guest \
+#       python lab/bench_publisher.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.lib.Publisher import Publisher
+from app.api.lib.RabbitMQ import RabbitMQ
+
+EXCHANGE = "bench_notification"
+MESSAGES = [100, 1000]
+CONCURRENCY = 50
+
+
+def message(i):
+    return {
+        "title": "Leave Approved",
+        "description": "Your leave request {} has been approved".format(i),
+        "target": "EMP{:05d}".format(i % 500),
+    }
+
+
+async def per_call_connection(count):
+    # What Notification did before: a new connection for every notification
+    for i in range(count):
+        mq = RabbitMQ()
+        mq.publish(message(i), EXCHANGE, message(i)["target"])
+        mq.connection.close()
+
+
+async def pooled(publisher, count):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def publish(i):
+        async with semaphore:
+            await publisher.publish(message(i), EXCHANGE, message(i)["target"])
+
+    await asyncio.gather(*[publish(i) for i in range(count)])
+
+
+async def main():
+    publisher = Publisher()
+    await publisher.ensure_exchange(EXCHANGE)
+
+    print(
+        "{:>8} {:>20} {:>20}".format("messages", "per-call (msg/s)", "pooled (msg/s)")
+    )
+
+    for count in MESSAGES:
+        start = time.perf_counter()
+        await per_call_connection(count)
+        per_call = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await pooled(publisher, count)
+        pooled_rate = count / (time.perf_counter() - start)
+
+        print("{:>8} {:>20.1f} {:>20.1f}".format(count, per_call, pooled_rate))
+
+    print(publisher.metrics())
+
+    await publisher.run(lambda channel: channel.exchange_delete(EXCHANGE))
+    await publisher.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+# Run from the repository root, no database needed:
+#   python lab/bench_report_memory.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from openpyxl.styles import Font
+
+from app.api.lib.ReportWriter import ReportWriter
+
+SIZES = [1000, 10000, 100000]
+
+HEADER = ["Employee ID", "Name", "Amount", "Month", "Date", "Posted By"]
+
+
+async def rows(size):
+    # Stand-in for the Motor aggregation cursor
+    for i in range(size):
+        yield {
+            "employee_id": "EMP{:05d}".format(i % 5000),
+            "name": "Employee {}".format(i % 5000),
+            "amount": i % 1000,
+            "month": "April",
+            "posted_at": "01-04-2024",
+            "posted_by": "admin",
+        }
+
+
+def to_row(i):
+    return [
+        i["employee_id"],
+        i["name"],
+        i["amount"],
+        i["month"],
+        i["posted_at"],
+        i["posted_by"],
+    ]
+
+
+async def in_memory(size):
+    # The previous approach: a regular workbook saved into a BytesIO
+    data = [doc async for doc in rows(size)]
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+
+    total = 0
+    for i in data:
+        ws.append(to_row(i))
+        total += i["amount"]
+
+    ws.append(["", "Total", total, ""])
+    for cell in ws[ws.max_row]:
+        cell.font = Font(bold=True)
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+
+    return len(output.read())
+
+
+async def streamed(fmt, size):
+    writer = ReportWriter(fmt)
+    ws = writer.create_sheet("Report")
+    ws.append(HEADER)
+
+    total = await ws.append_cursor(rows(size), to_row, total_field="amount")
+    ws.append(["", "Total", total, ""], bold=True)
+
+    writer.close()
+
+    return sum(len(chunk) for chunk in writer.iter_chunks())
+
+
+async def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed, size
+
+
+async def main():
+    print(
+        "{:>8} {:>22} {:>22} {:>22}".format(
+            "rows", "in-memory MiB (s)", "streamed xlsx MiB (s)", "streamed csv MiB (s)"
+        )
+    )
+
+    for size in SIZES:
+        results = [
+            await measure(in_memory, size),
+            await measure(streamed, "xlsx", size),
+            await measure(streamed, "csv", size),
+        ]
+
+        print(
+            "{:>8} {}".format(
+                size,
+                " ".join(
+                    "{:>14.1f} ({:>5.2f})".format(peak, elapsed)
+                    for peak, elapsed, _ in results
+                ),
+            )
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
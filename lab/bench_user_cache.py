@@ -0,0 +1,128 @@
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# Run from the repository root against a scratch database:
+#   python lab/bench_user_cache.py [mongodb://localhost:27017/] [redis://localhost:6379/0]
+# Always the scratch database, whatever is exported in the shell: the
+# benchmark drops the collections it seeds and the database when done
+BENCH_DATABASE = "hhp-esm-bench"
+os.environ["MONGO_DATABASE"] = BENCH_DATABASE
+os.environ.setdefault("SECRET_KEY", "bench-secret-key-for-local-runs-only")
+os.environ.setdefault("ALGORITHM", "HS256")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.api.crud import auth as auth_crud
+from app.api.lib import UserCache
+from app.api.utils import employees
+from app.core.config import Config
+from app.database import mongo
+
+if Config.MONGO_DATABASE != BENCH_DATABASE:
+    sys.exit("Refusing to run against {}".format(Config.MONGO_DATABASE))
+
+REQUESTS = 2000
+USERS = 200
+
+
+async def seed(db):
+    await db.users.drop()
+    await db.employees.drop()
+
+    uuids = [uuid.uuid4().hex for _ in range(USERS)]
+
+    await db.users.insert_many(
+        [
+            {"uuid": u, "employee_id": "EMP{:05d}".format(i), "email": u}
+            for i, u in enumerate(uuids)
+        ]
+    )
+    await db.employees.insert_many(
+        [{"employee_id": "EMP{:05d}".format(i)} for i in range(USERS)]
+    )
+    await db.users.create_index("uuid", unique=True)
+    await db.employees.create_index("employee_id", unique=True)
+
+    return uuids
+
+
+def token(u):
+    return HTTPAuthorizationCredentials(
+        scheme="Bearer",
+        credentials=jwt.encode(
+            {
+                "uuid": u,
+                "type": "access",
+                "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+            },
+            Config.SECRET_KEY,
+            algorithm=Config.ALGORITHM,
+        ),
+    )
+
+
+async def run(label, check, credentials):
+    latencies = []
+
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        await check(credentials[i % len(credentials)])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+
+    print(
+        "{:<24} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+            label,
+            statistics.mean(latencies),
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.99)],
+        )
+    )
+
+
+async def main(uri, redis_url):
+    mongo.client = AsyncIOMotorClient(uri)
+    db = mongo.client[Config.MONGO_DATABASE]
+
+    uuids = await seed(db)
+    credentials = [token(u) for u in uuids]
+
+    print("{:<24} {:>9} {:>9} {:>9}".format("", "mean ms", "p50 ms", "p99 ms"))
+
+    async def aggregation(credentials):
+        # What verify_login_token did before the cache
+        payload = jwt.decode(
+            credentials.credentials, Config.SECRET_KEY, algorithms=[Config.ALGORITHM]
+        )
+        await auth_crud.get_user_by_uuid(payload["uuid"], mongo.client)
+
+    await run("$lookup aggregation", aggregation, credentials)
+
+    backends = [("cache off", "off"), ("cache memory", "memory")]
+    if redis_url:
+        backends.append(("cache redis", "redis"))
+
+    for label, backend in backends:
+        employees.user_cache = UserCache.UserCache(backend=backend, redis_url=redis_url)
+        await run(label, employees.verify_login_token, credentials)
+        print("  {}".format(employees.user_cache.metrics()))
+
+    await mongo.client.drop_database(BENCH_DATABASE)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            sys.argv[1] if len(sys.argv) > 1 else "mongodb://localhost:27017/",
+            sys.argv[2] if len(sys.argv) > 2 else None,
+        )
+    )
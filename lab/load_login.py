@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+# Needs lab/requirements.txt. Start the API, then run from the repository root
+# with a real account:
+#   python lab/load_login.py --url http://localhost:8000 --email me@example.com --password ...
+# Measures /ping latency while nothing else runs, then again while a burst of
+# concurrent logins is in flight.
+
+PING_INTERVAL = 0.01
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def summary(label, latencies):
+    print(
+        "{:<20} n={:<6} p50={:>8.2f}ms p99={:>8.2f}ms max={:>8.2f}ms".format(
+            label,
+            len(latencies),
+            statistics.median(latencies),
+            percentile(latencies, 0.99),
+            max(latencies),
+        )
+    )
+
+
+async def ping(client, stop):
+    latencies = []
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/ping")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(PING_INTERVAL)
+
+    return latencies
+
+
+async def login(client, email, password):
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": email, "password": password}
+    )
+    return response.status_code, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.logins + 10)
+
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60
+    ) as client:
+        stop = asyncio.Event()
+        idle = asyncio.create_task(ping(client, stop))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        summary("/ping idle", await idle)
+
+        for _ in range(args.rounds):
+            stop = asyncio.Event()
+            busy = asyncio.create_task(ping(client, stop))
+
+            results = await asyncio.gather(
+                *[login(client, args.email, args.password) for _ in range(args.logins)]
+            )
+
+            stop.set()
+            summary("/ping under logins", await busy)
+
+            statuses = {}
+            for status, _ in results:
+                statuses[status] = statuses.get(status, 0) + 1
+
+            summary("login", [latency for _, latency in results])
+            print("{:<20} {}".format("login statuses", statuses))
+
+        metrics = await client.get(
+            "/api/v1/admin/metrics/password-hasher",
+            headers={"Authorization": "Bearer {}".format(args.token)}
+            if args.token
+            else {},
+        )
+        if metrics.status_code == 200:
+            print("password hasher", metrics.json()["data"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    parser.add_argument("--token", help="MD access token to print hasher metrics")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+import time
+import uuid
+
+# Start the Socket.IO server, then run from the repository root with the same
+# .env (SECRET_KEY, RABBITMQ_*) the server uses:
+#   python lab/socketio_load.py --url http://localhost:9003 --clients 1000
+# Connects N simulated employees, publishes messages to their routing keys and
+# reports connect time and end-to-end delivery latency. The async client needs
+# aiohttp installed.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import socketio
+
+from app.api.lib.Publisher import Publisher
+from app.core.config import Config
+
+EXCHANGE = "employee_notification"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def summary(label, latencies):
+    if not latencies:
+        print("{:<12} n=0".format(label))
+        return
+
+    print(
+        "{:<12} n={:<7} p50={:>8.2f}ms p95={:>8.2f}ms p99={:>8.2f}ms max={:>8.2f}ms".format(
+            label,
+            len(latencies),
+            percentile(latencies, 0.5),
+            percentile(latencies, 0.95),
+            percentile(latencies, 0.99),
+            max(latencies),
+        )
+    )
+
+
+def token(employee_id):
+    return jwt.encode(
+        {
+            "uuid": "load{}".format(employee_id),
+            "employee_id": employee_id,
+            "type": "access",
+            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        },
+        Config.SECRET_KEY,
+        algorithm=Config.ALGORITHM,
+    )
+
+
+async def connect(url, employee_id, latencies, received):
+    client = socketio.AsyncClient(reconnection=False)
+
+    @client.on("notification")
+    async def notification(data):
+        sent_at = data["data"]["payload"].get("sent_at")
+        if sent_at:
+            latencies.append((time.time() - sent_at) * 1000)
+        received[employee_id] = received.get(employee_id, 0) + 1
+
+    start = time.perf_counter()
+    await client.connect(
+        url,
+        headers={"Authorization": "Bearer {}".format(token(employee_id))},
+        transports=["websocket"],
+    )
+
+    return client, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    employee_ids = ["LOAD{:05d}".format(i) for i in range(args.clients)]
+    latencies = []
+    received = {}
+
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def limited(employee_id):
+        async with semaphore:
+            return await connect(args.url, employee_id, latencies, received)
+
+    results = await asyncio.gather(
+        *[limited(employee_id) for employee_id in employee_ids],
+        return_exceptions=True,
+    )
+
+    clients = [result[0] for result in results if not isinstance(result, Exception)]
+    errors = [result for result in results if isinstance(result, Exception)]
+
+    summary(
+        "connect",
+        [result[1] for result in results if not isinstance(result, Exception)],
+    )
+    print(
+        "connected {} of {} ({} errors)".format(len(clients), args.clients, len(errors))
+    )
+
+    # Let the server finish binding queues before publishing
+    await asyncio.sleep(args.settle_seconds)
+
+    publisher = Publisher()
+    expected = 0
+
+    for _ in range(args.rounds):
+        messages = []
+
+        for employee_id in employee_ids:
+            messages.append(
+                (
+                    EXCHANGE,
+                    employee_id,
+                    {
+                        "id": uuid.uuid4().hex,
+                        "title": "load",
+                        "description": "load",
+                        "target": employee_id,
+                        "payload": {"sent_at": time.time()},
+                    },
+                )
+            )
+
+        statuses = await publisher.publish_many(messages)
+        expected += statuses.count("confirmed")
+
+        await asyncio.sleep(args.interval)
+
+    deadline = time.monotonic() + args.drain_seconds
+    while sum(received.values()) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    summary("delivery", latencies)
+    print("received {} of {} published".format(sum(received.values()), expected))
+
+    await asyncio.gather(*[client.disconnect() for client in clients])
+    await publisher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:9003")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=1)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--settle-seconds", type=float, default=2)
+    parser.add_argument("--drain-seconds", type=float, default=10)
+
+    asyncio.run(main(parser.parse_args()))
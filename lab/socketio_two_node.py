@@ -0,0 +1,259 @@
+import asyncio
+import datetime
+import os
+import pickle
+import sys
+
+# Runs two Socket.IO nodes in one process on ports 9101 and 9102, sharing an
+# in-process stand-in for the Redis/AMQP client manager, and checks that room
+# emits, employee and role rooms alike, cross nodes and that draining hands
+# sockets over. No Redis or RabbitMQ is needed; the clients need aiohttp
+# installed.
+#   SECRET_KEY=... ALGORITHM=HS256 python lab/socketio_two_node.py
+os.environ.setdefault("SECRET_KEY", "two-node-secret-key-for-local-runs-only")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("MONGO_HOST", "localhost")
+os.environ.setdefault("MONGO_PORT", "27017")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import socketio
+import uvicorn
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from app.core.config import Config
+from socketio_manager.main import create_app
+from socketio_manager.utils import employee_room, role_room
+
+PORTS = [9101, 9102]
+
+
+class StandInBroker:
+    def __init__(self):
+        self.managers = []
+
+
+class StandInManager(AsyncPubSubManager):
+    """Pub/sub client manager whose channel is an in-process fan-out"""
+
+    name = "stand-in"
+
+    def __init__(self, broker):
+        super().__init__(channel="stand-in")
+        self.messages = asyncio.Queue()
+        broker.managers.append(self)
+        self.broker = broker
+
+    async def _publish(self, data):
+        # Serialise like the real managers so nothing is shared by reference
+        for manager in self.broker.managers:
+            manager.messages.put_nowait(pickle.dumps(data))
+
+    async def _listen(self):
+        while True:
+            yield await self.messages.get()
+
+
+class StandInBridge:
+    """Replaces the RabbitMQ bridge; deliver() plays a consumed message"""
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.sid_queues = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def drain(self):
+        pass
+
+    async def subscribe(self, sid, queue, binding_key, room, acks=False):
+        self.sid_queues[sid] = queue
+
+    async def unsubscribe(self, sid):
+        self.sid_queues.pop(sid, None)
+
+    def ack(self, sid, delivery_tag):
+        return False
+
+    async def deliver(self, employee_id, message):
+        await self.sio.emit(
+            "notification", {"data": message}, room=employee_room(employee_id)
+        )
+
+
+def token(employee_id, role="employee", branch="head office"):
+    return jwt.encode(
+        {
+            "uuid": "twonode{}".format(employee_id),
+            "employee_id": employee_id,
+            "primary_role": role,
+            "branch": branch,
+            "type": "access",
+            "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+        },
+        Config.SECRET_KEY,
+        algorithm=Config.ALGORITHM,
+    )
+
+
+class Client:
+    def __init__(self, label):
+        self.label = label
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.events = []
+
+        @self.sio.on("*")
+        async def catch_all(event, data=None):
+            self.events.append((event, data))
+
+    async def connect(self, port, employee_id, role="employee", branch="head office"):
+        await self.sio.connect(
+            "http://127.0.0.1:{}".format(port),
+            headers={
+                "Authorization": "Bearer {}".format(token(employee_id, role, branch))
+            },
+            transports=["websocket"],
+        )
+
+    def received(self, event):
+        return [data for name, data in self.events if name == event]
+
+
+async def wait_for(condition, timeout=3):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def check(label, ok):
+    print("{:<60} {}".format(label, "PASS" if ok else "FAIL"))
+    return ok
+
+
+async def main():
+    broker = StandInBroker()
+    nodes, servers = [], []
+
+    for port in PORTS:
+        app = create_app(StandInManager(broker), bridge_factory=StandInBridge)
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        servers.append(asyncio.ensure_future(server.serve()))
+        await wait_for(lambda: server.started)
+        nodes.append((app, server))
+
+    (node_a, _), (node_b, _) = nodes
+    results = []
+
+    tab_1, tab_2, md = Client("tab 1"), Client("tab 2"), Client("md")
+    hr_1, hr_2 = Client("hr chennai"), Client("hr madurai")
+    await tab_1.connect(PORTS[0], "EMP00001")
+    await tab_2.connect(PORTS[1], "EMP00001")
+    await md.connect(PORTS[1], "MD00001", role="MD")
+    await hr_1.connect(PORTS[0], "HR00001", role="HR", branch="chennai")
+    await hr_2.connect(PORTS[1], "HR00002", role="HR", branch="madurai")
+
+    # A message consumed on node A reaches the employee's sockets on both nodes
+    await node_a.bridge.deliver("EMP00001", {"payload": {"n": 1}})
+    results.append(
+        check(
+            "employee room emit from node A reaches both nodes",
+            await wait_for(
+                lambda: tab_1.received("notification")
+                and tab_2.received("notification")
+            ),
+        )
+    )
+
+    # Role notifications are routed to the MD's own queue by its role binding
+    await node_a.bridge.deliver("MD00001", {"payload": {"role": "MD"}})
+    results.append(
+        check(
+            "role notification from node A reaches MD on node B",
+            await wait_for(lambda: md.received("notification")),
+        )
+    )
+    results.append(
+        check(
+            "role notification skips employees",
+            len(tab_1.received("notification")) == 1,
+        )
+    )
+
+    # Role rooms: an emit on either node reaches the role's sockets on both
+    await node_a.sio.emit("announcement", {"text": "md"}, room=role_room("MD"))
+    results.append(
+        check(
+            "role:MD emit from node A reaches MD on node B",
+            await wait_for(lambda: md.received("announcement")),
+        )
+    )
+
+    await node_b.sio.emit("announcement", {"text": "hr"}, room=role_room("HR_chennai"))
+    results.append(
+        check(
+            "role:HR_<branch> emit from node B reaches its HR on node A",
+            await wait_for(lambda: hr_1.received("announcement")),
+        )
+    )
+    results.append(
+        check(
+            "role room emits skip other roles, branches and employees",
+            len(md.received("announcement")) == 1
+            and not hr_2.received("announcement")
+            and not tab_1.received("announcement")
+            and not tab_2.received("announcement"),
+        )
+    )
+
+    # Drain node A: its socket is told to reconnect and new connects are refused
+    await node_a.drain(seconds=0.5)
+    results.append(
+        check(
+            "draining node notifies and disconnects its sockets",
+            await wait_for(
+                lambda: tab_1.received("server_draining") and not tab_1.sio.connected
+            ),
+        )
+    )
+    results.append(check("draining node keeps no sessions", not node_a.sessions))
+
+    refused = Client("refused")
+    try:
+        await refused.connect(PORTS[0], "EMP00002")
+        refused_ok = False
+    except socketio.exceptions.ConnectionError:
+        refused_ok = True
+    results.append(check("draining node refuses new connections", refused_ok))
+
+    reconnected = Client("tab 1 again")
+    await reconnected.connect(PORTS[1], "EMP00001")
+    await node_b.bridge.deliver("EMP00001", {"payload": {"n": 2}})
+    results.append(
+        check(
+            "reconnected socket on node B receives messages",
+            await wait_for(lambda: reconnected.received("notification")),
+        )
+    )
+
+    for client in [tab_2, md, hr_2, reconnected]:
+        await client.sio.disconnect()
+
+    for _, server in nodes:
+        server.should_exit = True
+    await asyncio.gather(*servers, return_exceptions=True)
+
+    print("{} of {} checks passed".format(sum(results), len(results)))
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
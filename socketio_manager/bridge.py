@@ -0,0 +1,429 @@
+import sys
+
+sys.dont_write_bytecode = True
+
+import asyncio
+import json
+import logging
+import uuid
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the broker to answer a declare/bind/consume/cancel
+RPC_TIMEOUT = 10
+
+RECONNECT_BACKOFF = [0.5, 1, 2, 5, 10]
+
+
+class AMQPBridge:
+    """Bridges per-employee RabbitMQ queues to Socket.IO rooms.
+
+    One AsyncioConnection and one channel per process run on the event loop,
+    so no socket holds a thread and messages are pushed as soon as the broker
+    delivers them. Each employee queue gets a single consumer per node no
+    matter how many sockets (tabs, devices) the employee has open there. The
+    routing table maps the queue to those sids and each message is emitted
+    once to the employee's room; with a shared client manager that reaches
+    the employee's sockets on every node, while the broker hands each message
+    to only one of the nodes' competing consumers.
+
+    Deliveries are acknowledged manually: a message leaves the queue only
+    once a client acks its delivery_tag, and unacknowledged messages are
+    requeued when the last socket of the queue leaves this node. Tags carry
+    the node id because RabbitMQ delivery tags are per channel; an ack that
+    reaches another node is ignored there and the local socket's ack counts.
+
+    Only clients that connect with auth {"acks": true} send acks. While none
+    of a queue's sockets on this node does, its messages are acked as soon as
+    they are emitted, as before manual acks; otherwise a client that never
+    acks would stop receiving once the prefetch window is full.
+    """
+
+    def __init__(
+        self, sio, exchange="employee_notification", prefetch=Config.SOCKETIO_PREFETCH
+    ):
+        self.sio = sio
+        self.exchange = exchange
+        self.prefetch = prefetch
+        self.node = uuid.uuid4().hex[:8]
+
+        self.connection = None
+        self.channel = None
+        self.opening = None
+        self.closing = False
+        self.draining = False
+
+        # queue -> sids, sid -> queue, queue -> routing key, queue -> room
+        # and the sids whose clients send acks
+        self.routes = {}
+        self.sid_queues = {}
+        self.bindings = {}
+        self.rooms = {}
+        self.acking = set()
+
+        # queue -> future resolving to the consumer tag, and the reverse
+        self.consumers = {}
+        self.consumer_queues = {}
+
+        # consumer tags whose cancel has been sent
+        self.cancelling = set()
+
+        # delivery tag -> queue for messages no client has acked yet
+        self.unacked = {}
+
+        self.emits = set()
+
+        self.delivered = 0
+        self.acked = 0
+        self.requeued = 0
+        self.reconnects = 0
+
+    def _call(self, method, *args, **kwargs):
+        """Call a pika channel method and await the broker's reply frame"""
+
+        future = asyncio.get_running_loop().create_future()
+
+        def callback(frame):
+            if not future.done():
+                future.set_result(frame)
+
+        result = method(*args, callback=callback, **kwargs)
+
+        async def wait():
+            await asyncio.wait_for(future, RPC_TIMEOUT)
+            return result
+
+        return wait()
+
+    async def _open(self):
+        loop = asyncio.get_running_loop()
+        opened = loop.create_future()
+
+        def on_open(connection):
+            connection.channel(on_open_callback=on_channel_open)
+
+        def on_channel_open(channel):
+            channel.add_on_close_callback(self._on_channel_closed)
+            if not opened.done():
+                opened.set_result(channel)
+
+        def on_open_error(connection, error):
+            if not opened.done():
+                opened.set_exception(error)
+
+        self.connection = AsyncioConnection(
+            pika.ConnectionParameters(
+                host=Config.RABBITMQ_HOST,
+                credentials=pika.PlainCredentials(
+                    Config.RABBITMQ_USERNAME, Config.RABBITMQ_PASSWORD
+                ),
+                heartbeat=60,
+            ),
+            on_open_callback=on_open,
+            on_open_error_callback=on_open_error,
+            on_close_callback=self._on_connection_closed,
+            custom_ioloop=loop,
+        )
+
+        channel = await asyncio.wait_for(opened, RPC_TIMEOUT)
+
+        await self._call(
+            channel.exchange_declare,
+            exchange=self.exchange,
+            exchange_type="topic",
+            durable=True,
+        )
+        # Applies to every consumer started on the channel afterwards
+        await self._call(channel.basic_qos, prefetch_count=self.prefetch)
+
+        self.channel = channel
+
+        logger.info("Socket.IO bridge connected to RabbitMQ")
+
+    async def start(self):
+        if self.channel is not None and self.channel.is_open:
+            return
+
+        if self.opening is None or self.opening.done():
+            self.closing = False
+            self.opening = asyncio.ensure_future(self._open())
+
+        try:
+            await asyncio.shield(self.opening)
+        except Exception:
+            self.opening = None
+            raise
+
+    async def stop(self):
+        self.closing = True
+
+        if self.connection is not None and not self.connection.is_closed:
+            self.connection.close()
+
+        self.connection = None
+        self.channel = None
+
+    def _on_channel_closed(self, channel, reason):
+        if self.channel is channel:
+            self.channel = None
+
+        if not self.closing:
+            logger.warning("Socket.IO bridge channel closed: {}".format(reason))
+
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+
+    def _on_connection_closed(self, connection, reason):
+        self.channel = None
+        self.consumers.clear()
+        self.consumer_queues.clear()
+        # The broker requeues whatever the closed channel had not acked
+        self.unacked.clear()
+
+        if not self.closing:
+            logger.warning("Socket.IO bridge connection closed: {}".format(reason))
+            asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        attempt = 0
+
+        while not self.closing:
+            delay = RECONNECT_BACKOFF[min(attempt, len(RECONNECT_BACKOFF) - 1)]
+            await asyncio.sleep(delay)
+            attempt += 1
+
+            try:
+                await self.start()
+            except Exception as e:
+                logger.warning("Socket.IO bridge reconnect failed: {}".format(e))
+                continue
+
+            self.reconnects += 1
+
+            # Resume a consumer for every queue that still has sockets
+            for queue, sids in list(self.routes.items()):
+                if sids and not self.draining:
+                    self._ensure_consumer(queue)
+
+            return
+
+    async def _consume(self, queue, binding_key):
+        await self.start()
+
+        channel = self.channel
+
+        await self._call(channel.queue_declare, queue=queue, durable=True)
+        await self._call(
+            channel.queue_bind,
+            queue=queue,
+            exchange=self.exchange,
+            routing_key=binding_key,
+        )
+
+        consumer_tag = await self._call(
+            channel.basic_consume,
+            queue=queue,
+            on_message_callback=self._on_message,
+            auto_ack=False,
+        )
+
+        self.consumer_queues[consumer_tag] = queue
+
+        return consumer_tag
+
+    def _ensure_consumer(self, queue):
+        consumer = self.consumers.get(queue)
+
+        if consumer is None or (
+            consumer.done() and (consumer.cancelled() or consumer.exception())
+        ):
+            consumer = asyncio.ensure_future(self._consume(queue, self.bindings[queue]))
+            self.consumers[queue] = consumer
+
+        return consumer
+
+    async def subscribe(self, sid, queue, binding_key, room, acks=False):
+        if acks:
+            self.acking.add(sid)
+
+        self.sid_queues[sid] = queue
+        self.routes.setdefault(queue, set()).add(sid)
+        self.bindings[queue] = binding_key
+        self.rooms[queue] = room
+
+        await asyncio.shield(self._ensure_consumer(queue))
+
+    async def unsubscribe(self, sid):
+        self.acking.discard(sid)
+        queue = self.sid_queues.pop(sid, None)
+
+        if queue is None:
+            return
+
+        sids = self.routes.get(queue, set())
+        sids.discard(sid)
+
+        if sids:
+            return
+
+        self.routes.pop(queue, None)
+        self.bindings.pop(queue, None)
+        self.rooms.pop(queue, None)
+        consumer = self.consumers.pop(queue, None)
+
+        if consumer is None:
+            return
+
+        try:
+            consumer_tag = await consumer
+        except Exception:
+            return
+
+        # Another socket for the same queue may have subscribed meanwhile;
+        # keep this consumer unless that socket already started its own
+        if queue in self.routes and queue not in self.consumers:
+            self.consumers[queue] = consumer
+            return
+
+        await self._cancel(consumer_tag)
+
+        self.requeue(queue)
+
+    async def _cancel(self, consumer_tag):
+        """Stop a consumer so the broker keeps its queue's messages"""
+
+        queue = self.consumer_queues.pop(consumer_tag, None)
+        self.cancelling.add(consumer_tag)
+
+        try:
+            if self.channel is not None and self.channel.is_open:
+                await self._call(self.channel.basic_cancel, consumer_tag)
+        except Exception as e:
+            logger.warning("Could not cancel consumer {}: {}".format(queue, e))
+        finally:
+            self.cancelling.discard(consumer_tag)
+
+    async def drain(self):
+        """Stop consuming so queued messages go to the other nodes' consumers.
+
+        Sockets stay connected; the server disconnects them afterwards.
+        """
+
+        self.draining = True
+
+        consumers = list(self.consumers.values())
+        self.consumers.clear()
+
+        for consumer in consumers:
+            try:
+                consumer_tag = await consumer
+            except Exception:
+                continue
+
+            await self._cancel(consumer_tag)
+
+        self.requeue()
+
+        if self.emits:
+            await asyncio.wait(list(self.emits), timeout=RPC_TIMEOUT)
+
+    def _on_message(self, channel, method, properties, body):
+        queue = self.consumer_queues.get(method.consumer_tag)
+        sids = self.routes.get(queue)
+
+        if not sids:
+            # The last socket left before the consumer's cancel went through.
+            # The message stays queued until a client confirms it; cancelling
+            # here too, should the first cancel have failed, keeps the broker
+            # from handing it straight back to this consumer.
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+            self.requeued += 1
+
+            if method.consumer_tag not in self.cancelling:
+                self.cancelling.add(method.consumer_tag)
+                asyncio.ensure_future(self._cancel(method.consumer_tag))
+            return
+
+        delivery_tag = "{}:{}".format(self.node, method.delivery_tag)
+
+        try:
+            message = json.loads(body.decode("utf-8"))
+            message["payload"]["delivery_tag"] = delivery_tag
+        except (json.decoder.JSONDecodeError, KeyError, TypeError):
+            message = {"data": body.decode("utf-8"), "delivery_tag": delivery_tag}
+
+        task = asyncio.ensure_future(
+            self.sio.emit("notification", {"data": message}, room=self.rooms[queue])
+        )
+        self.emits.add(task)
+        task.add_done_callback(self.emits.discard)
+
+        self.delivered += 1
+
+        if sids & self.acking:
+            self.unacked[method.delivery_tag] = queue
+        else:
+            # No socket of the queue sends acks, the emit is the delivery
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            self.acked += 1
+
+    def ack(self, sid, delivery_tag):
+        """Ack a delivery on behalf of a socket. Only tags this node handed
+        out for the socket's own queue are accepted; acking a tag the channel
+        does not know would close the channel."""
+
+        try:
+            node, tag = str(delivery_tag).split(":")
+            tag = int(tag)
+        except ValueError:
+            return False
+
+        queue = self.unacked.get(tag)
+
+        if node != self.node or queue is None or queue != self.sid_queues.get(sid):
+            return False
+
+        if self.channel is None or not self.channel.is_open:
+            return False
+
+        self.unacked.pop(tag)
+        self.channel.basic_ack(delivery_tag=tag)
+        self.acked += 1
+
+        return True
+
+    def requeue(self, queue=None):
+        """Return unacked deliveries, of one queue or all, to the broker"""
+
+        tags = [
+            tag
+            for tag, tag_queue in self.unacked.items()
+            if queue is None or tag_queue == queue
+        ]
+
+        for tag in tags:
+            self.unacked.pop(tag)
+
+            if self.channel is not None and self.channel.is_open:
+                self.channel.basic_nack(delivery_tag=tag, requeue=True)
+                self.requeued += 1
+
+    def metrics(self):
+        return {
+            "connected": self.channel is not None and self.channel.is_open,
+            "draining": self.draining,
+            "sockets": len(self.sid_queues),
+            "queues": len(self.routes),
+            "consumers": len(self.consumer_queues),
+            "pending_emits": len(self.emits),
+            "unacked": len(self.unacked),
+            "delivered": self.delivered,
+            "acked": self.acked,
+            "requeued": self.requeued,
+            "reconnects": self.reconnects,
+        }
@@ -2,112 +2,213 @@ import sys
 
 sys.dont_write_bytecode = True
 
-import socketio
 import asyncio
+import os
+import signal
+
+import socketio
+from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.api.crud import notifications as notification_crud
+from app.api.utils.notifications import notification_targets, role_target
+from app.core.config import Config
+from app.database.mongo import MongoManger
 from socketio_manager.auth import validate_connection
-from socketio_manager.utils import async_consume
+from socketio_manager.bridge import AMQPBridge
+from socketio_manager.managers import create_client_manager
+from socketio_manager.utils import employee_room, role_room, role_rooms
 
-from app.api.lib.RabbitMQ import RabbitMQ
 
-rabbitmq_instances = {}
+def create_app(client_manager=None, bridge_factory=AMQPBridge):
+    """Build the Socket.IO ASGI app.
 
-# Create a Socket.IO server instance
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+    client_manager is shared between nodes (see managers.py) so emits to the
+    employee:<id> and role:<MD|HR_<branch>> rooms reach sockets on every
+    node. Role notifications are delivered through each member's own queue,
+    which the API binds to the role routing key; the role room carries what
+    concerns every member at once, such as a role notification being read.
+    bridge_factory(sio) returns the RabbitMQ bridge; the two-node harness in
+    lab/ passes a stand-in.
+    """
 
-# Wrap with ASGI application
-SocketServer = socketio.ASGIApp(sio)
+    sio = socketio.AsyncServer(
+        async_mode="asgi", cors_allowed_origins="*", client_manager=client_manager
+    )
+
+    # One RabbitMQ connection per process, shared by every socket
+    bridge = bridge_factory(sio)
+
+    # Sockets connected to this node, sid -> token payload
+    sessions = {}
+    state = {"draining": False, "mongo_client": None}
+
+    async def drain(seconds=Config.SOCKETIO_DRAIN_SECONDS):
+        """Hand this node's sockets to the other nodes for a rolling deploy.
+
+        New connections are refused, the RabbitMQ consumers are cancelled so
+        queued messages go to the other nodes, and connected sockets are told
+        to reconnect and disconnected spread over `seconds` rather than all
+        at once.
+        """
+
+        if state["draining"]:
+            return
+
+        state["draining"] = True
+
+        await bridge.drain()
+
+        sids = list(sessions)
+        delay = seconds / len(sids) if sids else 0
+
+        print("Draining {} sockets over {}s".format(len(sids), seconds))
 
+        for sid in sids:
+            await sio.emit("server_draining", {"reconnect": True}, room=sid)
+            await sio.disconnect(sid)
+            await asyncio.sleep(delay)
 
-# Event handler for new connections
-@sio.event
-async def connect(sid, environ):
-    payload = await validate_connection(sid, environ, sio)
+    async def drain_and_exit():
+        await drain()
+        # Hand over to uvicorn's own shutdown
+        os.kill(os.getpid(), signal.SIGINT)
 
-    if not payload:
-        return await sio.disconnect(sid)
+    async def on_startup():
+        # A plain client: index and role setup belong to the API process
+        state["mongo_client"] = AsyncIOMotorClient(MongoManger().mongo_uri)
 
-    loop = asyncio.get_running_loop()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.ensure_future(drain_and_exit())
+            )
+        except (NotImplementedError, RuntimeError):
+            pass
 
-    queue_name = "notifications_employee_{}".format(payload["uuid"])
-    exchange_name = "employee_notification"
-    binding_key = payload["employee_id"]
+        try:
+            await bridge.start()
+        except Exception as e:
+            # Sockets retry the connection on subscribe
+            print("Could not connect to RabbitMQ:", e)
 
-    print(
-        "Client connected with sid: {}, Employee ID: {}, queue_name: {}".format(
-            sid, payload["employee_id"], queue_name
+    async def on_shutdown():
+        await drain(0)
+        await bridge.stop()
+
+        if state["mongo_client"] is not None:
+            state["mongo_client"].close()
+
+    # Event handler for new connections
+    @sio.event
+    async def connect(sid, environ, auth=None):
+        """auth {"acks": true} declares a client that acks each notification's
+        delivery_tag; other clients get their notifications acked on emit"""
+
+        if state["draining"]:
+            raise socketio.exceptions.ConnectionRefusedError("Server is draining")
+
+        payload = await validate_connection(sid, environ, sio)
+
+        if not payload:
+            return await sio.disconnect(sid)
+
+        queue_name = "notifications_employee_{}".format(payload["uuid"])
+        binding_key = payload["employee_id"]
+        room = employee_room(payload["employee_id"])
+
+        print(
+            "Client connected with sid: {}, Employee ID: {}, queue_name: {}".format(
+                sid, payload["employee_id"], queue_name
+            )
         )
-    )
 
-    mq = RabbitMQ(
-        queue_name=queue_name,
-        exchange_name=exchange_name,
-        binding_key=binding_key,
-        loop=loop,
-    )
+        sessions[sid] = payload
+
+        for name in [room] + role_rooms(payload):
+            await sio.enter_room(sid, name)
 
-    rabbitmq_instances[sid] = mq
+        try:
+            await bridge.subscribe(
+                sid,
+                queue_name,
+                binding_key,
+                room,
+                acks=isinstance(auth, dict) and auth.get("acks") is True,
+            )
+        except Exception as e:
+            print("Error while subscribing", sid, "Reason:", e)
+            await bridge.unsubscribe(sid)
+            await sio.disconnect(sid)
 
-    sio.start_background_task(async_consume, mq, queue_name, sio, sid)
+    @sio.event
+    async def disconnect(sid):
+        sessions.pop(sid, None)
+        await bridge.unsubscribe(sid)
 
+        print("Disconnected", sid)
 
-@sio.event
-async def disconnect(sid):
-    mq = rabbitmq_instances.get(sid)
+    @sio.event
+    async def ack(sid, data):
+        """Client received a notification, data is its delivery_tag or a list"""
 
-    if mq:
-        mq.should_stop.set()
+        for delivery_tag in data if isinstance(data, list) else [data]:
+            bridge.ack(sid, delivery_tag)
 
-    print("Disconnected", sid)
+    @sio.event
+    async def mark_as_read(sid, data):
+        """data is {"id" or "ids", "delivery_tag"}; acks the delivery, marks
+        the notifications read and pushes the new unread count to every
+        socket of the employee"""
 
+        payload = sessions.get(sid)
 
-@sio.event
-async def mark_as_read(sid, data):
-    print("Received notification", data)
+        if not payload or not isinstance(data, dict):
+            return
 
+        if data.get("delivery_tag"):
+            bridge.ack(sid, data["delivery_tag"])
 
-# async def mark_as_read_worker(sid, data):
-#     notification_id = data["id"]
-#     delivery_tag = data["delivery_tag"]
+        ids = data.get("ids") or ([data["id"]] if data.get("id") else [])
 
-#     should_stop = False
+        if not ids or state["mongo_client"] is None:
+            return
 
-#     mq = RabbitMQ()
+        targets = notification_targets(payload)
 
-#     def callback(ch, method, properties, body):
-#         print(delivery_tag)
-#         print(" [x] Received %r" % body)
-#         if 1 == 2:
-#             should_stop = True
-#         # ch.basic_ack(delivery_tag=method.delivery_tag)
+        await notification_crud.mark_as_read(
+            ids, targets, payload["employee_id"], state["mongo_client"]
+        )
 
-#     mq.channel.basic_consume(
-#         queue="notifications_employee_8ceaf1d97507430199549f51b742ca4c",
-#         on_message_callback=callback,
-#         auto_ack=False,
-#     )
+        await sio.emit(
+            "unread_count",
+            {
+                "unread": await notification_crud.count_unread(
+                    targets, state["mongo_client"]
+                )
+            },
+            room=employee_room(payload["employee_id"]),
+        )
 
-#     while not should_stop:
-#         print(" [x] Waiting for messages. To exit press CTRL+C")
-#         mq.connection.process_data_events(time_limit=1)
+        # Role notifications are shared, so reading one reads it for every
+        # member of the role
+        role = role_target(payload)
 
+        if role:
+            await sio.emit(
+                "notifications_read",
+                {"ids": ids, "read_by": payload["employee_id"]},
+                room=role_room(role),
+                skip_sid=sid,
+            )
 
-# @sio.event
-# async def mark_as_read(sid, data):
-#     """
-#     Handle 'mark_as_read' event from frontend.
-#     'data' should contain necessary information like message ID or delivery tag.
-#     """
-#     print(f"Received mark_as_read from {sid}: {data}\n")
+    app = socketio.ASGIApp(sio, on_startup=on_startup, on_shutdown=on_shutdown)
+    app.sio = sio
+    app.bridge = bridge
+    app.sessions = sessions
+    app.drain = drain
 
-#     await mark_as_read_worker(sid, data)
+    return app
 
-# mq = rabbitmq_instances.get(sid)
 
-# if mq:
-#     try:
-#         if mq.channel.is_closed:
-#             mq.reconnect_channel()
-#         print(mq.channel.basic_ack(delivery_tag=data))
-#     except Exception as e:
-#         mq.reconnect_channel()
+# Wrap with ASGI application
+SocketServer = create_app(create_client_manager())
+sio = SocketServer.sio
@@ -0,0 +1,40 @@
+import sys
+
+sys.dont_write_bytecode = True
+
+import socketio
+
+from app.core.config import Config
+
+CHANNEL = "socketio_salary_management"
+
+
+def create_client_manager(kind=None, url=None):
+    """Client manager for Config.SOCKETIO_MANAGER.
+
+    None keeps python-socketio's in-memory manager, which only knows the
+    sockets of its own process. The redis and amqp managers publish emits,
+    room changes and disconnects on a shared channel so every node sees them.
+    """
+
+    kind = kind or Config.SOCKETIO_MANAGER
+    url = url or Config.SOCKETIO_MANAGER_URL
+
+    if kind == "memory":
+        return None
+
+    if kind == "redis":
+        return socketio.AsyncRedisManager(url or Config.REDIS_URL, channel=CHANNEL)
+
+    if kind == "amqp":
+        return socketio.AsyncAioPikaManager(
+            url
+            or "amqp://{}:{}@{}//".format(
+                Config.RABBITMQ_USERNAME,
+                Config.RABBITMQ_PASSWORD,
+                Config.RABBITMQ_HOST,
+            ),
+            channel=CHANNEL,
+        )
+
+    raise ValueError("Unsupported Socket.IO manager: {}".format(kind))
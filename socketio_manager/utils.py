@@ -2,16 +2,21 @@ import sys
 
 sys.dont_write_bytecode = True
 
-import asyncio
+from app.api.utils.notifications import role_target
 
 
-async def async_consume(mq_instance, queue, sio, sid):
-    loop = asyncio.get_running_loop()
-    # Using to_thread to run the synchronous consume method in a separate thread
-    # Adjust the arguments as per your consume method's signature
-    await loop.run_in_executor(None, mq_instance.consume, queue, sio, sid)
+def employee_room(employee_id):
+    return "employee:{}".format(employee_id)
 
 
-async def ack(mq_instance, delivery_tag):
-    loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, mq_instance.ack_message, delivery_tag)
+def role_room(role):
+    return "role:{}".format(role)
+
+
+def role_rooms(payload):
+    """Rooms matching the role routing keys the API binds at login, role:MD
+    or role:HR_<branch>"""
+
+    role = role_target(payload)
+
+    return [role_room(role)] if role else []
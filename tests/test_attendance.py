@@ -0,0 +1,109 @@
+import datetime
+
+from app.api.lib.Attendance import (
+    ALL_DAYS,
+    STATUSES,
+    attendance_stats,
+    day_mask,
+    mark_update,
+    month_counts,
+    month_view,
+)
+
+MARCH = datetime.datetime(2024, 3, 1)
+
+
+def apply_bit(doc, update):
+    """Apply the $bit part of an update to a month document, as Mongo does"""
+
+    doc = dict(doc)
+
+    for field, ops in update["$bit"].items():
+        value = doc.get(field, 0)
+        if "and" in ops:
+            value &= ops["and"]
+        if "or" in ops:
+            value |= ops["or"]
+        doc[field] = value
+
+    return doc
+
+
+def test_mark_update_sets_the_day_in_one_bitmap_and_clears_the_others():
+    mask = day_mask(datetime.datetime(2024, 3, 5))
+    now = datetime.datetime(2024, 3, 5, 18)
+
+    update = mark_update("absent", mask, now)
+
+    assert update["$bit"]["absent"] == {"or": mask}
+    assert update["$bit"]["present"] == {"and": ALL_DAYS & ~mask}
+    assert update["$bit"]["holiday"] == {"and": ALL_DAYS & ~mask}
+    assert update["$set"] == {"updated_at": now}
+
+
+def test_remarking_a_day_leaves_a_single_status():
+    date = datetime.datetime(2024, 3, 5)
+    other = datetime.datetime(2024, 3, 6)
+
+    doc = apply_bit({}, mark_update("present", day_mask(date)))
+    doc = apply_bit(doc, mark_update("present", day_mask(other)))
+    doc = apply_bit(doc, mark_update("absent", day_mask(date)))
+
+    assert [s for s in STATUSES if doc.get(s, 0) & day_mask(date)] == ["absent"]
+    assert [s for s in STATUSES if doc.get(s, 0) & day_mask(other)] == ["present"]
+    assert month_counts(doc) == {"present": 1, "absent": 1, "holiday": 0}
+
+
+def test_month_view_lists_every_day_of_the_month():
+    doc = {"present": day_mask(MARCH) | day_mask(MARCH.replace(day=31))}
+
+    view = month_view("EMP001", MARCH, doc)
+
+    assert len(view["days"]) == 31
+    assert view["days"][0] == {"date": MARCH, "status": "present"}
+    assert view["days"][1] == {"date": MARCH.replace(day=2), "status": None}
+    assert view["days"][-1]["status"] == "present"
+    assert (view["present"], view["absent"], view["holiday"]) == (2, 0, 0)
+
+
+def test_month_view_of_a_leap_february():
+    view = month_view("EMP001", datetime.datetime(2024, 2, 1), None)
+
+    assert len(view["days"]) == 29
+    assert all(day["status"] is None for day in view["days"])
+
+
+def test_month_view_clipped_to_a_range_counts_only_the_range():
+    doc = {
+        "present": day_mask(MARCH.replace(day=1)) | day_mask(MARCH.replace(day=10)),
+        "holiday": day_mask(MARCH.replace(day=20)),
+    }
+
+    view = month_view(
+        "EMP001",
+        MARCH,
+        doc,
+        start_date=MARCH.replace(day=5),
+        end_date=MARCH.replace(day=20),
+    )
+
+    assert [day["date"].day for day in view["days"]] == list(range(5, 21))
+    assert (view["present"], view["absent"], view["holiday"]) == (1, 0, 1)
+
+
+def test_attendance_stats_count_present_and_absent_as_working_days():
+    stats = attendance_stats({"present": 15, "absent": 5, "holiday": 4})
+
+    assert stats == {
+        "total_working_days": 20,
+        "total_present_days": 15,
+        "total_absent_days": 5,
+        "present_percentage": 75,
+    }
+
+
+def test_attendance_stats_without_working_days():
+    stats = attendance_stats({"present": 0, "absent": 0, "holiday": 2})
+
+    assert stats["total_working_days"] == 0
+    assert stats["present_percentage"] == 0
@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.utils.history import decode_cursor, encode_cursor
+
+NOW = datetime.datetime(2024, 3, 5, 9, 30, 15, 123456)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({"requested_at": NOW, "id": "abc123"})
+
+    assert decode_cursor(cursor) == (NOW, "abc123")
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"requested_at": NOW, "id": "??>>~~"})
+
+    assert not set(cursor) & set("+/")
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not a cursor", "WzEsIDIsIDNd", "WyJ5ZXN0ZXJkYXkiLCAiYWJjIl0=", ""]
+)
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+
+    assert e.value.status_code == 400
@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.lib.LoanSchedule import amortize, check_terms
+
+START = datetime.datetime(2024, 11, 15)
+
+
+def test_installments_add_up_exactly():
+    months, amounts = amortize(1000, 333.33, 3, START)
+
+    assert amounts == [333.33, 333.33, 333.34]
+    assert round(sum(amounts), 2) == 1000
+
+
+def test_months_follow_the_start_month():
+    months, amounts = amortize(1000, 250, 4, START)
+
+    assert months == [
+        datetime.datetime(2024, 11, 1),
+        datetime.datetime(2024, 12, 1),
+        datetime.datetime(2025, 1, 1),
+        datetime.datetime(2025, 2, 1),
+    ]
+    assert amounts == [250, 250, 250, 250]
+
+
+def test_last_installment_pays_the_remainder():
+    months, amounts = amortize(1000, 400, 3, START)
+
+    assert amounts == [400, 400, 200]
+    assert len(months) == 3
+
+
+def test_installments_that_would_be_zero_are_dropped():
+    months, amounts = amortize(1000, 500, 4, START)
+
+    assert amounts == [500, 500]
+    assert months == [datetime.datetime(2024, 11, 1), datetime.datetime(2024, 12, 1)]
+
+
+@pytest.mark.parametrize("tenure", [0, -1])
+def test_no_term_is_an_empty_schedule(tenure):
+    assert amortize(1000, 100, tenure, START) == ([], [])
+
+
+def test_nothing_left_is_an_empty_schedule():
+    assert amortize(0, 100, 3, START) == ([], [])
+
+
+def test_emi_that_does_not_cover_the_amount_is_rejected():
+    with pytest.raises(HTTPException) as e:
+        amortize(1000, 100.33, 3, START)
+
+    assert e.value.status_code == 400
+
+
+def test_rounding_cents_are_absorbed_by_the_last_installment():
+    months, amounts = amortize(1000.02, 333.33, 3, START)
+
+    assert amounts == [333.33, 333.33, 333.36]
+
+
+def test_terms_that_repay_the_amount_pass():
+    check_terms(1000, 333.34, 3)
+
+
+@pytest.mark.parametrize(
+    "amount, emi, tenure",
+    [
+        (1000, None, 3),
+        (1000, 100, None),
+        (1000, 0, 3),
+        (1000, 100, 0),
+        (0, 100, 3),
+        (1000, 100.33, 3),
+    ],
+)
+def test_terms_without_a_schedule_are_rejected(amount, emi, tenure):
+    with pytest.raises(HTTPException) as e:
+        check_terms(amount, emi, tenure)
+
+    assert e.value.status_code == 400
@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.lib.Payroll import (
+    LOAN_SCHEDULE_COLLECTION,
+    MONGO_DATABASE,
+    MONTHLY_COMPENSATION_COLLECTION,
+    PAYROLL_COLUMNS,
+    SALARY_ADVANCE_COLLECTION,
+    SALARY_COLLECTION,
+    SALARY_INCENTIVES_COLLECTION,
+    Payroll,
+)
+
+MONTH = datetime.datetime(2024, 3, 1)
+OTHER_MONTH = datetime.datetime(2024, 2, 1)
+
+
+def compute(documents, employee_ids):
+    async def run():
+        client = AsyncMongoMockClient()
+        db = client[MONGO_DATABASE]
+
+        for collection, rows in documents.items():
+            await db[collection].insert_many(rows)
+
+        return await Payroll(client).compute(MONTH, employee_ids)
+
+    return asyncio.run(run())
+
+
+def test_net_salary_joins_every_component():
+    frame = compute(
+        {
+            SALARY_COLLECTION: [
+                {
+                    "employee_id": "E1",
+                    "month": MONTH,
+                    "gross_salary": 30000,
+                    "pf": 1800,
+                },
+                {"employee_id": "E1", "month": OTHER_MONTH, "gross_salary": 1},
+            ],
+            MONTHLY_COMPENSATION_COLLECTION: [
+                {
+                    "employee_id": "E1",
+                    "month": MONTH,
+                    "loss_of_pay": 1000,
+                    "overtime": 500,
+                }
+            ],
+            SALARY_INCENTIVES_COLLECTION: [
+                {"employee_id": "E1", "month": MONTH, "bonus": 2000}
+            ],
+            SALARY_ADVANCE_COLLECTION: [
+                {
+                    "employee_id": "E1",
+                    "month": MONTH,
+                    "amount": 3000,
+                    "status": "approved",
+                },
+                {
+                    "employee_id": "E1",
+                    "month": MONTH,
+                    "amount": 700,
+                    "status": "pending",
+                },
+            ],
+            LOAN_SCHEDULE_COLLECTION: [
+                {"employee_id": "E1", "month": MONTH, "amount": 1200},
+                {"employee_id": "E1", "month": MONTH, "amount": 300},
+            ],
+        },
+        ["E1"],
+    )
+
+    row = frame.loc["E1"]
+
+    assert row["salary_advance"] == 3000
+    assert row["loan"] == 1500
+    # 30000 + 500 + 2000 earned, 1800 + 1000 + 3000 + 1500 deducted
+    assert row["net_salary"] == 25200
+
+
+def test_employees_without_components_are_zero():
+    frame = compute(
+        {
+            SALARY_COLLECTION: [
+                {"employee_id": "E1", "month": MONTH, "gross_salary": 10000}
+            ]
+        },
+        ["E1", "E2", "E1"],
+    )
+
+    assert list(frame.index) == ["E1", "E2"]
+    assert list(frame.columns) == PAYROLL_COLUMNS
+    assert frame.loc["E1", "net_salary"] == 10000
+    assert (frame.loc["E2"] == 0).all()
+
+
+def test_no_employees():
+    frame = compute({}, [])
+
+    assert frame.empty
+    assert list(frame.columns) == PAYROLL_COLUMNS
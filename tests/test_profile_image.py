@@ -0,0 +1,41 @@
+import pytest
+
+from app.api.lib.ProfileImage import sniff, variant_path
+
+
+@pytest.mark.parametrize(
+    "head, content_type",
+    [
+        (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image/jpeg"),
+        (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", "image/png"),
+        (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "image/webp"),
+    ],
+)
+def test_sniff_allowed_images(head, content_type):
+    assert sniff(head) == content_type
+
+
+@pytest.mark.parametrize(
+    "head",
+    [
+        b"GIF89a\x01\x00\x01\x00",
+        b"RIFF\x24\x00\x00\x00WAVEfmt ",
+        b"<svg xmlns='http://www.w3.org/2000/svg'>",
+        b"\xff\xd8",
+        b"",
+    ],
+)
+def test_sniff_rejects_everything_else(head):
+    assert sniff(head) is None
+
+
+def test_variant_path():
+    path = "profile/EMP001/abc/original.webp"
+
+    assert variant_path(path, "64") == "profile/EMP001/abc/64.webp"
+    assert variant_path(path, "original") == path
+
+
+def test_variant_path_of_a_legacy_upload():
+    assert variant_path("profile/EMP001.png", "64") == "profile/EMP001.png"
+    assert variant_path(None, "64") is None
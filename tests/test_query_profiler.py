@@ -0,0 +1,36 @@
+from app.api.lib.QueryProfiler import command_filter, query_shape
+
+
+def test_query_shape_ignores_values():
+    assert query_shape({"employee_id": "EMP001"}) == query_shape(
+        {"employee_id": "EMP002"}
+    )
+    assert query_shape({"employee_id": "EMP001"}) == "{employee_id}"
+
+
+def test_query_shape_sorts_fields():
+    assert query_shape({"month": 1, "employee_id": "EMP001"}) == "{employee_id,month}"
+
+
+def test_query_shape_keeps_operators():
+    shape = query_shape({"month": {"$gte": 1, "$lte": 2}, "id": {"$in": [1, 2]}})
+
+    assert shape == "{id{$in},month{$gte,$lte}}"
+
+
+def test_query_shape_of_or_clauses():
+    shape = query_shape({"$or": [{"a": 1}, {"b": {"$lt": 2}}]})
+
+    assert shape == "{$or[{a},{b{$lt}}]}"
+
+
+def test_query_shape_of_no_filter():
+    assert query_shape(None) == ""
+    assert query_shape({}) == "{}"
+
+
+def test_command_filter_per_command():
+    assert command_filter("find", {"filter": {"a": 1}}) == {"a": 1}
+    assert command_filter("update", {"updates": [{"q": {"b": 1}}]}) == {"b": 1}
+    assert command_filter("aggregate", {"pipeline": [{"$match": {"c": 1}}]}) == {"c": 1}
+    assert command_filter("insert", {"documents": []}) is None